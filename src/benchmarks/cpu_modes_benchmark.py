@@ -0,0 +1,86 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from src.steps.training.train import SimpleCNN, train_one_epoch, validate
+from src.utils.cifar_dataset import CifarLoaderSpec, build_loaders
+from src.utils.cifar_store import load_train
+from src.utils.cpu_perf import CpuPerfConfig, bf16_supported
+from src.utils.profiling import EpochTimer
+from src.utils.settings import DATA_RAW_DIR
+
+MODES = {
+    "fp32": {},
+    "channels_last": {"channels_last": True},
+    "channels_last_bf16": {"channels_last": True, "bf16_autocast": True},
+    "compile": {"compile_model": True},
+    "compile_channels_last_bf16": {"compile_model": True, "channels_last": True, "bf16_autocast": True},
+}
+
+
+def _run_mode(name: str, spec: CifarLoaderSpec, epochs: int, lr: float, threads: int, interop: int) -> dict:
+    perf = CpuPerfConfig(num_threads=threads, interop_threads=interop, **MODES[name])
+    perf.apply_threads()
+    torch.manual_seed(0)
+    train_loader, val_loader, _ = build_loaders(spec)
+    model = SimpleCNN()
+    fwd = perf.prepare_model(model)
+    criterion = nn.CrossEntropyLoss()
+    optimizer = optim.Adam(model.parameters(), lr=lr)
+    timer = EpochTimer("cpu")
+
+    epoch_times = []
+    val_acc = 0.0
+    for _ in range(epochs):
+        t0 = time.perf_counter()
+        train_one_epoch(model, fwd, train_loader, criterion, optimizer, "cpu", perf, timer)
+        epoch_times.append(time.perf_counter() - t0)
+        model.eval()
+        _, val_acc = validate(fwd, val_loader, criterion, "cpu", perf)
+
+    # first epoch includes compilation / warm-up; report it separately
+    steady = epoch_times[1:] or epoch_times
+    return {
+        "first_epoch_s": epoch_times[0],
+        "epoch_s": float(np.mean(steady)),
+        "val_acc": val_acc,
+        "bf16_active": perf.bf16_autocast,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Epoch time / accuracy of SimpleCNN per CPU mode")
+    parser.add_argument("--cifar-dir", default=os.path.join(DATA_RAW_DIR, "cifar-10-batches-py"))
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--train-samples", type=int, default=10000)
+    parser.add_argument("--val-samples", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--interop-threads", type=int, default=0)
+    args = parser.parse_args()
+
+    _, y = load_train(args.cifar_dir)
+    perm = np.random.default_rng(0).permutation(len(y)).astype(np.int32)
+    spec = CifarLoaderSpec(
+        cifar_dir=args.cifar_dir,
+        train_idx=perm[: args.train_samples],
+        val_idx=perm[args.train_samples: args.train_samples + args.val_samples],
+        batch_size=args.batch_size,
+    )
+
+    print(f"torch={torch.__version__} bf16_native={bf16_supported()} cpus={os.cpu_count()}")
+    print(f"{'mode':<28} {'first(s)':>9} {'epoch(s)':>9} {'val_acc':>8} {'bf16':>5}")
+    for name in args.modes:
+        r = _run_mode(name, spec, args.epochs, args.lr, args.threads, args.interop_threads)
+        print(f"{name:<28} {r['first_epoch_s']:>9.2f} {r['epoch_s']:>9.2f} {r['val_acc']:>8.4f} {str(r['bf16_active']):>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import itertools
+import os
+import time
+
+import numpy as np
+import torch
+
+from src.utils.cifar_dataset import CifarLoaderSpec, build_loaders
+from src.utils.cifar_store import load_train
+from src.utils.settings import DATA_RAW_DIR
+
+
+def _run(spec: CifarLoaderSpec, epochs: int) -> dict:
+    train_loader, _, _ = build_loaders(spec)
+    n = 0
+    t0 = time.perf_counter()
+    first_batch = None
+    for _ in range(epochs):
+        for xb, _ in train_loader:
+            if first_batch is None:
+                first_batch = time.perf_counter() - t0
+            n += xb.size(0)
+    elapsed = time.perf_counter() - t0
+    return {
+        "samples_per_sec": n / elapsed,
+        "first_batch_s": first_batch or 0.0,
+        "elapsed_s": elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="DataLoader throughput per configuration")
+    parser.add_argument("--cifar-dir", default=os.path.join(DATA_RAW_DIR, "cifar-10-batches-py"))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[128, 512])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--prefetch-factors", type=int, nargs="+", default=[2])
+    parser.add_argument("--background-prefetch", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--epochs", type=int, default=2)
+    args = parser.parse_args()
+
+    _, y = load_train(args.cifar_dir)
+    train_idx = np.arange(len(y), dtype=np.int32)
+
+    print(f"torch={torch.__version__} threads={torch.get_num_threads()} cpus={os.cpu_count()}")
+    print(f"{'batch':>6} {'workers':>7} {'prefetch':>8} {'bg':>3} {'samples/s':>11} {'first(s)':>9}")
+    for bs, nw, pf, bg in itertools.product(args.batch_sizes, args.workers, args.prefetch_factors, args.background_prefetch):
+        if nw == 0 and pf != args.prefetch_factors[0]:
+            continue  # prefetch_factor only applies to worker processes
+        spec = CifarLoaderSpec(
+            cifar_dir=args.cifar_dir,
+            train_idx=train_idx,
+            val_idx=train_idx[:0],
+            batch_size=bs,
+            num_workers=nw,
+            prefetch_factor=pf,
+            background_prefetch=bg,
+        )
+        r = _run(spec, args.epochs)
+        print(f"{bs:>6} {nw:>7} {pf:>8} {bg:>3} {r['samples_per_sec']:>11.0f} {r['first_batch_s']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
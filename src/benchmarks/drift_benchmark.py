@@ -0,0 +1,47 @@
+import argparse
+import time
+
+import numpy as np
+
+from src.utils.drift import compute_drift
+
+
+def _probs(rng: np.random.Generator, n: int, k: int, shift: float) -> np.ndarray:
+    logits = rng.normal(size=(n, k))
+    logits[:, 0] += shift
+    e = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return (e / e.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Native drift engine vs Evidently DataDriftPreset on proba_* columns")
+    parser.add_argument("--rows", type=int, nargs="+", default=[200, 10000, 100000])
+    parser.add_argument("--shift", type=float, default=0.5)
+    parser.add_argument("--evidently", action="store_true", help="also time Report(DataDriftPreset())")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    cols = [f"proba_{i}" for i in range(10)]
+    print(f"{'rows':>8} {'stattest':>12} {'share':>6} {'native(s)':>10} {'evidently(s)':>13} {'ev_share':>9}")
+    for n in args.rows:
+        ref, cur = _probs(rng, n, 10, 0.0), _probs(rng, n, 10, args.shift)
+        t0 = time.perf_counter()
+        drift = compute_drift(ref, cur, cols)
+        native_s = time.perf_counter() - t0
+
+        ev_s, ev_share = float("nan"), float("nan")
+        if args.evidently:
+            import pandas as pd
+            from evidently.metric_preset import DataDriftPreset
+            from evidently.report import Report
+
+            t0 = time.perf_counter()
+            report = Report(metrics=[DataDriftPreset()])
+            report.run(reference_data=pd.DataFrame(ref, columns=cols), current_data=pd.DataFrame(cur, columns=cols))
+            ev_share = report.as_dict()["metrics"][0]["result"]["share_of_drifted_columns"]
+            ev_s = time.perf_counter() - t0
+        print(f"{n:>8} {drift.stattest:>12} {drift.drift_share:>6.2f} {native_s:>10.4f} {ev_s:>13.4f} {ev_share:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import pickle
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TIMED_FIELDS = ("wall_s", "cpu_s", "peak_rss_mb")
+
+
+def _write_synthetic_cifar(cifar_dir: str, rows_per_batch: int, seed: int = 0) -> None:
+    # CIFAR-10 pickle layout; each class gets its own colour bias so training learns something
+    os.makedirs(cifar_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    class_bias = rng.integers(-40, 40, size=(10, 3), dtype=np.int16)
+    names = [f"data_batch_{i}" for i in range(1, 6)] + ["test_batch"]
+    for name in names:
+        labels = np.arange(rows_per_batch) % 10
+        rng.shuffle(labels)
+        x = rng.integers(60, 196, size=(rows_per_batch, 3, 1024), dtype=np.int16)
+        x = np.clip(x + class_bias[labels][:, :, None], 0, 255).astype(np.uint8).reshape(rows_per_batch, 3072)
+        with open(os.path.join(cifar_dir, name), "wb") as f:
+            pickle.dump({b"batch_label": name.encode(), b"labels": labels.tolist(), b"data": x}, f)
+
+
+def _configure(workdir: str) -> None:
+    # everything local: file-based MLflow, a throwaway ZenML store, relative paths in workdir
+    os.environ["MLFLOW_TRACKING_URI"] = f"file:{os.path.join(workdir, 'mlruns')}"
+    os.environ["ZENML_CONFIG_PATH"] = os.path.join(workdir, "zenml")
+    os.environ["ZENML_ANALYTICS_OPT_IN"] = "false"
+    os.environ["SIMULATE_DRIFT"] = "0"
+    for var in ("ZENML_SERVER_URL", "ZENML_STORE_URL"):
+        os.environ.pop(var, None)
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(workdir)
+
+
+def _commit() -> str:
+    try:
+        return subprocess.check_output(["git", "-C", REPO_ROOT, "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _compare(stages: dict, baseline_path: str, tolerance: float) -> list:
+    with open(baseline_path) as f:
+        baseline = {s["name"]: s for s in json.load(f)["stages"]}
+    regressions = []
+    print(f"\ncompared with {baseline_path} (tolerance {tolerance:.0%})")
+    print(f"{'stage':<28} {'field':>12} {'before':>10} {'after':>10} {'ratio':>7}")
+    for name, s in stages.items():
+        if name not in baseline:
+            continue
+        for field in TIMED_FIELDS:
+            before, after = baseline[name][field], s[field]
+            ratio = after / before if before > 0 else float("nan")
+            flag = ratio > 1.0 + tolerance and after - before > 0.05
+            if flag:
+                regressions.append((name, field, ratio))
+            print(f"{name:<28} {field:>12} {before:>10.3f} {after:>10.3f} {ratio:>7.2f}{'  REGRESSION' if flag else ''}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end stage timings on synthetic CIFAR-shaped data, no Docker services")
+    parser.add_argument("--workdir", default="", help="default: a temporary directory, removed afterwards")
+    parser.add_argument("--rows-per-batch", type=int, default=2000, help="10000 = real CIFAR-10 size")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--monitoring-samples", type=int, default=2000)
+    parser.add_argument("--skip-monitoring", action="store_true")
+    parser.add_argument("--out", default="", help="write results as JSON (e.g. per commit)")
+    parser.add_argument("--compare", default="", help="previous --out file; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out) if args.out else ""
+    compare = os.path.abspath(args.compare) if args.compare else ""
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="pipeline-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    _configure(workdir)
+
+    # imported only now: settings are read from the environment at import time
+    from src.utils.cifar_store import build_store
+    from src.utils.instrumentation import RECORDS, measure, wait_emitted
+
+    cifar_dir = os.path.join("data", "raw", "cifar-10-batches-py")
+    try:
+        with measure("synthetic_data"):
+            _write_synthetic_cifar(cifar_dir, args.rows_per_batch)
+        with measure("build_store"):  # pickle loading + conversion to the memmapped uint8 store
+            build_store(cifar_dir)
+
+        from src.pipelines.benchmark_pipeline import benchmark_monitoring_pipeline, benchmark_training_pipeline
+
+        n_steps = len(RECORDS)
+        with measure("pipeline_training"):
+            benchmark_training_pipeline(cifar_dir=cifar_dir, epochs=args.epochs, export_batch_sizes=[1, 64])
+        # pipeline wall minus its steps: ZenML orchestration and artifact (de)serialization
+        step_wall = sum(r.wall_s for r in RECORDS[n_steps:-1])
+        overhead = {"pipeline_training": RECORDS[-1].wall_s - step_wall}
+        if not args.skip_monitoring:
+            n_steps = len(RECORDS)
+            with measure("pipeline_monitoring"):
+                benchmark_monitoring_pipeline(n_samples=args.monitoring_samples)
+            overhead["pipeline_monitoring"] = RECORDS[-1].wall_s - sum(r.wall_s for r in RECORDS[n_steps:-1])
+    finally:
+        wait_emitted()  # step metrics still queued for the file-based MLflow store
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    stages = {r.name: r.as_dict() for r in RECORDS}
+    for name, seconds in overhead.items():
+        stages[f"{name}_zenml_overhead"] = {"name": f"{name}_zenml_overhead", "wall_s": seconds, "cpu_s": 0.0, "peak_rss_mb": 0.0}
+
+    print(f"\n{'stage':<36} {'wall_s':>8} {'cpu_s':>8} {'child_s':>8} {'rss_MB':>8} {'read_MB':>9} {'write_MB':>9}")
+    for s in stages.values():
+        print(
+            f"{s['name']:<36} {s['wall_s']:>8.3f} {s['cpu_s']:>8.3f} {s.get('cpu_children_s', 0.0):>8.3f} "
+            f"{s['peak_rss_mb']:>8.0f} {s.get('read_bytes', 0) / 1e6:>9.1f} {s.get('write_bytes', 0) / 1e6:>9.1f}"
+        )
+
+    result = {
+        "commit": _commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "stages": list(stages.values()),
+    }
+    if out:
+        with open(out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nwrote {out}")
+    if compare and _compare(stages, compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
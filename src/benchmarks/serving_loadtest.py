@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+from typing import List
+
+import numpy as np
+
+from src.utils.cifar_store import ROW_SIZE
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, path: str, body: bytes = b"") -> dict:
+    method = "POST" if body else "GET"
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    await reader.readline()  # status line
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value.strip())
+    return json.loads(await reader.readexactly(length))
+
+
+async def _client(host: str, port: int, payloads: List[bytes], deadline: float, latencies: List[float]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            await _request(reader, writer, host, "/predict", payloads[i % len(payloads)])
+            latencies.append(time.perf_counter() - t0)
+            i += 1
+    finally:
+        writer.close()
+
+
+async def _level(host: str, port: int, concurrency: int, duration_s: float, payloads: List[bytes]) -> dict:
+    latencies: List[float] = []
+    start = time.perf_counter()
+    deadline = start + duration_s
+    await asyncio.gather(*[_client(host, port, payloads, deadline, latencies) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    lat = np.array(latencies) * 1000.0
+    return {
+        "concurrency": concurrency,
+        "requests": len(lat),
+        "qps": len(lat) / elapsed,
+        "p50_ms": float(np.percentile(lat, 50)) if len(lat) else 0.0,
+        "p99_ms": float(np.percentile(lat, 99)) if len(lat) else 0.0,
+    }
+
+
+async def _main(args) -> None:
+    rng = np.random.default_rng(0)
+    payloads = [
+        json.dumps({"image_b64": base64.b64encode(rng.integers(0, 256, ROW_SIZE, dtype=np.uint8).tobytes()).decode()}).encode()
+        for _ in range(64)
+    ]
+    print(f"{'conc':>5} {'requests':>9} {'qps':>9} {'p50(ms)':>9} {'p99(ms)':>9}")
+    for c in args.concurrency:
+        r = await _level(args.host, args.port, c, args.duration, payloads)
+        print(f"{r['concurrency']:>5} {r['requests']:>9} {r['qps']:>9.0f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    print("server:", await _request(reader, writer, args.host, "/metrics"))
+    writer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="QPS vs latency against a running prediction_server")
+    parser.add_argument("--host", default=os.getenv("SERVING_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--duration", type=float, default=10.0)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from src.utils.cifar_dataset import CifarLoaderSpec
+from src.utils.cifar_store import load_train
+from src.utils.settings import DATA_RAW_DIR
+from src.utils.sweep import run_sweep, sample
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sweep throughput (trials/hour) per workers x threads-per-trial layout")
+    parser.add_argument("--cifar-dir", default=os.path.join(DATA_RAW_DIR, "cifar-10-batches-py"))
+    parser.add_argument("--threads-per-trial", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--trials", type=int, default=0, help="0: two waves of the widest layout")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--train-samples", type=int, default=45000)
+    parser.add_argument("--val-samples", type=int, default=5000)
+    args = parser.parse_args()
+
+    _, y = load_train(args.cifar_dir)
+    perm = np.random.default_rng(0).permutation(len(y)).astype(np.int32)
+    spec = CifarLoaderSpec(
+        cifar_dir=args.cifar_dir,
+        train_idx=perm[: args.train_samples],
+        val_idx=perm[args.train_samples: args.train_samples + args.val_samples],
+    )
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    n_trials = args.trials or 2 * cpus // min(args.threads_per_trial)
+    configs = sample({"lr": [1e-3], "batch_size": [128]}, n_trials)
+
+    # fixed-length trials (no early stopping): measures raw trial throughput
+    print(f"cpus={cpus} trials={n_trials} epochs/trial={args.epochs} train_samples={args.train_samples}")
+    print(f"{'threads':>8} {'workers':>8} {'elapsed_s':>10} {'trials/h':>10} {'epochs/h':>10} {'best_val':>9}")
+    for threads in args.threads_per_trial:
+        with tempfile.TemporaryDirectory(prefix="sweep-bench-") as out_dir:
+            result = run_sweep(spec, configs, out_dir, scheduler="fifo", max_epochs=args.epochs, threads_per_trial=threads)
+        s = result.summary()
+        print(
+            f"{threads:>8} {s['workers']:>8} {s['elapsed_s']:>10.1f} {s['trials_per_hour']:>10.0f} "
+            f"{s['epochs_per_hour']:>10.0f} {s['best_val_acc']:>9.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
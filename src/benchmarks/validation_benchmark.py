@@ -0,0 +1,34 @@
+import argparse
+import os
+import tempfile
+import time
+
+from src.utils.cifar_store import build_store
+from src.utils.data_validation import validate_dataset
+from src.utils.settings import DATA_RAW_DIR
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Full-dataset validation (6 batches) across pool sizes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 6])
+    parser.add_argument("--sample-rows", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    cifar_dir = os.path.join(DATA_RAW_DIR, "cifar-10-batches-py")
+    build_store(cifar_dir)  # exclude the one-off pickle -> memmap conversion
+    # throwaway baseline so the benchmark never writes the real one
+    baseline = os.path.join(tempfile.mkdtemp(prefix="validation-bench-"), "baseline.json")
+
+    print(f"{'workers':>8} {'best_s':>8} {'mean_s':>8} {'passed':>7} {'dups':>6}")
+    for w in args.workers:
+        times = []
+        for _ in range(args.repeats):
+            t0 = time.perf_counter()
+            report = validate_dataset(cifar_dir, workers=w, sample_rows=args.sample_rows, baseline_path=baseline)
+            times.append(time.perf_counter() - t0)
+        print(f"{w:>8} {min(times):>8.3f} {sum(times) / len(times):>8.3f} {str(report.passed):>7} {report.duplicate_rows:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from src.steps.training.train import SimpleCNN
+from src.utils.batch_inference import BatchInferenceEngine
+from src.utils.cifar_store import ROW_SIZE
+from src.utils.version_compare import compare_versions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Champion/challenger scoring vs monitoring a single model")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--versions", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    rng = np.random.default_rng(0)
+    X_u8 = rng.integers(0, 256, size=(args.rows, ROW_SIZE), dtype=np.uint8)
+    y = rng.integers(0, 10, size=args.rows)
+    rows = np.arange(args.rows)
+    torch.manual_seed(0)
+    models = {str(i + 1): SimpleCNN().eval() for i in range(max(args.versions))}
+
+    # baseline: what collect_inference_data pays today for one model
+    engine = BatchInferenceEngine(models["1"], batch_size=args.batch_size)
+    t0 = time.perf_counter()
+    for _ in engine.iter_probs(X_u8, rows):
+        pass
+    single_s = time.perf_counter() - t0
+    print(f"single model: {single_s:.3f}s ({args.rows / single_s:.0f} rows/s)")
+
+    print(f"{'versions':>8} {'shared(s)':>10} {'vs_single':>10} {'sequential(s)':>14} {'rows':>9}")
+    for n in args.versions:
+        subset = {v: models[v] for v in list(models)[:n]}
+        table, _, shared_s = compare_versions(subset, X_u8, y, rows, batch_size=args.batch_size)
+        # same work without sharing: one full decode + scoring pass per version
+        t0 = time.perf_counter()
+        for model in subset.values():
+            for _ in BatchInferenceEngine(model, batch_size=args.batch_size).iter_probs(X_u8, rows):
+                pass
+        sequential_s = time.perf_counter() - t0
+        print(f"{n:>8} {shared_s:>10.3f} {shared_s / single_s:>10.2f} {sequential_s:>14.3f} {table.num_rows:>9}")
+
+
+if __name__ == "__main__":
+    main()
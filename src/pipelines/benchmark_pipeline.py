@@ -0,0 +1,40 @@
+from typing import List, Optional
+from zenml import pipeline
+from src.steps.training.validate_data import validate_data
+from src.steps.training.split_data import split_data
+from src.steps.training.preprocess import preprocess
+from src.steps.training.train import train
+from src.steps.training.evaluate import evaluate
+from src.steps.training.register_model import register_model
+from src.steps.training.export_model import export_model
+from src.steps.monitoring.load_latest_model import load_latest_model
+from src.steps.monitoring.collect_inference_data import collect_inference_data
+from src.steps.monitoring.detect_drift import detect_drift
+from src.steps.monitoring.detect_embedding_drift import detect_embedding_drift
+from src.steps.monitoring.run_evidently_report import run_evidently_report
+from src.steps.monitoring.trigger_decision import trigger_decision
+from src.steps.monitoring.store_monitoring_artifacts import store_monitoring_artifacts
+
+# Used by src/benchmarks/pipeline_benchmark.py on a synthetic dataset: the same
+# steps as training_pipeline / monitoring_pipeline, minus everything that needs
+# the Docker services (dvc pull, MinIO upload) or side effects (retrain queue).
+
+@pipeline(enable_cache=False)
+def benchmark_training_pipeline(cifar_dir: str, epochs: int = 1, export_batch_sizes: Optional[List[int]] = None):
+    cifar_dir = validate_data(cifar_dir, use_cache=False)
+    split_out = split_data(cifar_dir, use_cache=False)
+    preprocess_out = preprocess(split_out)
+    trained_model = train(preprocess_out, epochs=epochs)
+    _ = evaluate(trained_model, preprocess_out)
+    model_uri = register_model(trained_model)
+    _ = export_model(trained_model, preprocess_out, model_uri, batch_sizes=export_batch_sizes)
+
+@pipeline(enable_cache=False)
+def benchmark_monitoring_pipeline(n_samples: int = 2000):
+    model = load_latest_model()
+    inference_path = collect_inference_data(model, n_samples=n_samples)
+    drift, drift_report_path = detect_drift(inference_path)
+    embedding_drift = detect_embedding_drift(inference_path)
+    _ = trigger_decision(drift, embedding_drift, run_retrain=False)
+    html_report_path, json_report_path = run_evidently_report(inference_path, after="trigger_decision")
+    _ = store_monitoring_artifacts(drift, drift_report_path, html_report_path, json_report_path)
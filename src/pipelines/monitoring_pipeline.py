@@ -1,17 +1,50 @@
+import argparse
 from zenml import pipeline
 from src.steps.monitoring.load_latest_model import load_latest_model
 from src.steps.monitoring.collect_inference_data import collect_inference_data
+from src.steps.monitoring.detect_drift import detect_drift
+from src.steps.monitoring.detect_embedding_drift import detect_embedding_drift
 from src.steps.monitoring.run_evidently_report import run_evidently_report
 from src.steps.monitoring.trigger_decision import trigger_decision
 from src.steps.monitoring.store_monitoring_artifacts import store_monitoring_artifacts
+from src.steps.monitoring.compare_model_versions import compare_model_versions
 
 @pipeline
-def monitoring_pipeline():
+def monitoring_pipeline(
+    current_hours: float = 0.0,
+    evidently_html: bool = True,
+    compare_versions: bool = False,
+    promote: bool = False,
+):
     model = load_latest_model()
     inference_path = collect_inference_data(model)
-    html_report_path, json_report_path = run_evidently_report(inference_path)
-    _ = trigger_decision(json_report_path)
-    _ = store_monitoring_artifacts(html_report_path, json_report_path)
+    drift, drift_report_path = detect_drift(inference_path, current_hours=current_hours)
+    embedding_drift = detect_embedding_drift(inference_path, current_hours=current_hours)
+    _ = trigger_decision(drift, embedding_drift)
+    if evidently_html:
+        # deferred: the Evidently rendering no longer sits on the decision path
+        html_report_path, json_report_path = run_evidently_report(
+            inference_path, current_hours=current_hours, after="trigger_decision"
+        )
+        _ = store_monitoring_artifacts(drift, drift_report_path, html_report_path, json_report_path)
+    else:
+        _ = store_monitoring_artifacts(drift, drift_report_path)
+    if compare_versions:
+        # champion vs challengers on one shared batch; independent of the drift path
+        _ = compare_model_versions(promote=promote)
 
 if __name__ == "__main__":
-    monitoring_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    # > 0: last N hours of the inference store instead of the halves of the latest run
+    parser.add_argument("--current-hours", type=float, default=0.0)
+    parser.add_argument("--no-html", action="store_true")
+    parser.add_argument("--compare-versions", action="store_true", help="champion/challenger comparison")
+    parser.add_argument("--promote", action="store_true", help="move the champion alias to a significantly better challenger")
+    args = parser.parse_args()
+
+    monitoring_pipeline(
+        current_hours=args.current_hours,
+        evidently_html=not args.no_html,
+        compare_versions=args.compare_versions,
+        promote=args.promote,
+    )
@@ -0,0 +1,32 @@
+from src.pipelines.training_pipeline import training_pipeline
+from src.utils.retrain_queue import run_worker
+from src.utils.tracking import step_run
+
+
+def _run_job(args: dict) -> None:
+    training_pipeline(**args)
+
+
+def _record(outcome: dict) -> None:
+    print(f"[retrain_worker] job={outcome['job_id']} status={outcome['status']} "
+          f"queue_latency_s={outcome['queue_latency_s']:.1f} duration_s={outcome['duration_s']:.1f}")
+    with step_run("retrain_job") as tracker:
+        tracker.log_params(
+            {
+                "retrain_job_id": outcome["job_id"],
+                "retrain_reason": outcome["reason"],
+                "retrain_status": outcome["status"],
+            }
+        )
+        tracker.log_metrics(
+            {
+                "retrain_queue_latency_s": outcome["queue_latency_s"],
+                "retrain_duration_s": outcome["duration_s"],
+                "retrain_succeeded": float(outcome["status"] == "succeeded"),
+            }
+        )
+
+
+if __name__ == "__main__":
+    # the training stack is imported once and reused for every queued job
+    run_worker(_run_job, on_done=_record)
@@ -0,0 +1,81 @@
+import argparse
+import json
+from typing import Optional
+from zenml import pipeline
+from src.steps.training.ingest_data import ingest_data
+from src.steps.training.validate_data import validate_data
+from src.steps.training.split_data import split_data
+from src.steps.training.load_cached_split import load_cached_split
+from src.steps.training.preprocess import preprocess
+from src.steps.training.hparam_sweep import hparam_sweep
+from src.steps.training.evaluate import evaluate
+from src.steps.training.register_model import register_model
+from src.steps.training.export_model import export_model
+from src.utils.step_cache import cached_split
+
+@pipeline(enable_cache=False)
+def sweep_pipeline(
+    space: Optional[dict] = None,
+    mode: str = "random",
+    n_trials: int = 16,
+    scheduler: str = "asha",
+    min_epochs: int = 1,
+    max_epochs: int = 9,
+    eta: int = 3,
+    workers: int = 0,
+    threads_per_trial: int = 2,
+    use_step_cache: bool = True,
+    test_size: float = 0.1,
+    random_state: int = 42,
+):
+    # same data path as training_pipeline (the data is already in MinIO from it)
+    if use_step_cache and cached_split(test_size, random_state) is not None:
+        split_out = load_cached_split(test_size=test_size, random_state=random_state)
+    else:
+        cifar_dir = ingest_data(use_cache=use_step_cache)
+        cifar_dir = validate_data(cifar_dir, use_cache=use_step_cache)
+        split_out = split_data(cifar_dir, test_size=test_size, random_state=random_state, use_cache=use_step_cache)
+    preprocess_out = preprocess(split_out)
+    model, _ = hparam_sweep(
+        preprocess_out,
+        space=space,
+        mode=mode,
+        n_trials=n_trials,
+        scheduler=scheduler,
+        min_epochs=min_epochs,
+        max_epochs=max_epochs,
+        eta=eta,
+        workers=workers,
+        threads_per_trial=threads_per_trial,
+    )
+    # only the best trial is evaluated, registered and exported
+    _ = evaluate(model, preprocess_out)
+    model_uri = register_model(model)
+    _ = export_model(model, preprocess_out, model_uri)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--space", type=json.loads, default=None, help='e.g. \'{"lr": [1e-3, 3e-3], "batch_size": [128, 256]}\'')
+    parser.add_argument("--mode", choices=["random", "grid"], default="random")
+    parser.add_argument("--trials", type=int, default=16)
+    parser.add_argument("--scheduler", choices=["asha", "fifo"], default="asha")
+    parser.add_argument("--min-epochs", type=int, default=1)
+    parser.add_argument("--max-epochs", type=int, default=9)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--threads-per-trial", type=int, default=2)
+    parser.add_argument("--no-step-cache", action="store_true")
+    args = parser.parse_args()
+
+    sweep_pipeline(
+        space=args.space,
+        mode=args.mode,
+        n_trials=args.trials,
+        scheduler=args.scheduler,
+        min_epochs=args.min_epochs,
+        max_epochs=args.max_epochs,
+        eta=args.eta,
+        workers=args.workers,
+        threads_per_trial=args.threads_per_trial,
+        use_step_cache=not args.no_step_cache,
+    )  # ZenML will run it
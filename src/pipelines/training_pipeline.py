@@ -1,25 +1,66 @@
+import argparse
 from zenml import pipeline
 from src.steps.training.ingest_data import ingest_data
 from src.steps.training.upload_data_to_minio import upload_data_to_minio
 from src.steps.training.validate_data import validate_data
 from src.steps.training.split_data import split_data
+from src.steps.training.load_cached_split import load_cached_split
 from src.steps.training.preprocess import preprocess
 from src.steps.training.train import train
 from src.steps.training.evaluate import evaluate
 from src.steps.training.register_model import register_model
 from src.steps.training.export_model import export_model
+from src.utils.step_cache import StepCache, cached_split, upload_current
 
 @pipeline(enable_cache=False)
-def training_pipeline():
-    cifar_dir = ingest_data()
-    _ = upload_data_to_minio(cifar_dir)
-    cifar_dir = validate_data(cifar_dir)
-    split_out = split_data(cifar_dir)
+def training_pipeline(
+    epochs: int = 3,
+    lr: float = 1e-3,
+    warm_start: bool = False,
+    resume: bool = False,
+    upload_data: bool = True,
+    use_step_cache: bool = True,
+    test_size: float = 0.1,
+    random_state: int = 42,
+):
+    if (
+        use_step_cache
+        and cached_split(test_size, random_state) is not None
+        and (not upload_data or upload_current())
+    ):
+        # data and split params unchanged since a previous run, and this data version
+        # (files and record shards) already in MinIO when an upload is wanted: straight to preprocess/train
+        split_out = load_cached_split(test_size=test_size, random_state=random_state)
+    else:
+        cifar_dir = ingest_data(use_cache=use_step_cache)
+        if upload_data:
+            _ = upload_data_to_minio(cifar_dir)
+        cifar_dir = validate_data(cifar_dir, use_cache=use_step_cache)
+        split_out = split_data(cifar_dir, test_size=test_size, random_state=random_state, use_cache=use_step_cache)
     preprocess_out = preprocess(split_out)
-    trained_model = train(preprocess_out)
+    trained_model = train(preprocess_out, epochs=epochs, lr=lr, warm_start=warm_start, resume=resume)
     _ = evaluate(trained_model, preprocess_out)
-    _ = register_model(trained_model)
-    _ = export_model(trained_model)
+    model_uri = register_model(trained_model)
+    _ = export_model(trained_model, preprocess_out, model_uri)
 
 if __name__ == "__main__":
-    training_pipeline()  # ZenML will run it
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    # fine-tune: warm start from the latest registered version, skip the MinIO re-upload
+    parser.add_argument("--fine-tune", action="store_true")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--no-step-cache", action="store_true")
+    parser.add_argument("--clear-step-cache", action="store_true")
+    args = parser.parse_args()
+    if args.clear_step_cache:
+        print(f"[training_pipeline] step cache: {StepCache().invalidate()} entries removed")
+
+    training_pipeline(
+        epochs=args.epochs,
+        lr=args.lr,
+        warm_start=args.fine_tune,
+        resume=args.resume,
+        upload_data=not args.fine_tune,
+        use_step_cache=not args.no_step_cache,
+    )  # ZenML will run it
@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import queue
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import torch
+import torch.nn.functional as F
+
+from src.utils.batch_inference import INFERENCE_SCHEMA, NUM_CLASSES
+from src.utils.cifar_dataset import normalize_batch
+from src.utils.cifar_store import ROW_SIZE
+from src.utils.inference_store import append_table
+from src.utils.settings import ARTIFACTS_DIR, INFERENCE_STORE_DIR
+
+
+class ReplicaPool:
+    # N warm TorchScript replicas, each used by one executor thread at a time
+    def __init__(self, model_path: str, replicas: int, threads_per_replica: int):
+        torch.set_num_threads(threads_per_replica)
+        self.free: "queue.Queue[torch.jit.ScriptModule]" = queue.Queue()
+        for _ in range(replicas):
+            m = torch.jit.load(model_path, map_location="cpu").eval()
+            with torch.inference_mode():
+                m(torch.zeros(1, 3, 32, 32))  # warm-up: first call triggers graph optimization
+            self.free.put(m)
+        self.executor = ThreadPoolExecutor(replicas, thread_name_prefix="replica")
+        self.replicas = replicas
+
+    def _run(self, x_u8: torch.Tensor) -> np.ndarray:
+        model = self.free.get()
+        try:
+            with torch.inference_mode():
+                return F.softmax(model(normalize_batch(x_u8)), dim=1).numpy()
+        finally:
+            self.free.put(model)
+
+    async def predict(self, x_u8: torch.Tensor) -> np.ndarray:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._run, x_u8)
+
+
+class InferenceLog:
+    # buffers served predictions and appends them to the partitioned inference
+    # store with the schema collect_inference_data writes (true_class = -1 when unknown)
+    def __init__(self, store_dir: str = INFERENCE_STORE_DIR, flush_rows: int = 4096, flush_s: float = 30.0):
+        self.store_dir = store_dir
+        self.flush_rows = flush_rows
+        self.flush_s = flush_s
+        self.rows: List[Tuple[np.ndarray, int, int]] = []
+        self.last_flush = time.monotonic()
+
+    def append(self, probs: np.ndarray, true_class: List[int]) -> None:
+        ts = int(time.time())
+        self.rows.extend((p, t, ts) for p, t in zip(probs, true_class))
+
+    def due(self) -> bool:
+        return len(self.rows) >= self.flush_rows or (bool(self.rows) and time.monotonic() - self.last_flush >= self.flush_s)
+
+    def take(self) -> List[Tuple[np.ndarray, int, int]]:
+        # called on the event loop thread; the returned rows are written off-loop
+        self.last_flush = time.monotonic()
+        rows, self.rows = self.rows, []
+        return rows
+
+    def write(self, rows: List[Tuple[np.ndarray, int, int]]) -> int:
+        if not rows:
+            return 0
+        probs = np.stack([r[0] for r in rows]).astype(np.float32)
+        columns = [pa.array(probs[:, i]) for i in range(NUM_CLASSES)]
+        columns += [
+            pa.array(probs.argmax(axis=1).astype(np.int64)),
+            pa.array(np.array([r[1] for r in rows], dtype=np.int64)),
+            pa.array(np.array([r[2] for r in rows], dtype=np.int64)),
+        ]
+        return append_table(pa.Table.from_arrays(columns, schema=INFERENCE_SCHEMA), self.store_dir)
+
+
+class DynamicBatcher:
+    # Coalesces concurrent requests until `max_batch` images are queued or the
+    # oldest one has waited `max_wait_us`, then dispatches to a free replica.
+    def __init__(self, pool: ReplicaPool, log: Optional[InferenceLog], max_batch: int = 64, max_wait_us: int = 2000):
+        self.pool = pool
+        self.log = log
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_us / 1e6
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.inflight = asyncio.Semaphore(pool.replicas)
+        self.latencies = deque(maxlen=20000)
+        self.batch_sizes = deque(maxlen=20000)
+        self.served = 0
+        self.started = time.monotonic()
+
+    async def submit(self, x_u8: np.ndarray, label: int = -1) -> np.ndarray:
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((x_u8, label, fut, time.perf_counter()))
+        return await fut
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait_s
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self.inflight.acquire()
+            asyncio.create_task(self._dispatch(items))
+
+    async def _dispatch(self, items) -> None:
+        try:
+            x = torch.from_numpy(np.stack([it[0] for it in items]))
+            try:
+                probs = await self.pool.predict(x)
+            except Exception as e:
+                for it in items:
+                    if not it[2].done():
+                        it[2].set_exception(e)
+                return
+            now = time.perf_counter()
+            for it, p in zip(items, probs):
+                if not it[2].done():
+                    it[2].set_result(p)
+                self.latencies.append(now - it[3])
+            self.batch_sizes.append(len(items))
+            self.served += len(items)
+            if self.log is not None:
+                self.log.append(probs, [it[1] for it in items])
+                if self.log.due():
+                    await asyncio.get_running_loop().run_in_executor(None, self.log.write, self.log.take())
+        finally:
+            self.inflight.release()
+
+    def metrics(self) -> Dict[str, float]:
+        lat = np.array(self.latencies) * 1000.0 if self.latencies else np.zeros(1)
+        return {
+            "served": self.served,
+            "queue_depth": self.queue.qsize(),
+            "latency_p50_ms": float(np.percentile(lat, 50)),
+            "latency_p99_ms": float(np.percentile(lat, 99)),
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            "qps": self.served / max(time.monotonic() - self.started, 1e-9),
+        }
+
+
+def _decode_image(payload: Dict) -> np.ndarray:
+    if "image_b64" in payload:
+        x = np.frombuffer(base64.b64decode(payload["image_b64"]), dtype=np.uint8)
+    else:
+        x = np.asarray(payload["image"], dtype=np.uint8).reshape(-1)
+    if x.size != ROW_SIZE:
+        raise ValueError(f"expected {ROW_SIZE} uint8 CHW pixels, got {x.size}")
+    return x
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, body: Dict) -> None:
+    data = json.dumps(body).encode()
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+    writer.write(
+        f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(data)}\r\nConnection: keep-alive\r\n\r\n".encode() + data
+    )
+    await writer.drain()
+
+
+def make_handler(batcher: DynamicBatcher):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # minimal HTTP/1.1 with keep-alive: POST /predict, GET /metrics, GET /healthz
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split(" ", 2)
+                length = 0
+                try:
+                    if len(parts) != 3:
+                        raise ValueError(f"malformed request line {request_line[:64]!r}")
+                    method, path, _ = parts
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        if name.strip().lower() == "content-length":
+                            length = int(value.strip())
+                            if length < 0:
+                                raise ValueError(f"negative Content-Length {length}")
+                except ValueError as e:
+                    # framing is unknown past a bad request line or header: answer and close
+                    await _respond(writer, 400, {"error": str(e)})
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                if method == "GET" and path == "/healthz":
+                    await _respond(writer, 200, {"status": "ok"})
+                elif method == "GET" and path == "/metrics":
+                    await _respond(writer, 200, batcher.metrics())
+                elif method == "POST" and path == "/predict":
+                    try:
+                        payload = json.loads(body)
+                        if not isinstance(payload, dict):
+                            raise ValueError(f"expected a JSON object, got {type(payload).__name__}")
+                        x = _decode_image(payload)
+                        label = int(payload.get("label", -1))
+                    except (ValueError, KeyError, TypeError) as e:
+                        await _respond(writer, 400, {"error": str(e)})
+                        continue
+                    try:
+                        probs = await batcher.submit(x, label)
+                    except Exception as e:
+                        await _respond(writer, 500, {"error": repr(e)})
+                        continue
+                    await _respond(writer, 200, {"pred_class": int(probs.argmax()), "probs": probs.tolist()})
+                else:
+                    await _respond(writer, 404, {"error": f"no route {method} {path}"})
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(
+    model_path: str,
+    host: str,
+    port: int,
+    replicas: int,
+    max_batch: int,
+    max_wait_us: int,
+    log_predictions: bool = True,
+) -> None:
+    threads = max(1, (os.cpu_count() or 1) // replicas)
+    pool = ReplicaPool(model_path, replicas, threads)
+    log = InferenceLog() if log_predictions else None
+    batcher = DynamicBatcher(pool, log, max_batch=max_batch, max_wait_us=max_wait_us)
+    batcher_task = asyncio.create_task(batcher.run())
+    server = await asyncio.start_server(make_handler(batcher), host, port)
+    print(f"[prediction_server] {host}:{port} replicas={replicas} threads/replica={threads} "
+          f"max_batch={max_batch} max_wait_us={max_wait_us}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher_task.cancel()
+        if log is not None:
+            log.write(log.take())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dynamic-batching prediction server for the TorchScript export")
+    parser.add_argument("--model", default=os.path.join(ARTIFACTS_DIR, "model_torchscript.pt"))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-us", type=int, default=2000)
+    parser.add_argument("--no-log", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(serve(args.model, args.host, args.port, args.replicas, args.max_batch, args.max_wait_us, not args.no_log))
+
+
+if __name__ == "__main__":
+    main()
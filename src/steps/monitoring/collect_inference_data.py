@@ -1,46 +1,75 @@
 from zenml import step
-import os, time
-import pandas as pd
+import os
+import time
 import numpy as np
 import torch
-import torch.nn.functional as F
-import pickle
-from src.utils.settings import MONITORING_DIR, DATA_RAW_DIR, SIMULATE_DRIFT
-
-def _load_test_batch(cifar_dir: str):
-    p = os.path.join(cifar_dir, "test_batch")
-    with open(p, "rb") as f:
-        d = pickle.load(f, encoding="bytes")
-    X = d[b"data"].reshape(-1, 3, 32, 32).astype(np.float32) / 255.0
-    y = np.array(d[b"labels"])
-    return X, y
+from src.utils.batch_inference import BatchInferenceEngine, brightness_drift, split_head
+from src.utils.cifar_store import load_test
+from src.utils.embedding_drift import EMBED_DIM, LATEST_RESERVOIRS, STATS_DIM, Reservoir, ReservoirStore
+from src.utils.inference_store import append_file, compact
+from src.utils.settings import ARTIFACTS_DIR, MONITORING_DIR, DATA_RAW_DIR, SIMULATE_DRIFT
+from src.utils.instrumentation import instrumented
 
 @step(enable_cache=False)
-def collect_inference_data(model: torch.nn.Module, n_samples: int = 200) -> str:
+@instrumented
+def collect_inference_data(
+    model: torch.nn.Module,
+    n_samples: int = 200,
+    batch_size: int = 512,
+    use_torchscript: bool = False,
+    compact_store: bool = True,
+    capture_embeddings: bool = True,
+    reservoir_size: int = 2000,
+) -> str:
     os.makedirs(MONITORING_DIR, exist_ok=True)
     cifar_dir = os.path.join(DATA_RAW_DIR, "cifar-10-batches-py")
 
-    X, y = _load_test_batch(cifar_dir)
-    idx = np.random.choice(len(X), size=n_samples, replace=False)
-    X = X[idx]
-    y = y[idx]
+    X_u8, y = load_test(cifar_dir)
+    # n_samples <= 0 scores the whole test set
+    if 0 < n_samples < len(X_u8):
+        rows = np.random.choice(len(X_u8), size=n_samples, replace=False)
+    else:
+        rows = np.arange(len(X_u8))
+
+    torchscript_path = os.path.join(ARTIFACTS_DIR, "model_torchscript.pt")
+    if use_torchscript and os.path.exists(torchscript_path):
+        engine = BatchInferenceEngine.from_torchscript(torchscript_path, batch_size=batch_size)
+    else:
+        engine = BatchInferenceEngine(model, batch_size=batch_size)  # ModelCache loads on CPU
 
     # simulate drift: strong brightness shift
-    if SIMULATE_DRIFT:
-        X = np.clip(X * 0.5 + 0.4, 0, 1)
+    transform = brightness_drift if SIMULATE_DRIFT else None
 
-    model.eval()
-    with torch.no_grad():
-        logits = model(torch.tensor(X))
-        probs = F.softmax(logits, dim=1).numpy()
-        pred = probs.argmax(axis=1)
+    # bounded embedding samples: one over the run (folded into its hour) and one per
+    # half of the run, mirroring the reference/current halves of inference.parquet
+    on_features = None
+    if capture_embeddings and split_head(engine.model) is not None:
+        dim = EMBED_DIM + STATS_DIM
+        run_res = Reservoir(dim, reservoir_size)
+        halves = [Reservoir(dim, reservoir_size), Reservoir(dim, reservoir_size)]
+        mid = len(rows) // 2
 
-    df = pd.DataFrame(probs, columns=[f"proba_{i}" for i in range(10)])
-    df["pred_class"] = pred
-    df["true_class"] = y
-    df["ts"] = int(time.time())
+        def on_features(sl: slice, feats: np.ndarray) -> None:
+            run_res.add(feats)
+            first = np.arange(sl.start, sl.stop) < mid
+            halves[0].add(feats[first])
+            halves[1].add(feats[~first])
 
     out_path = os.path.join(MONITORING_DIR, "inference.parquet")
-    df.to_parquet(out_path, index=False)
+    stats = engine.score_to_parquet(X_u8, y, rows, out_path, transform=transform, on_features=on_features)
+    print(f"[collect_inference_data] rows={stats['rows']} rows_per_sec={stats['rows_per_sec']:.0f}")
+
+    for path in LATEST_RESERVOIRS:
+        if os.path.exists(path):
+            os.remove(path)
+    if on_features is not None:
+        ReservoirStore().merge(run_res, int(time.time()))
+        for res, path in zip(halves, LATEST_RESERVOIRS):
+            res.save(path)
+
+    # inference.parquet is the latest run only; history accumulates in the partitioned store
+    appended = append_file(out_path)
+    compacted = compact() if compact_store else {}
+    print(f"[collect_inference_data] appended={appended} to store, compaction={compacted}")
 
-    return out_path
\ No newline at end of file
+    return out_path
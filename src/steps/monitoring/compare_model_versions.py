@@ -0,0 +1,111 @@
+from zenml import step
+from zenml import get_step_context
+import json
+import os
+import numpy as np
+from typing import List, Optional
+from typing_extensions import Annotated
+from src.utils.batch_inference import brightness_drift
+from src.utils.cifar_store import load_test
+from src.utils.inference_store import append_table, compact
+from src.utils.model_cache import ModelCache
+from src.utils.model_registry import set_alias
+from src.utils.settings import COMPARISON_STORE_DIR, DATA_RAW_DIR, MODEL_NAME, MONITORING_DIR, SIMULATE_DRIFT
+from src.utils.tracking import step_run
+from src.utils.version_compare import compare_versions, promotion_candidate, select_versions
+from src.utils.instrumentation import instrumented
+
+@step(enable_cache=False)
+@instrumented
+def compare_model_versions(
+    versions: Optional[List[str]] = None,
+    n_challengers: int = 1,
+    champion_alias: str = "champion",
+    n_samples: int = 2000,
+    batch_size: int = 512,
+    workers: int = 0,
+    use_torchscript: bool = False,
+    compact_store: bool = True,
+    promote: bool = False,
+    min_accuracy_gain: float = 0.005,
+    alpha: float = 0.05,
+    max_latency_ratio: float = 1.5,
+) -> Annotated[dict, "version_comparison"]:
+    selected = select_versions(MODEL_NAME, versions, n_challengers, champion_alias)
+    cache = ModelCache()
+    models, loads = {}, {}
+    for version in selected:
+        models[version], loads[version] = cache.load(prefer_torchscript=use_torchscript, version=version)
+
+    # one shared sample for every version, same sampling as collect_inference_data
+    X_u8, y = load_test(os.path.join(DATA_RAW_DIR, "cifar-10-batches-py"))
+    if 0 < n_samples < len(X_u8):
+        rows = np.random.choice(len(X_u8), size=n_samples, replace=False)
+    else:
+        rows = np.arange(len(X_u8))
+    transform = brightness_drift if SIMULATE_DRIFT else None
+
+    table, stats, wall_s = compare_versions(models, X_u8, y, rows, transform, batch_size=batch_size, workers=workers)
+    # every version's rows in a single append; the drift store keeps one row per input
+    appended = append_table(table, COMPARISON_STORE_DIR, sketch_dir=None)
+    compacted = compact(COMPARISON_STORE_DIR) if compact_store else {}
+    for s in stats:
+        print(
+            f"[compare_model_versions] v{s.version} {s.role} acc={s.accuracy:.4f} disagreement={s.disagreement:.4f} "
+            f"fixes={s.fixes} regressions={s.regressions} p={s.mcnemar_p:.4f} p95={s.latency_ms_p95:.1f}ms"
+        )
+
+    candidate = promotion_candidate(stats, min_accuracy_gain, alpha, max_latency_ratio)
+    promoted = ""
+    if promote and candidate is not None:
+        set_alias(MODEL_NAME, candidate.version, champion_alias)
+        promoted = candidate.version
+    print(f"[compare_model_versions] rows={appended} wall_s={wall_s:.3f} candidate={candidate and candidate.version} promoted={promoted or None}")
+
+    report = {
+        "champion": selected[0],
+        "challengers": selected[1:],
+        "rows": len(rows),
+        "wall_s": wall_s,
+        "candidate": candidate.version if candidate is not None else "",
+        "promoted": promoted,
+        "versions": [{**s.as_dict(), "format": loads[s.version]["format"], "load_s": loads[s.version]["load_s"]} for s in stats],
+    }
+    os.makedirs(MONITORING_DIR, exist_ok=True)
+    report_path = os.path.join(MONITORING_DIR, "version_comparison.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    with step_run("compare_model_versions") as tracker:
+        tracker.log_params(
+            {
+                "champion_version": selected[0],
+                "challenger_versions": ",".join(selected[1:]),
+                "comparison_samples": len(rows),
+                "comparison_workers": workers or len(selected),
+                "min_accuracy_gain": min_accuracy_gain,
+                "mcnemar_alpha": alpha,
+                "max_latency_ratio": max_latency_ratio,
+            }
+        )
+        metrics = {"comparison_wall_s": wall_s, "comparison_rows_per_sec": len(rows) / max(wall_s, 1e-9)}
+        for s in stats:
+            metrics.update(s.metrics())
+        tracker.log_metrics(metrics)
+        tracker.set_tags({"promotion_candidate": report["candidate"] or "none", "promoted": promoted or "none"})
+        tracker.log_artifact(report_path)
+
+    get_step_context().add_output_metadata(
+        output_name="version_comparison",
+        metadata={
+            "champion": selected[0],
+            "challengers": ",".join(selected[1:]),
+            "candidate": report["candidate"],
+            "promoted": promoted,
+            "wall_s": float(wall_s),
+            "rows_appended": appended,
+            "partitions_compacted": compacted.get("partitions_compacted", 0),
+            **{k: v for s in stats for k, v in s.metrics().items()},
+        },
+    )
+    return report
@@ -0,0 +1,71 @@
+from zenml import step
+from zenml import get_step_context
+import json
+import os
+import time
+import numpy as np
+from typing import Tuple
+from typing_extensions import Annotated
+from src.utils.drift import DriftResult, compute_drift
+from src.utils.drift_sketch import SKETCH_HOUR_S, SketchStore, class_drift, sketch_drift
+from src.utils.inference_store import hour_window_bounds, load_windows
+from src.utils.settings import MONITORING_DIR
+from src.utils.instrumentation import instrumented
+
+@step(enable_cache=False)
+@instrumented
+def detect_drift(
+    inference_path: str,
+    current_hours: float = 0.0,
+    reference_start_ts: int = 0,
+    reference_end_ts: int = 0,
+    stattest: str = "auto",
+    from_sketches: bool = True,
+) -> Tuple[
+    Annotated[DriftResult, "drift"],
+    Annotated[str, "drift_report_path"],
+]:
+    start = time.perf_counter()
+    num_cols = [f"proba_{i}" for i in range(10)]
+    extra = {}
+    source = "sketch" if current_hours > 0 and from_sketches else "rows"
+    if source == "sketch":
+        # rolling windows from the persisted hourly sketches: O(sketch), no row scan;
+        # whole, disjoint hours so no sketch lands in both windows
+        (ref_start, ref_end), (cur_start, cur_end) = hour_window_bounds(
+            current_hours, reference_start_ts, reference_end_ts, hour_s=SKETCH_HOUR_S
+        )
+        store = SketchStore()
+        ref_sk, cur_sk = store.window(ref_start, ref_end), store.window(cur_start, cur_end)
+        if ref_sk is None or cur_sk is None:
+            raise ValueError("No drift sketch in the reference or current window (see rebuild_sketches).")
+        drift = sketch_drift(ref_sk, cur_sk, num_cols, stattest=stattest)
+        extra = class_drift(ref_sk, cur_sk)
+    else:
+        ref_tbl, cur_tbl = load_windows(inference_path, num_cols, current_hours, reference_start_ts, reference_end_ts)
+        reference = np.column_stack([ref_tbl.column(c).to_numpy() for c in num_cols])
+        current = np.column_stack([cur_tbl.column(c).to_numpy() for c in num_cols])
+        drift = compute_drift(reference, current, num_cols, stattest=stattest)
+    elapsed = time.perf_counter() - start
+    print(f"[detect_drift] drift_share={drift.drift_share:.4f} stattest={drift.stattest} source={source} elapsed_s={elapsed:.4f}")
+
+    os.makedirs(MONITORING_DIR, exist_ok=True)
+    report_path = os.path.join(MONITORING_DIR, "drift_report.json")
+    with open(report_path, "w") as f:
+        json.dump({**drift.as_dict(), **extra, "source": source, "elapsed_s": elapsed, "current_hours": current_hours}, f, indent=2)
+
+    get_step_context().add_output_metadata(
+        output_name="drift",
+        metadata={
+            "drift_share": drift.drift_share,
+            "stattest": drift.stattest,
+            "rows_reference": drift.rows_reference,
+            "rows_current": drift.rows_current,
+            "num_columns_monitored": drift.n_columns,
+            "source": source,
+            "elapsed_s": float(elapsed),
+            **extra,
+        },
+    )
+
+    return drift, report_path
@@ -0,0 +1,43 @@
+from zenml import step
+from zenml import get_step_context
+import os
+import time
+from src.utils.embedding_drift import LATEST_RESERVOIRS, RESERVOIR_HOUR_S, EmbeddingDriftResult, Reservoir, ReservoirStore, embedding_drift
+from src.utils.inference_store import hour_window_bounds
+from src.utils.instrumentation import instrumented
+
+@step(enable_cache=False)
+@instrumented
+def detect_embedding_drift(
+    inference_path: str,
+    current_hours: float = 0.0,
+    reference_start_ts: int = 0,
+    reference_end_ts: int = 0,
+    mmd_alpha: float = 0.01,
+    pca_components: int = 10,
+) -> EmbeddingDriftResult:
+    # inference_path only orders this step after collect_inference_data
+    start = time.perf_counter()
+    if current_hours > 0:
+        # hourly reservoirs: whole, disjoint hours, or both sides would share samples
+        (ref_start, ref_end), (cur_start, cur_end) = hour_window_bounds(
+            current_hours, reference_start_ts, reference_end_ts, hour_s=RESERVOIR_HOUR_S
+        )
+        store = ReservoirStore()
+        reference, current = store.window(ref_start, ref_end), store.window(cur_start, cur_end)
+    elif all(os.path.exists(p) for p in LATEST_RESERVOIRS):
+        reference, current = (Reservoir.load(p) for p in LATEST_RESERVOIRS)
+    else:
+        reference = current = None
+
+    if reference is None or current is None or min(reference.size, current.size) < 10:
+        # no embeddings captured (TorchScript scoring, empty window): not a drift signal
+        print("[detect_embedding_drift] no embedding samples for this window, skipped")
+        result = EmbeddingDriftResult(0.0, 1.0, 0.0, 0.0, False, 0, 0, available=False)
+    else:
+        result = embedding_drift(reference.sample(), current.sample(), mmd_alpha=mmd_alpha, pca_components=pca_components)
+    elapsed = time.perf_counter() - start
+    print(f"[detect_embedding_drift] {result.as_dict()} elapsed_s={elapsed:.4f}")
+
+    get_step_context().add_output_metadata(metadata={**result.as_dict(), "elapsed_s": float(elapsed)})
+    return result
@@ -1,23 +1,15 @@
 from zenml import step
-import mlflow
-import mlflow.pytorch
+from zenml import get_step_context
 import torch
-from src.utils.settings import MLFLOW_TRACKING_URI, MODEL_NAME
-
-
-@step
-def load_latest_model() -> torch.nn.Module:
-    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-    client = mlflow.tracking.MlflowClient()
-
-    versions = client.search_model_versions(
-        filter_string=f"name='{MODEL_NAME}'",
-        max_results=1,
-        order_by=["creation_timestamp DESC"],
-    )
-    if not versions:
-        raise ValueError(f"No registered versions found for model '{MODEL_NAME}'.")
-
-    latest = versions[0]
-    model_uri = f"models:/{MODEL_NAME}/{latest.version}"
-    return mlflow.pytorch.load_model(model_uri)
\ No newline at end of file
+from src.utils.model_cache import ModelCache
+from src.utils.instrumentation import instrumented
+
+
+@step(enable_cache=False)
+@instrumented
+def load_latest_model(prefer_torchscript: bool = False) -> torch.nn.Module:
+    # eager by default: embedding capture in collect_inference_data needs the module tree
+    model, info = ModelCache().load(prefer_torchscript=prefer_torchscript)
+    print(f"[load_latest_model] v{info['model_version']} {info['format']} {info['cache']} in {info['load_s']:.3f}s")
+    get_step_context().add_output_metadata(metadata=info)
+    return model
@@ -1,32 +1,28 @@
 from zenml import step
 from zenml import get_step_context
 import os
-import pandas as pd
 from evidently.report import Report
 from evidently.metric_preset import DataDriftPreset
 from typing import Tuple
 from typing_extensions import Annotated
+from src.utils.inference_store import load_windows
 from src.utils.settings import MONITORING_DIR
+from src.utils.instrumentation import instrumented
 
 @step(enable_cache=False)
+@instrumented
 def run_evidently_report(
     inference_path: str,
+    current_hours: float = 0.0,
+    reference_start_ts: int = 0,
+    reference_end_ts: int = 0,
 ) -> Tuple[
     Annotated[str, "html_report_path"],
     Annotated[str, "json_report_path"],
 ]:
-    df = pd.read_parquet(inference_path)
-
-    if len(df) < 2:
-        raise ValueError("Not enough rows in inference data to compute drift report.")
-
-    # reference = first half, current = last half
-    mid = len(df) // 2
-    reference = df.iloc[:mid].copy()
-    current = df.iloc[mid:].copy()
-
-    # use only numeric columns for drift
-    num_cols = [c for c in df.columns if c.startswith("proba_")]
+    num_cols = [f"proba_{i}" for i in range(10)]
+    ref_tbl, cur_tbl = load_windows(inference_path, num_cols, current_hours, reference_start_ts, reference_end_ts)
+    reference, current = ref_tbl.to_pandas(), cur_tbl.to_pandas()
 
     report = Report(metrics=[DataDriftPreset()])
     report.run(reference_data=reference[num_cols], current_data=current[num_cols])
@@ -46,6 +42,7 @@ def run_evidently_report(
             "rows_reference": int(len(reference)),
             "rows_current": int(len(current)),
             "num_columns_monitored": int(len(num_cols)),
+            "current_hours": float(current_hours),
             "path": html_path,
         },
     )
@@ -56,6 +53,7 @@ def run_evidently_report(
             "rows_reference": int(len(reference)),
             "rows_current": int(len(current)),
             "num_columns_monitored": int(len(num_cols)),
+            "current_hours": float(current_hours),
             "path": json_path,
         },
     )
@@ -1,18 +1,22 @@
 from zenml import step
-import mlflow
-from src.utils.settings import MLFLOW_TRACKING_URI, MLFLOW_EXPERIMENT_NAME
+from typing import Optional
+from src.utils.drift import DriftResult
+from src.utils.tracking import step_run
+from src.utils.instrumentation import instrumented
 
 @step(enable_cache=False)
-def store_monitoring_artifacts(html_report_path: str, json_report_path: str):
-    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
-
-    while mlflow.active_run() is not None:
-        mlflow.end_run()
-
-    with mlflow.start_run(run_name="store_monitoring_artifacts"):
-        mlflow.log_params({"monitoring_report_count": 2})
-        mlflow.log_metrics({"monitoring_artifacts_logged": 2})
-        mlflow.log_artifact(html_report_path)
-        mlflow.log_artifact(json_report_path)
-    return True
\ No newline at end of file
+@instrumented
+def store_monitoring_artifacts(
+    drift: DriftResult,
+    drift_report_path: str,
+    html_report_path: Optional[str] = None,
+    json_report_path: Optional[str] = None,
+):
+    # the Evidently reports are optional (rendered after the decision, if at all)
+    reports = [p for p in (drift_report_path, html_report_path, json_report_path) if p]
+    with step_run("store_monitoring_artifacts") as tracker:
+        tracker.log_params({"monitoring_report_count": len(reports), "drift_stattest": drift.stattest})
+        tracker.log_metrics({"monitoring_artifacts_logged": len(reports), **drift.summary()})
+        for path in reports:
+            tracker.log_artifact(path)
+    return True
@@ -1,33 +1,64 @@
 from zenml import step
-import json
-import subprocess
+from zenml import get_step_context
+from typing import Optional
+from src.utils.drift import DriftResult
+from src.utils.embedding_drift import EmbeddingDriftResult
+from src.utils.retrain_queue import enqueue_retrain, spawn_worker
 from src.utils.settings import SIMULATE_DRIFT
+from src.utils.instrumentation import instrumented
 
 @step(enable_cache=False)
+@instrumented
 def trigger_decision(
-    json_report_path: str,
+    drift: DriftResult,
+    embedding_drift: Optional[EmbeddingDriftResult] = None,
     drift_threshold: float = 0.3,
+    use_embedding_drift: bool = True,
     run_retrain: bool = True,
+    fine_tune: bool = True,
+    fine_tune_epochs: int = 1,
+    fine_tune_lr: float = 3e-4,
+    cooldown_minutes: float = 30.0,
 ) -> bool:
-    # Evidently json has drift summary; simplest heuristic:
-    # count share of drifted columns from report json structure.
-    with open(json_report_path, "r") as f:
-        data = json.load(f)
+    drift_share = drift.drift_share
 
-    # try to find drift share (structure may vary by version)
-    drift_share = 0.0
-    try:
-        # common location:
-        drift_share = data["metrics"][0]["result"]["share_of_drifted_columns"]
-    except Exception:
-        drift_share = 0.0
-
-    should_retrain = drift_share >= drift_threshold
+    # input-space shifts (e.g. brightness) can move embeddings before the outputs
+    embedding_drifted = bool(
+        use_embedding_drift and embedding_drift is not None and embedding_drift.available and embedding_drift.drifted
+    )
+    should_retrain = drift_share >= drift_threshold or embedding_drifted
     if SIMULATE_DRIFT:
         should_retrain = True
-    print(f"[trigger_decision] drift_share={drift_share:.4f}, threshold={drift_threshold:.4f}, should_retrain={should_retrain}")
+    print(f"[trigger_decision] drift_share={drift_share:.4f}, threshold={drift_threshold:.4f}, embedding_drifted={embedding_drifted}, should_retrain={should_retrain}")
 
+    retrain = {"status": "not_requested"}
     if should_retrain and run_retrain:
-        subprocess.run(["python", "-m", "src.pipelines.training_pipeline"], check=True)
+        if fine_tune:
+            # a few epochs from the latest registered version rather than a full retrain
+            args = {"epochs": fine_tune_epochs, "lr": fine_tune_lr, "warm_start": True, "upload_data": False}
+        else:
+            args = {}
+        # queued with dedup + cooldown; a detached worker runs it so monitoring returns now
+        retrain = enqueue_retrain(
+            reason=f"drift_share={drift_share:.4f} embedding_drifted={embedding_drifted}",
+            args=args,
+            cooldown_s=cooldown_minutes * 60,
+        )
+        # also when a queued job is still waiting: its worker may have died before
+        # claiming it; a second worker exits at once if one holds the queue lock
+        if retrain["status"] == "queued" or retrain.get("pending_status") == "queued":
+            retrain["worker_pid"] = spawn_worker()
+        print(f"[trigger_decision] retrain {retrain}")
+
+    get_step_context().add_output_metadata(
+        metadata={
+            "drift_share": float(drift_share),
+            "drift_stattest": drift.stattest,
+            "embedding_drifted": embedding_drifted,
+            "drift_threshold": float(drift_threshold),
+            "retrain_status": retrain["status"],
+            "retrain_job_id": retrain.get("job_id") or -1,
+        },
+    )
 
-    return should_retrain
\ No newline at end of file
+    return should_retrain
@@ -1,73 +1,78 @@
 from zenml import step
 import torch
-import numpy as np
-import mlflow
-from sklearn.metrics import accuracy_score, f1_score, confusion_matrix, classification_report
-import matplotlib.pyplot as plt
-import os
-from src.utils.settings import ARTIFACTS_DIR, MLFLOW_TRACKING_URI, MLFLOW_EXPERIMENT_NAME
+import time
+from src.utils.cifar_dataset import CifarLoaderSpec, build_loaders, loader_batch_size
+from src.utils.cpu_perf import CpuPerfConfig
+from src.utils.evaluation import StreamingEvaluator, render_async
+from src.utils.settings import ARTIFACTS_DIR
+from src.utils.tracking import log_artifacts_when_done, step_run
+from src.utils.instrumentation import instrumented
 
 @step(enable_cache=False)
-def evaluate(model: torch.nn.Module, preprocess_out: tuple) -> dict:
-    _, _, test_loader = preprocess_out
+@instrumented
+def evaluate(
+    model: torch.nn.Module,
+    preprocess_out: CifarLoaderSpec,
+    num_threads: int = 0,
+    interop_threads: int = 0,
+    channels_last: bool = False,
+    bf16_autocast: bool = False,
+    compile_model: bool = False,
+    topk: int = 5,
+    ece_bins: int = 15,
+) -> dict:
+    perf = CpuPerfConfig(num_threads, interop_threads, channels_last, bf16_autocast, compile_model)
+    perf.apply_threads()
+    _, _, test_loader = build_loaders(preprocess_out)
 
     device = "cuda" if torch.cuda.is_available() else "cpu"
     model.to(device)
     model.eval()
+    fwd = perf.prepare_model(model)
 
-    y_true, y_pred = [], []
-    with torch.no_grad():
+    evaluator = StreamingEvaluator(num_classes=10, topk=(1, topk), ece_bins=ece_bins)
+    start = time.perf_counter()
+    with torch.inference_mode(), perf.autocast(device):
         for xb, yb in test_loader:
-            xb = xb.to(device)
-            logits = model(xb)
-            pred = logits.argmax(dim=1).cpu().numpy()
-            y_pred.extend(pred.tolist())
-            y_true.extend(yb.numpy().tolist())
+            xb = perf.inputs(xb.to(device))
+            evaluator.update(fwd(xb), yb)
+    metrics = evaluator.compute()
+    eval_s = time.perf_counter() - start
+    # plots and text report are rendered in the background; the step does not wait
+    # for them, they are attached to the run when ready
+    rendering = render_async(metrics, ARTIFACTS_DIR)
 
-    acc = accuracy_score(y_true, y_pred)
-    f1 = f1_score(y_true, y_pred, average="macro")
-    test_samples = len(y_true)
-    test_batch_size = getattr(test_loader, "batch_size", None)
-
-    os.makedirs(ARTIFACTS_DIR, exist_ok=True)
-    cm = confusion_matrix(y_true, y_pred)
-
-    plt.figure()
-    plt.imshow(cm)
-    plt.title("Confusion Matrix")
-    plt.xlabel("Pred")
-    plt.ylabel("True")
-    cm_path = os.path.join(ARTIFACTS_DIR, "confusion_matrix.png")
-    plt.savefig(cm_path, bbox_inches="tight")
-    plt.close()
-
-    report = classification_report(y_true, y_pred)
-    rep_path = os.path.join(ARTIFACTS_DIR, "classification_report.txt")
-    with open(rep_path, "w") as f:
-        f.write(report)
-
-    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
-
-    while mlflow.active_run() is not None:
-        mlflow.end_run()
-
-    with mlflow.start_run(run_name="evaluate_cnn"):
-        mlflow.log_params(
+    with step_run("evaluate_cnn") as tracker:
+        tracker.log_params(
             {
-                "test_samples": test_samples,
-                "test_batch_size": test_batch_size,
+                "test_samples": metrics["samples"],
+                "test_batch_size": loader_batch_size(test_loader),
                 "evaluation_average": "macro",
+                "ece_bins": ece_bins,
+                **perf.as_params(),
             }
         )
-        mlflow.log_metrics(
+        tracker.log_metrics(
             {
-                "test_accuracy": acc,
-                "test_f1_macro": f1,
-                "test_error_rate": 1.0 - acc,
+                "test_accuracy": metrics["accuracy"],
+                "test_f1_macro": metrics["f1_macro"],
+                "test_f1_weighted": metrics["f1_weighted"],
+                "test_precision_macro": metrics["precision_macro"],
+                "test_recall_macro": metrics["recall_macro"],
+                f"test_top{topk}_accuracy": metrics[f"top{topk}_accuracy"],
+                "test_ece": metrics["ece"],
+                "test_nll": metrics["nll"],
+                "test_error_rate": 1.0 - metrics["accuracy"],
+                "eval_s": eval_s,
+                "eval_samples_per_sec": metrics["samples"] / eval_s,
+                **{f"test_f1_class_{i}": f for i, f in enumerate(metrics["f1"])},
             }
         )
-        mlflow.log_artifact(cm_path)
-        mlflow.log_artifact(rep_path)
+        log_artifacts_when_done(tracker.client, tracker.run_id, rendering)
 
-    return {"accuracy": acc, "f1_macro": f1}
\ No newline at end of file
+    return {
+        "accuracy": metrics["accuracy"],
+        "f1_macro": metrics["f1_macro"],
+        f"top{topk}_accuracy": metrics[f"top{topk}_accuracy"],
+        "ece": metrics["ece"],
+    }
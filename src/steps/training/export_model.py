@@ -1,21 +1,108 @@
 from zenml import step
+from zenml import get_step_context
+import json
 import os
+import shutil
+import numpy as np
 import torch
-import mlflow
-from src.utils.settings import ARTIFACTS_DIR, MLFLOW_TRACKING_URI, MLFLOW_EXPERIMENT_NAME
+from typing import List, Optional
+from src.utils.cifar_dataset import CifarLoaderSpec, normalize_batch
+from src.utils.cifar_store import load_test, load_train
+from src.utils.model_export import TORCHSCRIPT_VARIANTS, VARIANT_FILES, export_variants, fastest
+from src.utils.settings import ARTIFACTS_DIR
+from src.utils.tracking import step_run
+from src.utils.instrumentation import instrumented
 
 @step(enable_cache=False)
-def export_model(trained_model: torch.nn.Module) -> str:
+@instrumented
+def export_model(
+    trained_model: torch.nn.Module,
+    preprocess_out: CifarLoaderSpec,
+    model_uri: str = "",
+    variants: Optional[List[str]] = None,
+    batch_sizes: Optional[List[int]] = None,
+    select_batch_size: int = 64,
+    eval_samples: int = 0,
+    calibration_samples: int = 512,
+    atol: float = 1e-3,
+    max_accuracy_drop: float = 0.01,
+) -> str:
+    variants = variants or list(VARIANT_FILES)
+    batch_sizes = batch_sizes or [1, 8, 64, 256]
     os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+    export_dir = os.path.join(ARTIFACTS_DIR, "export")
     export_path = os.path.join(ARTIFACTS_DIR, "model_torchscript.pt")
 
-    trained_model.eval()
-    example = torch.randn(1, 3, 32, 32)
-    traced = torch.jit.trace(trained_model.cpu(), example)
-    traced.save(export_path)
+    X_test, y_test = load_test(preprocess_out.cifar_dir)
+    if 0 < eval_samples < len(X_test):
+        X_test, y_test = X_test[:eval_samples], y_test[:eval_samples]
+    # int8 calibration on validation rows (a train sample when the split lives in shards)
+    X_train, _ = load_train(preprocess_out.cifar_dir)
+    calib_idx = preprocess_out.val_idx if len(preprocess_out.val_idx) else np.random.default_rng(0).choice(len(X_train), calibration_samples, replace=False)
+    calib_idx = np.sort(calib_idx[:calibration_samples])
+    calibration = [normalize_batch(torch.from_numpy(np.ascontiguousarray(X_train[calib_idx[s:s + 64]]))) for s in range(0, len(calib_idx), 64)]
 
-    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
-    mlflow.log_artifact(export_path)
+    reports = export_variants(
+        trained_model,
+        export_dir,
+        X_test,
+        y_test,
+        calibration,
+        variants=variants,
+        batch_sizes=batch_sizes,
+        atol=atol,
+        max_accuracy_drop=max_accuracy_drop,
+    )
+    best = fastest(reports, select_batch_size)
+    shipped = fastest(reports, select_batch_size, among=TORCHSCRIPT_VARIANTS)
+    if shipped is None:
+        raise RuntimeError(f"No TorchScript variant passed its checks: {[r.as_dict() for r in reports]}")
+    # serving, monitoring and ModelCache all load model_torchscript.pt
+    shutil.copyfile(shipped.path, export_path)
+    for r in reports:
+        print(
+            f"[export_model] {r.variant:<18} ok={r.within_tolerance} acc={r.accuracy:.4f} "
+            f"diff={r.max_abs_diff:.2e} thr_bs{select_batch_size}={r.throughput.get(select_batch_size, 0.0):.0f}/s {r.error}"
+        )
 
-    return export_path
\ No newline at end of file
+    manifest = {
+        "best_variant": best.variant if best else "",
+        "shipped_variant": shipped.variant,
+        "select_batch_size": select_batch_size,
+        "variants": [r.as_dict() for r in reports],
+    }
+    manifest_path = os.path.join(export_dir, "export_manifest.json")
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    with step_run("export_model") as tracker:
+        tracker.log_params(
+            {
+                "export_variants": ",".join(variants),
+                "export_batch_sizes": ",".join(map(str, batch_sizes)),
+                "export_atol": atol,
+                "export_max_accuracy_drop": max_accuracy_drop,
+                "export_eval_samples": len(X_test),
+                "export_calibration_samples": len(calib_idx),
+            }
+        )
+        metrics = {}
+        for r in reports:
+            metrics.update(r.metrics())
+        tracker.log_metrics(metrics)
+        tracker.set_tags({"best_variant": manifest["best_variant"], "shipped_variant": shipped.variant})
+        tracker.log_artifact(export_path)
+        tracker.log_artifact(manifest_path, "export")
+        for r in reports:
+            if r.path and os.path.exists(r.path):
+                tracker.log_artifact(r.path, "export")
+        if model_uri.startswith("runs:/"):
+            # next to the registered model, where ModelCache looks for it
+            run_id = model_uri.split("/")[1]
+            tracker.client.log_artifact(run_id, export_path)
+            tracker.client.log_artifact(run_id, manifest_path, "export")
+
+    get_step_context().add_output_metadata(
+        metadata={"best_variant": manifest["best_variant"], "shipped_variant": shipped.variant, **metrics}
+    )
+    return export_path
@@ -0,0 +1,100 @@
+from zenml import step
+from zenml import get_step_context
+import json
+import os
+import torch
+from typing import Dict, Optional, Tuple
+from typing_extensions import Annotated
+from src.steps.training.train import SimpleCNN
+from src.utils.cifar_dataset import CifarLoaderSpec
+from src.utils.cpu_perf import CpuPerfConfig
+from src.utils.settings import ARTIFACTS_DIR
+from src.utils.sweep import DEFAULT_SPACE, Trial, grid, run_sweep, sample
+from src.utils.tracking import RunLogger, nested_run, step_run
+from src.utils.instrumentation import instrumented
+
+@step(enable_cache=False)
+@instrumented
+def hparam_sweep(
+    preprocess_out: CifarLoaderSpec,
+    space: Optional[Dict] = None,
+    mode: str = "random",
+    n_trials: int = 16,
+    scheduler: str = "asha",
+    min_epochs: int = 1,
+    max_epochs: int = 9,
+    eta: int = 3,
+    workers: int = 0,
+    threads_per_trial: int = 2,
+    channels_last: bool = False,
+    bf16_autocast: bool = False,
+    seed: int = 0,
+) -> Tuple[
+    Annotated[torch.nn.Module, "model"],
+    Annotated[dict, "sweep_summary"],
+]:
+    space = space or DEFAULT_SPACE
+    configs = grid(space) if mode == "grid" else sample(space, n_trials, seed)
+    perf = CpuPerfConfig(channels_last=channels_last, bf16_autocast=bf16_autocast)
+    out_dir = os.path.join(ARTIFACTS_DIR, "sweep")
+
+    with step_run("hparam_sweep") as tracker:
+        tracker.log_params(
+            {
+                "sweep_mode": mode,
+                "sweep_space": json.dumps(space, sort_keys=True),
+                "sweep_trials": len(configs),
+                "sweep_scheduler": scheduler,
+                "sweep_min_epochs": min_epochs,
+                "sweep_max_epochs": max_epochs,
+                "sweep_eta": eta,
+                "sweep_threads_per_trial": threads_per_trial,
+                **perf.as_params(),
+            }
+        )
+        # one nested run per trial, filled from the pool results as they arrive
+        trial_runs: Dict[int, RunLogger] = {}
+
+        def on_result(trial: Trial, result: Dict) -> None:
+            if trial.trial_id not in trial_runs:
+                trial_runs[trial.trial_id] = nested_run(tracker, f"trial-{trial.trial_id}", tags={"sweep_trial": trial.trial_id})
+                trial_runs[trial.trial_id].log_params({**trial.params, "cores": ",".join(map(str, result["cores"]))})
+            run = trial_runs[trial.trial_id]
+            for h in result["history"]:
+                run.log_metrics({k: v for k, v in h.items() if k != "epoch"}, step=h["epoch"])
+            run.set_tags({"status": trial.status, "epochs": trial.epochs})
+            print(f"[hparam_sweep] trial {trial.trial_id} {trial.params} epochs={trial.epochs} val_acc={trial.val_acc:.4f}")
+
+        try:
+            result = run_sweep(
+                preprocess_out,
+                configs,
+                out_dir,
+                scheduler=scheduler,
+                min_epochs=min_epochs,
+                max_epochs=max_epochs,
+                eta=eta,
+                workers=workers,
+                threads_per_trial=threads_per_trial,
+                perf=perf,
+                seed=seed,
+                on_result=on_result,
+            )
+        finally:
+            for run in trial_runs.values():
+                run.close()
+                tracker.client.set_terminated(run.run_id)
+
+        summary = result.summary()
+        tracker.set_tags({"best_trial": summary["best_trial"], "best_params": json.dumps(summary["best_params"])})
+        tracker.log_metrics({k: float(v) for k, v in summary.items() if isinstance(v, (int, float))})
+        with open(os.path.join(out_dir, "sweep_summary.json"), "w") as f:
+            json.dump({**summary, "trials": [t.as_dict() for t in result.trials]}, f, indent=2)
+        tracker.log_artifact(os.path.join(out_dir, "sweep_summary.json"))
+    print(f"[hparam_sweep] {summary}")
+
+    # only the winner leaves the step; register_model/export_model handle it like a train output
+    model = SimpleCNN()
+    model.load_state_dict(torch.load(result.best_state_path)["model"])
+    get_step_context().add_output_metadata(output_name="sweep_summary", metadata={k: v for k, v in summary.items() if k != "best_params"})
+    return model, summary
@@ -1,12 +1,20 @@
 from zenml import step
 from src.utils.dvc_utils import dvc_pull
 from src.utils.settings import DATA_RAW_DIR
+from src.utils.step_cache import raw_data_current, record_ingest
 import os
+from src.utils.instrumentation import instrumented
 
 @step
-def ingest_data() -> str:
-    dvc_pull()
+@instrumented
+def ingest_data(use_cache: bool = True) -> str:
     path = os.path.join(DATA_RAW_DIR, "cifar-10-batches-py")
+    if use_cache and raw_data_current(path):
+        # same DVC version and same files as the last successful pull
+        print("[ingest_data] step cache hit, dvc pull skipped")
+        return path
+    dvc_pull()
     if not os.path.exists(path):
         raise FileNotFoundError(f"CIFAR-10 not found at {path}")
-    return path
\ No newline at end of file
+    record_ingest(path)
+    return path
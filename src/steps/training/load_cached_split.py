@@ -0,0 +1,14 @@
+from zenml import step
+from src.utils.step_cache import CIFAR_DIR, cached_split
+from src.utils.instrumentation import instrumented
+
+@step(enable_cache=False)
+@instrumented
+def load_cached_split(test_size: float = 0.1, random_state: int = 42) -> tuple:
+    # stands in for ingest -> validate -> split when the DVC version, the local
+    # files and the split params all match a previous run
+    cached = cached_split(test_size, random_state)
+    if cached is None:
+        raise RuntimeError("Step cache entry disappeared since the pipeline was built; rerun with --no-step-cache.")
+    print(f"[load_cached_split] train={len(cached['train_idx'])} val={len(cached['val_idx'])} from step cache")
+    return (CIFAR_DIR, cached["train_idx"], cached["val_idx"])
@@ -2,16 +2,17 @@ from zenml import step
 import mlflow
 import mlflow.pytorch
 import torch
-from src.utils.settings import MLFLOW_TRACKING_URI, MODEL_NAME, MLFLOW_EXPERIMENT_NAME
+from src.utils.settings import MODEL_NAME
+from src.utils.tracking import step_run
+from src.utils.instrumentation import instrumented
 
 @step
+@instrumented
 def register_model(model: torch.nn.Module) -> str:
-    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
-    # log model to current run
-    mlflow.pytorch.log_model(model, artifact_path="model")
-    # register from the run artifact
-    run_id = mlflow.active_run().info.run_id
-    model_uri = f"runs:/{run_id}/model"
-    mlflow.register_model(model_uri, MODEL_NAME)
-    return model_uri
\ No newline at end of file
+    with step_run("register_model") as tracker:
+        # log model to the step's child run (fluent run is active inside step_run)
+        mlflow.pytorch.log_model(model, artifact_path="model")
+        # register from the run artifact
+        model_uri = f"runs:/{tracker.run_id}/model"
+        mlflow.register_model(model_uri, MODEL_NAME)
+    return model_uri
@@ -1,34 +1,26 @@
 from zenml import step
-import os, pickle
 import numpy as np
 from sklearn.model_selection import train_test_split
-
-def _load_all_train(cifar_dir: str):
-    xs, ys = [], []
-    for i in range(1, 6):
-        p = os.path.join(cifar_dir, f"data_batch_{i}")
-        with open(p, "rb") as f:
-            d = pickle.load(f, encoding="bytes")
-        xs.append(d[b"data"])
-        ys.append(d[b"labels"])
-    X = np.concatenate(xs, axis=0)  # (50000, 3072)
-    y = np.array(sum(ys, []))
-    return X, y
-
-def _load_test(cifar_dir: str):
-    p = os.path.join(cifar_dir, "test_batch")
-    with open(p, "rb") as f:
-        d = pickle.load(f, encoding="bytes")
-    X = d[b"data"]  # (10000, 3072)
-    y = np.array(d[b"labels"])
-    return X, y
+from src.utils.cifar_store import content_key, load_train
+from src.utils.step_cache import StepCache
+from src.utils.instrumentation import instrumented
 
 @step
-def split_data(cifar_dir: str) -> tuple:
-    X, y = _load_all_train(cifar_dir)
-    X_test, y_test = _load_test(cifar_dir)
+@instrumented
+def split_data(cifar_dir: str, test_size: float = 0.1, random_state: int = 42, use_cache: bool = True) -> tuple:
+    cache = StepCache()
+    key = content_key(cifar_dir)
+    cached = cache.get("split", key, test_size=test_size, random_state=random_state) if use_cache else None
+    if cached is not None:
+        return (cifar_dir, cached["train_idx"], cached["val_idx"])
+
+    _, y = load_train(cifar_dir)  # memmapped store, only labels are read here
+    y = np.asarray(y)
 
-    X_train, X_val, y_train, y_val = train_test_split(
-        X, y, test_size=0.1, random_state=42, stratify=y
+    # split positions rather than pixels: same partition as splitting X directly
+    train_idx, val_idx = train_test_split(
+        np.arange(len(y)), test_size=test_size, random_state=random_state, stratify=y
     )
-    return (X_train, y_train, X_val, y_val, X_test, y_test)
\ No newline at end of file
+    train_idx, val_idx = train_idx.astype(np.int32), val_idx.astype(np.int32)
+    cache.put("split", key, {"train_idx": train_idx, "val_idx": val_idx}, test_size=test_size, random_state=random_state)
+    return (cifar_dir, train_idx, val_idx)
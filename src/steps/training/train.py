@@ -2,8 +2,17 @@ from zenml import step
 import torch
 import torch.nn as nn
 import torch.optim as optim
-import mlflow
-from src.utils.settings import MLFLOW_TRACKING_URI, MLFLOW_EXPERIMENT_NAME
+import os
+from typing import List, Optional
+from src.utils.checkpoints import clear_checkpoints, latest_checkpoint, load_checkpoint, save_checkpoint
+from src.utils.cifar_dataset import CifarLoaderSpec, build_loaders, loader_batch_size
+from src.utils.cpu_perf import CpuPerfConfig
+from src.utils.ddp import measure_scaling, run_ddp
+from src.utils.model_registry import load_latest_registered_model
+from src.utils.profiling import EpochTimer, profiler_window
+from src.utils.settings import ARTIFACTS_DIR, CHECKPOINT_DIR
+from src.utils.tracking import step_run
+from src.utils.instrumentation import instrumented
 
 class SimpleCNN(nn.Module):
     def __init__(self, num_classes=10):
@@ -20,30 +29,109 @@ class SimpleCNN(nn.Module):
     def forward(self, x):
         return self.net(x)
 
-@step(enable_cache=False)
-def train(preprocess_out: tuple, epochs: int = 3, lr: float = 1e-3) -> torch.nn.Module:
-    train_loader, val_loader, _ = preprocess_out
+def train_one_epoch(model, fwd, loader, criterion, optimizer, device, perf: CpuPerfConfig, timer: EpochTimer, prof=None):
+    # `fwd` is the (possibly compiled) callable, `model` the underlying module
+    model.train()
+    timer.start_epoch()
+    # accumulate on device; a single host sync per epoch below
+    loss_sum = torch.zeros((), device=device)
+    correct = torch.zeros((), dtype=torch.long, device=device)
+    total = 0
+    for xb, yb in loader:
+        timer.batch_ready()
+        xb, yb = perf.inputs(xb.to(device, non_blocking=True)), yb.to(device, non_blocking=True)
+        optimizer.zero_grad(set_to_none=True)
+        with perf.autocast(device):
+            logits = fwd(xb)
+            loss = criterion(logits, yb)
+        loss.backward()
+        optimizer.step()
+        loss_sum += loss.detach().float() * yb.size(0)
+        correct += (logits.argmax(dim=1) == yb).sum()
+        total += yb.size(0)
+        timer.step_done(yb.size(0))
+        if prof is not None:
+            prof.step()
+    return loss_sum.item() / max(total, 1), correct.item() / max(total, 1)
+
+
+def validate(fwd, loader, criterion, device, perf: CpuPerfConfig):
+    loss_sum = torch.zeros((), device=device)
+    correct = torch.zeros((), dtype=torch.long, device=device)
+    total = 0
+    with torch.no_grad(), perf.autocast(device):
+        for xb, yb in loader:
+            xb, yb = perf.inputs(xb.to(device, non_blocking=True)), yb.to(device, non_blocking=True)
+            logits = fwd(xb)
+            loss_sum += criterion(logits, yb).float() * yb.size(0)
+            correct += (logits.argmax(dim=1) == yb).sum()
+            total += yb.size(0)
+    return loss_sum.item() / max(total, 1), correct.item() / max(total, 1)
 
-    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+
+@step(enable_cache=False)
+@instrumented
+def train(
+    preprocess_out: CifarLoaderSpec,
+    epochs: int = 3,
+    lr: float = 1e-3,
+    profile_timing: bool = False,
+    profiler_steps: int = 0,
+    num_threads: int = 0,
+    interop_threads: int = 0,
+    channels_last: bool = False,
+    bf16_autocast: bool = False,
+    compile_model: bool = False,
+    world_size: int = 1,
+    ddp_scaling_sizes: Optional[List[int]] = None,
+    checkpoint_every: int = 1,
+    resume: bool = False,
+    warm_start: bool = False,
+) -> torch.nn.Module:
+    perf = CpuPerfConfig(num_threads, interop_threads, channels_last, bf16_autocast, compile_model)
+    threads = perf.apply_threads()
+    train_loader, val_loader, _ = build_loaders(preprocess_out)
 
     device = "cuda" if torch.cuda.is_available() else "cpu"
-    model = SimpleCNN().to(device)
+    model = SimpleCNN()
+    if warm_start:
+        # fine-tune from the latest registered version instead of random init
+        try:
+            model.load_state_dict(load_latest_registered_model().state_dict())
+            print("[train] warm start from latest registered model")
+        except ValueError as e:
+            print(f"[train] warm start unavailable ({e}); training from scratch")
+            warm_start = False
+    model.to(device)
 
     criterion = nn.CrossEntropyLoss()
     optimizer = optim.Adam(model.parameters(), lr=lr)
 
-    train_samples = len(train_loader.dataset)
-    val_samples = len(val_loader.dataset)
-    train_batch_size = getattr(train_loader, "batch_size", None)
-    val_batch_size = getattr(val_loader, "batch_size", None)
+    checkpoint_dir = os.path.join(CHECKPOINT_DIR, "train_cnn")
+    resume_path = latest_checkpoint(checkpoint_dir) if resume else None
+    start_epoch = 1
+    train_acc = 0.0
     best_val_acc = 0.0
+    if resume_path:
+        payload = load_checkpoint(resume_path, model, optimizer)
+        start_epoch = payload["epoch"] + 1
+        best_val_acc = payload["extra"].get("best_val_acc", payload["extra"].get("val_acc", 0.0))
+        train_acc = payload["extra"].get("train_acc", 0.0)
+        print(f"[train] resuming from {resume_path} at epoch {start_epoch}")
+    else:
+        # a fresh run must not be pruned against / resumed from a previous run's files
+        clear_checkpoints(checkpoint_dir)
+    fwd = perf.prepare_model(model)
 
-    while mlflow.active_run() is not None:
-        mlflow.end_run()
+    train_samples = len(train_loader.dataset)
+    val_samples = len(val_loader.dataset)
+    train_batch_size = loader_batch_size(train_loader)
+    val_batch_size = loader_batch_size(val_loader)
+    timer = EpochTimer(device, split_timing=profile_timing)
 
-    with mlflow.start_run(run_name="train_cnn"):
-        mlflow.log_params(
+    # child run of the pipeline run; metrics are shipped from a background thread
+    with step_run("train_cnn") as tracker:
+        tracker.log_params(
             {
                 "epochs": epochs,
                 "lr": lr,
@@ -55,54 +143,84 @@ def train(preprocess_out: tuple, epochs: int = 3, lr: float = 1e-3) -> torch.nn.
                 "train_batch_size": train_batch_size,
                 "val_batch_size": val_batch_size,
                 "num_classes": model.net[-1].out_features,
+                "loader_num_workers": preprocess_out.num_workers,
+                "loader_prefetch_factor": preprocess_out.prefetch_factor,
+                "loader_pin_memory": preprocess_out.pin_memory,
+                "loader_background_prefetch": preprocess_out.background_prefetch,
+                "profile_timing": profile_timing,
+                "profiler_steps": profiler_steps,
+                **perf.as_params(),
+                "torch_num_threads": threads["num_threads"],
+                "torch_interop_threads": threads["interop_threads"],
+                "world_size": world_size,
+                "ddp_backend": "gloo" if world_size > 1 else "none",
+                "checkpoint_every": checkpoint_every,
+                "resumed_from": resume_path or "none",
+                "start_epoch": start_epoch,
+                "warm_start": warm_start,
             }
         )
 
-        for epoch in range(1, epochs + 1):
-            model.train()
-            total_loss = 0.0
-            train_correct = 0
-            train_total = 0
-            for xb, yb in train_loader:
-                xb, yb = xb.to(device), yb.to(device)
-                optimizer.zero_grad()
-                logits = model(xb)
-                loss = criterion(logits, yb)
-                loss.backward()
-                optimizer.step()
-                total_loss += loss.item() * xb.size(0)
-                train_correct += (logits.argmax(dim=1) == yb).sum().item()
-                train_total += yb.size(0)
-            train_loss = total_loss / len(train_loader.dataset)
-            train_acc = train_correct / max(train_total, 1)
-
-            # val acc/loss
-            model.eval()
-            correct = 0
-            total = 0
-            val_loss_sum = 0.0
-            with torch.no_grad():
-                for xb, yb in val_loader:
-                    xb, yb = xb.to(device), yb.to(device)
-                    logits = model(xb)
-                    val_loss_sum += criterion(logits, yb).item() * xb.size(0)
-                    pred = logits.argmax(dim=1)
-                    correct += (pred == yb).sum().item()
-                    total += yb.size(0)
-            val_acc = correct / total
-            val_loss = val_loss_sum / len(val_loader.dataset)
-            best_val_acc = max(best_val_acc, val_acc)
-
-            mlflow.log_metrics(
-                {
-                    "train_loss": train_loss,
-                    "train_acc": train_acc,
-                    "val_loss": val_loss,
-                    "val_acc": val_acc,
-                },
-                step=epoch,
+        if world_size > 1:
+            # rank 0 logs per-epoch metrics into this run; weights come back to the parent
+            state, history = run_ddp(
+                preprocess_out,
+                world_size,
+                epochs,
+                lr,
+                perf=perf,
+                run_id=tracker.run_id,
+                init_state=model.state_dict() if warm_start else None,
+                checkpoint_dir=checkpoint_dir,
+                checkpoint_every=checkpoint_every,
+                resume_path=resume_path,
             )
+            model.load_state_dict(state)
+            if history:
+                best_val_acc = max([best_val_acc] + [h["val_acc"] for h in history])
+                train_acc = history[-1]["train_acc"]
+        else:
+            profiler_dir = os.path.join(ARTIFACTS_DIR, "profiler")
+            with profiler_window(profiler_steps, profiler_dir) as prof:
+                for epoch in range(start_epoch, epochs + 1):
+                    # streamed shards: order and shuffle seed per epoch (DataLoader workers
+                    # iterate a copy, so the dataset's own counter does not advance here)
+                    if hasattr(train_loader.dataset, "set_epoch"):
+                        train_loader.dataset.set_epoch(epoch)
+                    train_loss, train_acc = train_one_epoch(
+                        model, fwd, train_loader, criterion, optimizer, device, perf, timer, prof
+                    )
+                    epoch_metrics = timer.metrics("train")
+
+                    # val acc/loss
+                    model.eval()
+                    val_loss, val_acc = validate(fwd, val_loader, criterion, device, perf)
+                    best_val_acc = max(best_val_acc, val_acc)
+
+                    tracker.log_metrics(
+                        {
+                            "train_loss": train_loss,
+                            "train_acc": train_acc,
+                            "val_loss": val_loss,
+                            "val_acc": val_acc,
+                            **epoch_metrics,
+                        },
+                        step=epoch,
+                    )
+                    if checkpoint_every > 0 and epoch % checkpoint_every == 0:
+                        save_checkpoint(
+                            checkpoint_dir,
+                            model,
+                            optimizer,
+                            epoch,
+                            extra={"best_val_acc": best_val_acc, "train_acc": train_acc, "val_acc": val_acc},
+                        )
+
+            if prof.trace_path and os.path.exists(prof.trace_path):
+                tracker.log_artifact(prof.trace_path, artifact_path="profiler")
 
-        mlflow.log_metrics({"best_val_acc": best_val_acc, "final_train_acc": train_acc})
+        tracker.log_metrics({"best_val_acc": best_val_acc, "final_train_acc": train_acc})
+        if ddp_scaling_sizes:
+            tracker.log_metrics(measure_scaling(preprocess_out, ddp_scaling_sizes, lr=lr, perf=perf))
 
-        return model
\ No newline at end of file
+        return perf.restore_model(model)
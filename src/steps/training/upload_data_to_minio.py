@@ -1,23 +1,29 @@
 from zenml import step
-import mlflow
 
-from src.utils.minio_utils import upload_directory_to_minio
+from src.utils.minio_utils import make_s3_client, upload_directory_to_minio
+from src.utils.shard_stream import publish_shards
+from src.utils.step_cache import record_shards, record_upload
 from src.utils.settings import (
-    MLFLOW_TRACKING_URI,
-    MLFLOW_EXPERIMENT_NAME,
     MINIO_ENDPOINT_URL,
     MINIO_ACCESS_KEY,
     MINIO_SECRET_KEY,
     MINIO_BUCKET,
     MINIO_DATA_PREFIX,
+    MINIO_SHARD_PREFIX,
 )
+from src.utils.tracking import step_run
+from src.utils.instrumentation import instrumented
 
 
 @step(enable_cache=False)
-def upload_data_to_minio(cifar_dir: str) -> dict:
-    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
-
+@instrumented
+def upload_data_to_minio(
+    cifar_dir: str,
+    max_workers: int = 8,
+    chunk_mb: int = 16,
+    publish_record_shards: bool = True,
+    records_per_shard: int = 5000,
+) -> dict:
     result = upload_directory_to_minio(
         local_dir=cifar_dir,
         endpoint_url=MINIO_ENDPOINT_URL,
@@ -25,19 +31,36 @@ def upload_data_to_minio(cifar_dir: str) -> dict:
         secret_key=MINIO_SECRET_KEY,
         bucket_name=MINIO_BUCKET,
         prefix=MINIO_DATA_PREFIX,
+        max_workers=max_workers,
+        chunk_mb=chunk_mb,
     )
+    # lets training_pipeline's cached fast path skip this step for this data version
+    record_upload(cifar_dir)
+    if publish_record_shards:
+        # packed uint8 shards consumed by preprocess(source="minio"); no-op if current
+        client = make_s3_client(MINIO_ENDPOINT_URL, MINIO_ACCESS_KEY, MINIO_SECRET_KEY)
+        result["shards"] = publish_shards(cifar_dir, client, MINIO_BUCKET, MINIO_SHARD_PREFIX, records_per_shard)
+        record_shards(cifar_dir, records_per_shard)
 
-    while mlflow.active_run() is not None:
-        mlflow.end_run()
-
-    with mlflow.start_run(run_name="upload_data_to_minio"):
-        mlflow.log_params(
+    with step_run("upload_data_to_minio") as tracker:
+        tracker.log_params(
             {
                 "minio_endpoint_url": MINIO_ENDPOINT_URL,
                 "minio_bucket": MINIO_BUCKET,
                 "minio_data_prefix": MINIO_DATA_PREFIX,
+                "minio_max_workers": max_workers,
+                "minio_chunk_mb": chunk_mb,
+                "minio_shard_prefix": MINIO_SHARD_PREFIX if publish_record_shards else "none",
+            }
+        )
+        tracker.log_metrics(
+            {
+                "minio_uploaded_files": result["uploaded_files"],
+                "minio_skipped_files": result["skipped_files"],
+                "minio_bytes_transferred": result["bytes_transferred"],
+                "minio_upload_s": result["elapsed_s"],
+                "minio_throughput_mb_s": result["throughput_mb_s"],
             }
         )
-        mlflow.log_metrics({"minio_uploaded_files": result["uploaded_files"]})
 
     return result
@@ -1,22 +1,51 @@
 from zenml import step
-import pickle
-import os
+from zenml import get_step_context
+import json
 import numpy as np
-
-def _load_batch(file_path: str):
-    with open(file_path, "rb") as f:
-        d = pickle.load(f, encoding="bytes")
-    x = d[b"data"]  # (10000, 3072)
-    y = np.array(d[b"labels"])
-    return x, y
+from src.utils.cifar_store import content_key
+from src.utils.data_validation import validate_dataset
+from src.utils.step_cache import StepCache
+from src.utils.instrumentation import instrumented
 
 @step
-def validate_data(cifar_dir: str) -> str:
-    batch = os.path.join(cifar_dir, "data_batch_1")
-    x, y = _load_batch(batch)
+@instrumented
+def validate_data(
+    cifar_dir: str,
+    use_cache: bool = True,
+    workers: int = 0,
+    sample_rows: int = 0,
+    max_class_ratio: float = 1.5,
+    max_duplicate_fraction: float = 0.001,
+    stats_tolerance: float = 0.1,
+    update_baseline: bool = False,
+    fail_on_error: bool = False,
+) -> str:
+    cache = StepCache()
+    key = content_key(cifar_dir)
+    rules = {
+        "sample_rows": sample_rows,
+        "max_class_ratio": max_class_ratio,
+        "max_duplicate_fraction": max_duplicate_fraction,
+        "stats_tolerance": stats_tolerance,
+    }
+    cached = cache.get("validate", key) if use_cache and not update_baseline else None
+    # only passing reports are cached; a hit under other rules is re-validated
+    if cached is not None and "report" in cached and json.loads(str(cached["rules"])) == rules:
+        report = json.loads(str(cached["report"]))
+        print("[validate_data] step cache hit, dataset version already validated")
+        get_step_context().add_output_metadata(metadata={**report, "cache": "hit"})
+        return cifar_dir
 
-    assert x.shape[1] == 3072
-    assert y.min() >= 0 and y.max() <= 9
-    assert len(x) == len(y)
+    result = validate_dataset(cifar_dir, workers=workers, update_baseline=update_baseline, **rules)
+    report = result.as_dict()
+    print(
+        f"[validate_data] passed={result.passed} rows={result.rows} duplicates={result.duplicate_rows} "
+        f"failures={result.failures} elapsed_s={result.elapsed_s:.3f}"
+    )
+    get_step_context().add_output_metadata(metadata={**report, "cache": "miss"})
 
-    return cifar_dir
\ No newline at end of file
+    if result.passed:
+        cache.put("validate", key, {"report": np.array(json.dumps(report)), "rules": np.array(json.dumps(rules, sort_keys=True))})
+    elif fail_on_error:
+        raise ValueError(f"Data validation failed: {result.failures}")
+    return cifar_dir
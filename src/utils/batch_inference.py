@@ -0,0 +1,152 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from src.utils.cifar_dataset import normalize_batch
+from src.utils.embedding_drift import image_stats
+
+NUM_CLASSES = 10
+INFERENCE_SCHEMA = pa.schema(
+    [(f"proba_{i}", pa.float32()) for i in range(NUM_CLASSES)]
+    + [("pred_class", pa.int64()), ("true_class", pa.int64()), ("ts", pa.int64())]
+)
+
+
+def brightness_drift(x_u8: torch.Tensor) -> torch.Tensor:
+    # clip(x * 0.5 + 0.4, 0, 1) in [0, 1] space, done directly on uint8 pixels
+    return (x_u8.to(torch.int16) // 2 + 102).clamp_(0, 255).to(torch.uint8)
+
+
+def split_head(model: nn.Module) -> Optional[Tuple[nn.Module, nn.Module]]:
+    # (body, classifier) for eager models built on an nn.Sequential `net` (SimpleCNN);
+    # the body output is the 256-d penultimate embedding. None for TorchScript.
+    net = getattr(model, "net", None)
+    if isinstance(model, torch.jit.ScriptModule) or not isinstance(net, nn.Sequential):
+        return None
+    return net[:-1], net[-1]
+
+
+class BatchInferenceEngine:
+    # Micro-batched scoring over uint8 CIFAR rows. A small thread pool gathers and
+    # normalizes upcoming batches (memmap reads, uint8 -> float) while the current
+    # one runs through the model, so memory stays O(batch_size * prefetch).
+    def __init__(self, model: torch.nn.Module, batch_size: int = 512, prefetch: int = 2, loader_threads: int = 2):
+        self.model = model.eval()
+        self.batch_size = batch_size
+        self.prefetch = max(1, prefetch)
+        self.loader_threads = max(1, loader_threads)
+
+    @classmethod
+    def from_torchscript(cls, path: str, **kwargs) -> "BatchInferenceEngine":
+        return cls(torch.jit.load(path, map_location="cpu"), **kwargs)
+
+    def _prepare(
+        self, X_u8: np.ndarray, rows: np.ndarray, transform: Optional[Callable], stats: bool = False
+    ) -> Tuple[torch.Tensor, Optional[np.ndarray]]:
+        xb = torch.from_numpy(np.ascontiguousarray(X_u8[rows]))
+        if transform is not None:
+            xb = transform(xb)
+        return normalize_batch(xb), image_stats(xb.numpy()) if stats else None
+
+    def iter_probs(
+        self,
+        X_u8: np.ndarray,
+        rows: np.ndarray,
+        transform: Optional[Callable] = None,
+    ) -> Iterator[Tuple[slice, np.ndarray]]:
+        for sl, probs, _ in self.iter_outputs(X_u8, rows, transform):
+            yield sl, probs
+
+    def iter_outputs(
+        self,
+        X_u8: np.ndarray,
+        rows: np.ndarray,
+        transform: Optional[Callable] = None,
+        features: bool = False,
+    ) -> Iterator[Tuple[slice, np.ndarray, Optional[np.ndarray]]]:
+        # features=True also yields [penultimate embedding | per-channel mean/std]
+        # rows, from the same forward pass; needs an eager model (see split_head)
+        head = split_head(self.model) if features else None
+        if features and head is None:
+            raise ValueError("Embedding capture needs an eager nn.Sequential `net` model, not TorchScript.")
+        with torch.inference_mode():
+            for sl, xb, stats in self.iter_batches(X_u8, rows, transform, stats=features):
+                if head is None:
+                    yield sl, F.softmax(self.model(xb), dim=1).numpy(), None
+                    continue
+                emb = head[0](xb)
+                probs = F.softmax(head[1](emb), dim=1)
+                yield sl, probs.numpy(), np.concatenate([emb.numpy(), stats], axis=1)
+
+    def iter_batches(
+        self,
+        X_u8: np.ndarray,
+        rows: np.ndarray,
+        transform: Optional[Callable] = None,
+        stats: bool = False,
+    ) -> Iterator[Tuple[slice, torch.Tensor, Optional[np.ndarray]]]:
+        # normalized model inputs, prefetched on the loader threads; decoded once,
+        # so several models can share them (see src/utils/version_compare.py)
+        chunks = [slice(s, min(s + self.batch_size, len(rows))) for s in range(0, len(rows), self.batch_size)]
+        with ThreadPoolExecutor(self.loader_threads, thread_name_prefix="inference-load") as pool:
+            pending = deque()
+            it = iter(chunks)
+            for sl in it:
+                pending.append((sl, pool.submit(self._prepare, X_u8, rows[sl], transform, stats)))
+                if len(pending) >= self.prefetch:
+                    break
+            while pending:
+                sl, fut = pending.popleft()
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.append((nxt, pool.submit(self._prepare, X_u8, rows[nxt], transform, stats)))
+                xb, batch_stats = fut.result()
+                yield sl, xb, batch_stats
+
+    def score_to_parquet(
+        self,
+        X_u8: np.ndarray,
+        y: np.ndarray,
+        rows: np.ndarray,
+        out_path: str,
+        transform: Optional[Callable] = None,
+        row_group_size: int = 65536,
+        on_features: Optional[Callable[[slice, np.ndarray], None]] = None,
+    ) -> Dict[str, float]:
+        # streams probabilities into Parquet row groups; nothing is held beyond
+        # one row group, whatever the number of rows. on_features(slice, features)
+        # receives the embedding rows of each batch (see iter_outputs)
+        tmp_path = f"{out_path}.tmp"
+        start = time.perf_counter()
+        written = 0
+        buffered = []
+        with pq.ParquetWriter(tmp_path, INFERENCE_SCHEMA) as writer:
+            for sl, probs, feats in self.iter_outputs(X_u8, rows, transform, features=on_features is not None):
+                if feats is not None:
+                    on_features(sl, feats)
+                n = probs.shape[0]
+                columns = [pa.array(probs[:, i]) for i in range(NUM_CLASSES)]
+                columns += [
+                    pa.array(probs.argmax(axis=1).astype(np.int64)),
+                    pa.array(np.asarray(y[rows[sl]], dtype=np.int64)),
+                    pa.array(np.full(n, int(time.time()), dtype=np.int64)),
+                ]
+                buffered.append(pa.Table.from_arrays(columns, schema=INFERENCE_SCHEMA))
+                written += n
+                if sum(t.num_rows for t in buffered) >= row_group_size:
+                    writer.write_table(pa.concat_tables(buffered), row_group_size=row_group_size)
+                    buffered = []
+            if buffered:
+                writer.write_table(pa.concat_tables(buffered), row_group_size=row_group_size)
+        os.replace(tmp_path, out_path)
+        elapsed = time.perf_counter() - start
+        return {"rows": written, "elapsed_s": elapsed, "rows_per_sec": written / max(elapsed, 1e-9)}
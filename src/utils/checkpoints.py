@@ -0,0 +1,79 @@
+import glob
+import os
+import random
+from typing import Dict, Optional
+
+import numpy as np
+import torch
+
+
+def _rng_state() -> Dict:
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def _set_rng_state(state: Dict) -> None:
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def save_checkpoint(
+    checkpoint_dir: str,
+    model: torch.nn.Module,
+    optimizer: torch.optim.Optimizer,
+    epoch: int,
+    extra: Optional[Dict] = None,
+    keep_last: int = 2,
+) -> str:
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = os.path.join(checkpoint_dir, f"epoch_{epoch:04d}.pt")
+    payload = {
+        "epoch": epoch,
+        "model": {k: v.detach().cpu().contiguous() for k, v in model.state_dict().items()},
+        "optimizer": optimizer.state_dict(),
+        "rng": _rng_state(),
+        "extra": extra or {},
+    }
+    # write-then-rename so a crash never leaves a truncated "latest" checkpoint
+    tmp = f"{path}.tmp"
+    torch.save(payload, tmp)
+    os.replace(tmp, path)
+
+    for old in sorted(glob.glob(os.path.join(checkpoint_dir, "epoch_*.pt")))[:-keep_last]:
+        os.remove(old)
+    return path
+
+
+def clear_checkpoints(checkpoint_dir: str) -> None:
+    for path in glob.glob(os.path.join(checkpoint_dir, "epoch_*.pt")):
+        os.remove(path)
+
+
+def latest_checkpoint(checkpoint_dir: str) -> Optional[str]:
+    paths = sorted(glob.glob(os.path.join(checkpoint_dir, "epoch_*.pt")))
+    return paths[-1] if paths else None
+
+
+def load_checkpoint(
+    path: str,
+    model: torch.nn.Module,
+    optimizer: Optional[torch.optim.Optimizer] = None,
+    restore_rng: bool = True,
+) -> Dict:
+    # weights_only=False: the payload carries optimizer and python/numpy RNG state
+    payload = torch.load(path, map_location="cpu", weights_only=False)
+    model.load_state_dict(payload["model"])
+    if optimizer is not None:
+        optimizer.load_state_dict(payload["optimizer"])
+    if restore_rng:
+        _set_rng_state(payload["rng"])
+    return payload
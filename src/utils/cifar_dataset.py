@@ -0,0 +1,219 @@
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import torch
+from torch.utils.data import BatchSampler, DataLoader, Dataset, IterableDataset, RandomSampler, Sampler, SequentialSampler, get_worker_info
+
+from src.utils.cifar_store import IMAGE_SHAPE, open_store
+
+CIFAR_MEAN = (0.4914, 0.4822, 0.4465)
+CIFAR_STD = (0.2470, 0.2435, 0.2616)
+
+# (x / 255 - mean) / std folded into a single multiply-add
+_SCALE = torch.tensor([1.0 / (255.0 * s) for s in CIFAR_STD]).view(1, 3, 1, 1)
+_BIAS = torch.tensor([-m / s for m, s in zip(CIFAR_MEAN, CIFAR_STD)]).view(1, 3, 1, 1)
+
+
+def normalize_batch(x_u8: torch.Tensor, out: Optional[torch.Tensor] = None) -> torch.Tensor:
+    # (B, 3072) or (B, 3, 32, 32) uint8 -> normalized (B, 3, 32, 32) float32
+    x = x_u8.view(-1, *IMAGE_SHAPE)
+    if out is None:
+        out = torch.empty(x.shape, dtype=torch.float32)
+    out.copy_(x)
+    return out.mul_(_SCALE).add_(_BIAS)
+
+
+def _batch_buffer(n: int) -> Optional[torch.Tensor]:
+    # inside a DataLoader worker, write the batch straight into shared memory so
+    # handing it to the main process is a handle transfer rather than a copy
+    if get_worker_info() is None:
+        return None
+    return torch.empty((n, *IMAGE_SHAPE), dtype=torch.float32).share_memory_()
+
+
+# Map-style view over the memmapped uint8 store. Indexing with a list of
+# positions returns a whole normalized batch (driven by a BatchSampler, see
+# build_loaders). Only the store location and index view are pickled; the
+# memmaps are reopened lazily in whichever process reads them.
+class CifarUint8Dataset(Dataset):
+    def __init__(self, cifar_dir: str, split: str, indices: Optional[np.ndarray] = None):
+        self.cifar_dir = cifar_dir
+        self.split = split
+        self.indices = None if indices is None else np.asarray(indices, dtype=np.int64)
+        self._arrays: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def _data(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._arrays is None:
+            store = open_store(self.cifar_dir)
+            self._arrays = (store[f"{self.split}_x"], store[f"{self.split}_y"])
+        return self._arrays
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        return state
+
+    def __len__(self) -> int:
+        if self.indices is not None:
+            return len(self.indices)
+        return len(self._data()[1])
+
+    def rows(self, positions) -> np.ndarray:
+        positions = np.asarray(positions, dtype=np.int64)
+        return positions if self.indices is None else self.indices[positions]
+
+    def raw(self, positions) -> Tuple[torch.Tensor, torch.Tensor]:
+        X, y = self._data()
+        rows = self.rows(positions)
+        xb = torch.from_numpy(np.ascontiguousarray(X[rows]))
+        yb = torch.from_numpy(y[rows].astype(np.int64))
+        return xb, yb
+
+    def __getitem__(self, positions):
+        if np.isscalar(positions):
+            xb, yb = self.raw([positions])
+            return normalize_batch(xb)[0], yb[0]
+        xb, yb = self.raw(positions)
+        return normalize_batch(xb, out=_batch_buffer(len(xb))), yb
+
+
+@dataclass
+class CifarLoaderSpec:
+    # picklable description of the loaders, passed between steps instead of tensors
+    cifar_dir: str
+    train_idx: np.ndarray
+    val_idx: np.ndarray
+    batch_size: int = 128
+    num_workers: int = 0
+    prefetch_factor: int = 2
+    pin_memory: bool = False
+    persistent_workers: bool = True
+    # >0: depth of an in-process background thread queue (useful with num_workers=0)
+    background_prefetch: int = 0
+    # "memmap": local uint8 store; "minio": stream packed shards from the bucket
+    source: str = "memmap"
+    bucket_name: str = ""
+    shard_prefix: str = ""
+    shuffle_buffer: int = 10000
+    prefetch_shards: int = 2
+    shard_cache_mb: int = 1024
+
+    def datasets(self) -> Tuple[Dataset, Dataset, Dataset]:
+        if self.source == "minio":
+            from src.utils.shard_stream import ShardStreamDataset
+
+            def _stream(split: str, shuffle_buffer: int) -> ShardStreamDataset:
+                return ShardStreamDataset(
+                    self.bucket_name,
+                    self.shard_prefix,
+                    split,
+                    self.batch_size,
+                    shuffle_buffer=shuffle_buffer,
+                    prefetch_shards=self.prefetch_shards,
+                    cache_mb=self.shard_cache_mb,
+                )
+
+            return _stream("train", self.shuffle_buffer), _stream("val", 0), _stream("test", 0)
+        return (
+            CifarUint8Dataset(self.cifar_dir, "train", self.train_idx),
+            CifarUint8Dataset(self.cifar_dir, "train", self.val_idx),
+            CifarUint8Dataset(self.cifar_dir, "test"),
+        )
+
+
+class BackgroundPrefetcher:
+    # iterates a loader from a daemon thread, keeping up to `depth` batches ready;
+    # avoids worker process start-up cost for small datasets
+    _DONE = object()
+
+    def __init__(self, loader: DataLoader, depth: int = 2):
+        self.loader = loader
+        self.depth = max(1, depth)
+
+    def __len__(self) -> int:
+        return len(self.loader)
+
+    def __getattr__(self, name):
+        if name == "loader":
+            raise AttributeError(name)
+        return getattr(self.loader, name)
+
+    def __iter__(self) -> Iterator:
+        q: queue.Queue = queue.Queue(maxsize=self.depth)
+        stop = threading.Event()
+
+        def _produce():
+            try:
+                for batch in self.loader:
+                    if stop.is_set():
+                        return
+                    q.put(batch)
+            except Exception as e:  # surfaced in the consumer thread
+                q.put(e)
+                return
+            q.put(self._DONE)
+
+        t = threading.Thread(target=_produce, name="cifar-prefetch", daemon=True)
+        t.start()
+        try:
+            while True:
+                item = q.get()
+                if item is self._DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            # unblock the producer if it is waiting on a full queue
+            while t.is_alive():
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    t.join(timeout=0.01)
+
+
+def batched_loader(ds: Dataset, spec: CifarLoaderSpec, shuffle: bool, base: Optional[Sampler] = None):
+    sampler = None
+    if not isinstance(ds, IterableDataset):
+        if base is None:
+            base = RandomSampler(ds) if shuffle else SequentialSampler(ds)
+        sampler = BatchSampler(base, batch_size=spec.batch_size, drop_last=False)
+    kwargs = {}
+    if spec.num_workers > 0:
+        kwargs = {
+            "num_workers": spec.num_workers,
+            "prefetch_factor": spec.prefetch_factor,
+            "persistent_workers": spec.persistent_workers,
+        }
+    # batch_size=None: the dataset already returns collated batches
+    loader = DataLoader(
+        ds,
+        sampler=sampler,
+        batch_size=None,
+        pin_memory=spec.pin_memory and torch.cuda.is_available(),
+        **kwargs,
+    )
+    if spec.background_prefetch > 0:
+        return BackgroundPrefetcher(loader, spec.background_prefetch)
+    return loader
+
+
+def build_loaders(spec: CifarLoaderSpec) -> Tuple[DataLoader, DataLoader, DataLoader]:
+    train_ds, val_ds, test_ds = spec.datasets()
+    return (
+        batched_loader(train_ds, spec, shuffle=True),
+        batched_loader(val_ds, spec, shuffle=False),
+        batched_loader(test_ds, spec, shuffle=False),
+    )
+
+
+def loader_batch_size(loader: DataLoader) -> Optional[int]:
+    return (
+        getattr(loader.sampler, "batch_size", None)
+        or getattr(loader.dataset, "batch_size", None)
+        or loader.batch_size
+    )
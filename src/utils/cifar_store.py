@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+
+from src.utils.settings import CIFAR_STORE_DIR, DATA_RAW_DIR
+
+TRAIN_BATCHES = tuple(f"data_batch_{i}" for i in range(1, 6))
+TEST_BATCH = "test_batch"
+IMAGE_SHAPE = (3, 32, 32)
+ROW_SIZE = 3 * 32 * 32
+INDEX_FILE = "index.json"
+
+
+def dvc_md5() -> str | None:
+    dvc_file = f"{DATA_RAW_DIR.rstrip('/')}.dvc"
+    if not os.path.exists(dvc_file):
+        return None
+    with open(dvc_file, "r") as f:
+        for line in f:
+            line = line.strip().lstrip("- ")
+            if line.startswith("md5:"):
+                return line.split(":", 1)[1].strip().removesuffix(".dir")
+    return None
+
+
+def files_digest(cifar_dir: str) -> str:
+    # fallback when the dataset is not DVC-tracked: cheap stat-based fingerprint
+    h = hashlib.md5()
+    for name in TRAIN_BATCHES + (TEST_BATCH,):
+        st = os.stat(os.path.join(cifar_dir, name))
+        h.update(f"{name}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def content_key(cifar_dir: str) -> str:
+    return dvc_md5() or files_digest(cifar_dir)
+
+
+def _read_pickle_batch(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    with open(path, "rb") as f:
+        d = pickle.load(f, encoding="bytes")
+    x = np.ascontiguousarray(d[b"data"], dtype=np.uint8)  # (10000, 3072)
+    y = np.asarray(d[b"labels"], dtype=np.uint8)
+    return x, y
+
+
+def _write_split(out_dir: str, split: str, cifar_dir: str, names: Tuple[str, ...], batches: Dict) -> None:
+    parts = [_read_pickle_batch(os.path.join(cifar_dir, name)) for name in names]
+    total = sum(len(x) for x, _ in parts)
+
+    X = np.lib.format.open_memmap(os.path.join(out_dir, f"{split}_x.npy"), mode="w+", dtype=np.uint8, shape=(total, ROW_SIZE))
+    Y = np.lib.format.open_memmap(os.path.join(out_dir, f"{split}_y.npy"), mode="w+", dtype=np.uint8, shape=(total,))
+    start = 0
+    for name, (x, y) in zip(names, parts):
+        n = len(x)
+        X[start:start + n] = x
+        Y[start:start + n] = y
+        batches[name] = {"split": split, "start": start, "stop": start + n}
+        start += n
+    X.flush()
+    Y.flush()
+    del X, Y
+
+
+def build_store(cifar_dir: str, store_dir: str = CIFAR_STORE_DIR) -> str:
+    key = content_key(cifar_dir)
+    target = os.path.join(store_dir, key)
+    if os.path.exists(os.path.join(target, INDEX_FILE)):
+        return target
+
+    os.makedirs(store_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{key}-", dir=store_dir)
+    try:
+        batches: Dict[str, Dict] = {}
+        _write_split(tmp, "train", cifar_dir, TRAIN_BATCHES, batches)
+        _write_split(tmp, "test", cifar_dir, (TEST_BATCH,), batches)
+        with open(os.path.join(tmp, INDEX_FILE), "w") as f:
+            json.dump({"key": key, "source": os.path.abspath(cifar_dir), "row_size": ROW_SIZE, "batches": batches}, f, indent=2)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # another process converted the same content first
+            if not os.path.exists(os.path.join(target, INDEX_FILE)):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return target
+
+
+@lru_cache(maxsize=4)
+def _open(target: str) -> Dict:
+    with open(os.path.join(target, INDEX_FILE), "r") as f:
+        index = json.load(f)
+    arrays = {
+        name: np.load(os.path.join(target, f"{name}.npy"), mmap_mode="r")
+        for name in ("train_x", "train_y", "test_x", "test_y")
+    }
+    return {"index": index, **arrays}
+
+
+def open_store(cifar_dir: str) -> Dict:
+    return _open(build_store(cifar_dir))
+
+
+def load_train(cifar_dir: str) -> Tuple[np.ndarray, np.ndarray]:
+    store = open_store(cifar_dir)
+    return store["train_x"], store["train_y"]
+
+
+def load_test(cifar_dir: str) -> Tuple[np.ndarray, np.ndarray]:
+    store = open_store(cifar_dir)
+    return store["test_x"], store["test_y"]
+
+
+def load_batch(cifar_dir: str, name: str) -> Tuple[np.ndarray, np.ndarray]:
+    store = open_store(cifar_dir)
+    meta = store["index"]["batches"][name]
+    sl = slice(meta["start"], meta["stop"])
+    return store[f"{meta['split']}_x"][sl], store[f"{meta['split']}_y"][sl]
@@ -0,0 +1,82 @@
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
+from typing import Dict
+
+import torch
+
+
+def bf16_supported() -> bool:
+    # native bf16 matmul/conv on CPU needs avx512_bf16 or AMX; elsewhere autocast
+    # still runs but is emulated and usually slower than fp32
+    for probe in (
+        lambda: torch.ops.mkldnn._is_mkldnn_bf16_supported(),
+        lambda: torch.cpu._is_avx512_bf16_supported(),
+    ):
+        try:
+            return bool(probe())
+        except (AttributeError, RuntimeError):
+            continue
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+        return "avx512_bf16" in flags or "amx_bf16" in flags
+    except OSError:
+        return False
+
+
+def configure_threads(num_threads: int = 0, interop_threads: int = 0) -> Dict[str, int]:
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    if interop_threads > 0:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # can only be set once, before any inter-op parallel work started
+            pass
+    return {"num_threads": torch.get_num_threads(), "interop_threads": torch.get_num_interop_threads()}
+
+
+@dataclass
+class CpuPerfConfig:
+    num_threads: int = 0
+    interop_threads: int = 0
+    channels_last: bool = False
+    bf16_autocast: bool = False
+    compile_model: bool = False
+
+    def __post_init__(self):
+        # silently fall back to fp32 where bf16 is not native
+        self.bf16_requested = self.bf16_autocast
+        self.bf16_autocast = self.bf16_autocast and bf16_supported()
+
+    def apply_threads(self) -> Dict[str, int]:
+        return configure_threads(self.num_threads, self.interop_threads)
+
+    def prepare_model(self, model: torch.nn.Module) -> torch.nn.Module:
+        # returns the callable used in the hot loop; `model` itself stays a plain
+        # nn.Module so it can be pickled, registered and traced afterwards
+        if self.channels_last:
+            model.to(memory_format=torch.channels_last)
+        if self.compile_model:
+            return torch.compile(model)
+        return model
+
+    def restore_model(self, model: torch.nn.Module) -> torch.nn.Module:
+        if self.channels_last:
+            model.to(memory_format=torch.contiguous_format)
+        return model
+
+    def inputs(self, xb: torch.Tensor) -> torch.Tensor:
+        if self.channels_last:
+            return xb.contiguous(memory_format=torch.channels_last)
+        return xb
+
+    def autocast(self, device: str):
+        if self.bf16_autocast:
+            return torch.autocast(device_type=device, dtype=torch.bfloat16)
+        return nullcontext()
+
+    def as_params(self, prefix: str = "cpu_") -> Dict:
+        params = {f"{prefix}{k}": v for k, v in asdict(self).items()}
+        params[f"{prefix}bf16_requested"] = self.bf16_requested
+        return params
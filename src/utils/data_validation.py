@@ -0,0 +1,228 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.utils.cifar_store import IMAGE_SHAPE, ROW_SIZE, TEST_BATCH, TRAIN_BATCHES, build_store, content_key, load_batch, open_store
+from src.utils.drift import PSI_THRESHOLD, psi_from_counts
+from src.utils.settings import DATA_BASELINE_PATH
+
+NUM_CLASSES = 10
+BATCH_ROWS = 10000
+_HASH_CHUNK = 1024
+# fixed odd 64-bit keys: multilinear hash of a row viewed as 384 uint64 words,
+# identical in every worker process
+_HASH_KEYS = np.random.default_rng(1234).integers(1, 2**63, size=ROW_SIZE // 8, dtype=np.uint64) | np.uint64(1)
+
+
+@dataclass
+class ValidationReport:
+    passed: bool
+    rows: int
+    checks: Dict[str, bool] = field(default_factory=dict)
+    failures: List[str] = field(default_factory=list)
+    duplicate_rows: int = 0
+    cross_split_duplicates: int = 0
+    duplicate_examples: List[str] = field(default_factory=list)
+    class_counts: Dict[str, List[int]] = field(default_factory=dict)
+    class_ratio: Dict[str, float] = field(default_factory=dict)
+    channel_mean: List[float] = field(default_factory=list)
+    channel_std: List[float] = field(default_factory=list)
+    channel_psi_max: float = 0.0
+    baseline_created: bool = False
+    baseline_updated: bool = False
+    elapsed_s: float = 0.0
+    batches: Dict[str, Dict] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def row_hashes(x: np.ndarray) -> np.ndarray:
+    # (n, 3072) uint8 -> (n,) uint64, chunked to keep the products in cache
+    out = np.empty(len(x), dtype=np.uint64)
+    for s in range(0, len(x), _HASH_CHUNK):
+        words = np.ascontiguousarray(x[s:s + _HASH_CHUNK]).view(np.uint64)
+        out[s:s + _HASH_CHUNK] = (words * _HASH_KEYS).sum(axis=1, dtype=np.uint64)
+    return out
+
+
+def channel_hist(x: np.ndarray) -> np.ndarray:
+    # exact per-channel pixel histograms (3, 256): mergeable, and mean/std/PSI derive from them
+    x3 = x.reshape(len(x), IMAGE_SHAPE[0], -1)
+    return np.stack([np.bincount(x3[:, c].ravel(), minlength=256) for c in range(IMAGE_SHAPE[0])])
+
+
+def hist_moments(hist: np.ndarray):
+    values = np.arange(hist.shape[-1], dtype=np.float64)
+    n = np.maximum(hist.sum(axis=-1), 1)
+    mean = (hist * values).sum(axis=-1) / n
+    var = (hist * values ** 2).sum(axis=-1) / n - mean ** 2
+    return mean, np.sqrt(np.maximum(var, 0.0))
+
+
+def check_batch(cifar_dir: str, name: str, sample_rows: int = 0) -> Dict:
+    # runs in a pool worker: reads one batch from the memmapped store
+    x, y = load_batch(cifar_dir, name)
+    stats_x = x
+    if 0 < sample_rows < len(x):
+        stats_x = x[:: len(x) // sample_rows][:sample_rows]  # evenly strided rows
+    y = np.asarray(y)
+    return {
+        "name": name,
+        "rows": int(len(x)),
+        "label_rows": int(len(y)),
+        "row_size": int(x.shape[1]) if x.ndim == 2 else -1,
+        "x_dtype": str(x.dtype),
+        "y_dtype": str(y.dtype),
+        "label_min": int(y.min()) if len(y) else -1,
+        "label_max": int(y.max()) if len(y) else -1,
+        "class_counts": np.bincount(y, minlength=NUM_CLASSES)[:NUM_CLASSES].tolist(),
+        "hashes": row_hashes(x),
+        "channel_hist": channel_hist(stats_x),
+        "stats_rows": int(len(stats_x)),
+    }
+
+
+def _duplicates(cifar_dir: str, results: List[Dict], splits: Dict[str, str]):
+    # equal hashes are confirmed byte-for-byte, so collisions cannot report false duplicates
+    hashes = np.concatenate([r["hashes"] for r in results])
+    owner = np.repeat(np.arange(len(results)), [len(r["hashes"]) for r in results])
+    local = np.concatenate([np.arange(len(r["hashes"])) for r in results])
+    order = np.argsort(hashes, kind="stable")
+    h = hashes[order]
+    cand = np.flatnonzero(h[1:] == h[:-1])
+    if len(cand) == 0:
+        return 0, 0, []
+
+    first, second = order[cand], order[cand + 1]
+    names = [r["name"] for r in results]
+    batches = {n: load_batch(cifar_dir, n)[0] for n in set(names[i] for i in owner[np.concatenate([first, second])])}
+
+    def _rows(idx: np.ndarray) -> np.ndarray:
+        out = np.empty((len(idx), ROW_SIZE), dtype=np.uint8)
+        for b in np.unique(owner[idx]):
+            m = owner[idx] == b
+            out[m] = batches[names[b]][local[idx[m]]]
+        return out
+
+    same = (_rows(first) == _rows(second)).all(axis=1)
+    first, second = first[same], second[same]
+    cross = np.array([splits[names[a]] != splits[names[b]] for a, b in zip(owner[first], owner[second])], dtype=bool)
+    examples = [f"{names[owner[a]]}:{local[a]}={names[owner[b]]}:{local[b]}" for a, b in zip(first[:5], second[:5])]
+    return int(len(first)), int(cross.sum()), examples
+
+
+def load_baseline(path: str = DATA_BASELINE_PATH) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(hist: np.ndarray, key: str, path: str = DATA_BASELINE_PATH) -> None:
+    mean, std = hist_moments(hist)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump({"content_key": key, "channel_mean": mean.tolist(), "channel_std": std.tolist(), "channel_hist": hist.tolist()}, f)
+    os.replace(tmp, path)
+
+
+def validate_dataset(
+    cifar_dir: str,
+    workers: int = 0,
+    sample_rows: int = 0,
+    max_class_ratio: float = 1.5,
+    max_duplicate_fraction: float = 0.001,
+    stats_tolerance: float = 0.1,
+    baseline_path: str = DATA_BASELINE_PATH,
+    update_baseline: bool = False,
+) -> ValidationReport:
+    # All six batches, one pool task each; every rule is recorded as a named
+    # boolean check instead of raising, so the caller decides what fails a run.
+    start = time.perf_counter()
+    build_store(cifar_dir)  # convert once in the parent, workers only open the memmaps
+    names = TRAIN_BATCHES + (TEST_BATCH,)
+    splits = {n: open_store(cifar_dir)["index"]["batches"][n]["split"] for n in names}
+    workers = workers if workers > 0 else min(len(names), os.cpu_count() or 1)
+    if workers == 1:
+        results = [check_batch(cifar_dir, n, sample_rows) for n in names]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(check_batch, [cifar_dir] * len(names), names, [sample_rows] * len(names)))
+
+    checks: Dict[str, bool] = {}
+    batches: Dict[str, Dict] = {}
+    for r in results:
+        n = r["name"]
+        checks[f"{n}.shape"] = r["rows"] == r["label_rows"] == BATCH_ROWS and r["row_size"] == ROW_SIZE
+        checks[f"{n}.dtype"] = r["x_dtype"] == "uint8" and r["y_dtype"] == "uint8"
+        checks[f"{n}.labels"] = 0 <= r["label_min"] and r["label_max"] < NUM_CLASSES
+        batches[n] = {k: r[k] for k in ("rows", "row_size", "x_dtype", "label_min", "label_max", "stats_rows")}
+
+    class_counts: Dict[str, List[int]] = {}
+    class_ratio: Dict[str, float] = {}
+    for split in ("train", "test"):
+        counts = np.sum([r["class_counts"] for r in results if splits[r["name"]] == split], axis=0)
+        class_counts[split] = counts.tolist()
+        class_ratio[split] = float(counts.max() / max(counts.min(), 1))
+        checks[f"class_balance.{split}"] = counts.min() > 0 and class_ratio[split] <= max_class_ratio
+
+    rows = sum(r["rows"] for r in results)
+    test_rows = sum(r["rows"] for r in results if splits[r["name"]] == "test")
+    dup, cross, examples = _duplicates(cifar_dir, results, splits)
+    checks["duplicates"] = dup <= max_duplicate_fraction * rows
+    checks["train_test_leakage"] = cross <= max_duplicate_fraction * test_rows
+
+    # per-batch channel histograms against the baseline: a single corrupted batch
+    # is not diluted by the other five
+    hist = np.sum([r["channel_hist"] for r in results], axis=0)
+    key = content_key(cifar_dir)
+    baseline = load_baseline(baseline_path)
+    baseline_created = baseline is None
+    if baseline is None:
+        save_baseline(hist, key, baseline_path)
+        baseline = load_baseline(baseline_path)
+    base_hist = np.asarray(baseline["channel_hist"], dtype=np.float64)
+    base_mean, base_std = np.asarray(baseline["channel_mean"]), np.maximum(np.asarray(baseline["channel_std"]), 1e-6)
+    psi_max = 0.0
+    for r in results:
+        mean, _ = hist_moments(r["channel_hist"])
+        shift = np.abs(mean - base_mean) / base_std
+        psi = psi_from_counts(base_hist, r["channel_hist"])
+        batches[r["name"]].update({"channel_mean": mean.tolist(), "mean_shift_std": shift.tolist(), "channel_psi": psi.tolist()})
+        checks[f"{r['name']}.channel_stats"] = bool((shift <= stats_tolerance).all() and (psi < PSI_THRESHOLD).all())
+        psi_max = max(psi_max, float(psi.max()))
+
+    # update_baseline accepts a legitimate change in the pixel statistics: the
+    # channel_stats checks (still reported against the old baseline) leave the gate,
+    # and the new baseline is written if every other rule passes
+    failures = [k for k, ok in checks.items() if not ok and not (update_baseline and k.endswith(".channel_stats"))]
+    baseline_updated = update_baseline and not failures and not baseline_created
+    if baseline_updated:
+        save_baseline(hist, key, baseline_path)
+    mean, std = hist_moments(hist)
+    return ValidationReport(
+        passed=not failures,
+        rows=rows,
+        checks={k: bool(v) for k, v in checks.items()},
+        failures=failures,
+        duplicate_rows=dup,
+        cross_split_duplicates=cross,
+        duplicate_examples=examples,
+        class_counts=class_counts,
+        class_ratio=class_ratio,
+        channel_mean=mean.tolist(),
+        channel_std=std.tolist(),
+        channel_psi_max=psi_max,
+        baseline_created=baseline_created,
+        baseline_updated=baseline_updated,
+        elapsed_s=time.perf_counter() - start,
+        batches=batches,
+    )
@@ -0,0 +1,207 @@
+import json
+import os
+import socket
+import tempfile
+import time
+from dataclasses import replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import torch.nn as nn
+import torch.optim as optim
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DistributedSampler, IterableDataset
+
+from src.utils.checkpoints import load_checkpoint, save_checkpoint
+from src.utils.cifar_dataset import CifarLoaderSpec, batched_loader
+from src.utils.cpu_perf import CpuPerfConfig
+from src.utils.profiling import EpochTimer
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def threads_per_rank(world_size: int, num_threads: int = 0) -> int:
+    total = num_threads if num_threads > 0 else (os.cpu_count() or 1)
+    return max(1, total // world_size)
+
+
+def _all_reduce(values: Sequence[float], op=dist.ReduceOp.SUM) -> List[float]:
+    t = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(t, op=op)
+    return t.tolist()
+
+
+def _counted(loader, seen: List[int]):
+    for xb, yb in loader:
+        seen[0] += yb.size(0)
+        yield xb, yb
+
+
+def _log_rank0(run_id: Optional[str], metrics: Dict[str, float], step: int) -> None:
+    if not run_id:
+        return
+    # imported lazily: only rank 0 ever talks to the tracking server
+    from mlflow.entities import Metric
+    from mlflow.tracking import MlflowClient
+
+    ts = int(time.time() * 1000)
+    MlflowClient().log_batch(run_id, metrics=[Metric(k, float(v), ts, step) for k, v in metrics.items()])
+
+
+def _worker(rank: int, world_size: int, port: int, cfg: Dict, out_dir: str) -> None:
+    # lazy import: train.py imports this module
+    from src.steps.training.train import SimpleCNN, train_one_epoch, validate
+
+    dist.init_process_group("gloo", init_method=f"tcp://127.0.0.1:{port}", rank=rank, world_size=world_size)
+    try:
+        spec: CifarLoaderSpec = cfg["spec"]
+        perf = CpuPerfConfig(**{**cfg["perf"], "num_threads": cfg["threads_per_rank"], "interop_threads": 1})
+        perf.apply_threads()
+        torch.manual_seed(cfg["seed"])
+
+        model = SimpleCNN()
+        optimizer = optim.Adam(model.parameters(), lr=cfg["lr"])
+        start_epoch = 1
+        if cfg.get("init_state") is not None:
+            model.load_state_dict(cfg["init_state"])
+        if cfg.get("resume_path"):
+            payload = load_checkpoint(cfg["resume_path"], model, optimizer, restore_rng=False)
+            start_epoch = payload["epoch"] + 1
+        if perf.channels_last:
+            model.to(memory_format=torch.channels_last)
+        # DDP broadcasts rank 0's parameters and all-reduces gradients in backward
+        ddp = DistributedDataParallel(model)
+        fwd = torch.compile(ddp) if perf.compile_model else ddp
+
+        train_ds, val_ds, _ = spec.datasets()
+        if isinstance(train_ds, IterableDataset):
+            # streamed shards are split across ranks by the dataset itself
+            train_sampler = val_sampler = None
+        else:
+            train_sampler = DistributedSampler(train_ds, num_replicas=world_size, rank=rank, shuffle=True, seed=cfg["seed"])
+            val_sampler = DistributedSampler(val_ds, num_replicas=world_size, rank=rank, shuffle=False)
+        train_loader = batched_loader(train_ds, spec, shuffle=True, base=train_sampler)
+        val_loader = batched_loader(val_ds, spec, shuffle=False, base=val_sampler)
+
+        criterion = nn.CrossEntropyLoss()
+        timer = EpochTimer("cpu")
+
+        history = []
+        for epoch in range(start_epoch, cfg["epochs"] + 1):
+            (train_sampler or train_ds).set_epoch(epoch)
+            t0 = time.perf_counter()
+            # streamed shards do not split evenly (9 shards over 2, 4 or 8 ranks, short
+            # last shard); join() shadows the all-reduces of ranks that ran out of batches
+            with ddp.join():
+                train_loss, train_acc = train_one_epoch(ddp, fwd, train_loader, criterion, optimizer, "cpu", perf, timer)
+            elapsed = time.perf_counter() - t0
+            n_train = timer.samples
+
+            metrics = {"epoch": epoch}
+            loss_sum, acc_sum, n = _all_reduce([train_loss * n_train, train_acc * n_train, n_train])
+            n = max(n, 1)
+            (max_elapsed,) = _all_reduce([elapsed], op=dist.ReduceOp.MAX)
+            metrics.update(
+                train_loss=loss_sum / n,
+                train_acc=acc_sum / n,
+                train_epoch_time_s=max_elapsed,
+                train_samples_per_sec=n / max_elapsed,
+            )
+
+            if cfg["validate"]:
+                ddp.eval()
+                # actual rows per rank: a streamed split can leave a rank with none
+                seen = [0]
+                val_loss, val_acc = validate(fwd, _counted(val_loader, seen), criterion, "cpu", perf)
+                n_val = seen[0]
+                loss_sum, acc_sum, n = _all_reduce([val_loss * n_val, val_acc * n_val, n_val])
+                n = max(n, 1)
+                metrics.update(val_loss=loss_sum / n, val_acc=acc_sum / n)
+
+            history.append(metrics)
+            if rank == 0:
+                _log_rank0(cfg.get("run_id"), {k: v for k, v in metrics.items() if k != "epoch"}, epoch)
+                every = cfg.get("checkpoint_every", 0)
+                if cfg.get("checkpoint_dir") and every and epoch % every == 0:
+                    save_checkpoint(cfg["checkpoint_dir"], model, optimizer, epoch, extra=metrics)
+
+        if rank == 0:
+            model.to(memory_format=torch.contiguous_format)
+            torch.save(model.state_dict(), os.path.join(out_dir, "state_dict.pt"))
+            with open(os.path.join(out_dir, "history.json"), "w") as f:
+                json.dump(history, f)
+    finally:
+        dist.destroy_process_group()
+
+
+def run_ddp(
+    spec: CifarLoaderSpec,
+    world_size: int,
+    epochs: int,
+    lr: float,
+    perf: Optional[CpuPerfConfig] = None,
+    run_id: Optional[str] = None,
+    init_state: Optional[Dict[str, torch.Tensor]] = None,
+    seed: int = 0,
+    validate: bool = True,
+    checkpoint_dir: Optional[str] = None,
+    checkpoint_every: int = 0,
+    resume_path: Optional[str] = None,
+) -> Tuple[Dict[str, torch.Tensor], List[Dict[str, float]]]:
+    perf = perf or CpuPerfConfig()
+    cfg = {
+        "spec": spec,
+        "epochs": epochs,
+        "lr": lr,
+        "perf": {
+            "channels_last": perf.channels_last,
+            "bf16_autocast": perf.bf16_requested,
+            "compile_model": perf.compile_model,
+        },
+        "threads_per_rank": threads_per_rank(world_size, perf.num_threads),
+        "run_id": run_id,
+        "init_state": init_state,
+        "seed": seed,
+        "validate": validate,
+        "checkpoint_dir": checkpoint_dir,
+        "checkpoint_every": checkpoint_every,
+        "resume_path": resume_path,
+    }
+    with tempfile.TemporaryDirectory(prefix="ddp-") as out_dir:
+        mp.spawn(_worker, args=(world_size, _free_port(), cfg, out_dir), nprocs=world_size, join=True)
+        state = torch.load(os.path.join(out_dir, "state_dict.pt"))
+        with open(os.path.join(out_dir, "history.json"), "r") as f:
+            history = json.load(f)
+    return state, history
+
+
+def measure_scaling(
+    spec: CifarLoaderSpec,
+    world_sizes: Sequence[int] = (1, 2, 4, 8),
+    probe_samples: int = 8192,
+    lr: float = 1e-3,
+    perf: Optional[CpuPerfConfig] = None,
+) -> Dict[str, float]:
+    # strong scaling: the same `probe_samples` are split across N ranks for one epoch
+    probe = replace(spec, train_idx=spec.train_idx[:probe_samples], val_idx=spec.val_idx[:0])
+    cpus = os.cpu_count() or 1
+    metrics: Dict[str, float] = {}
+    base = None
+    for n in sorted(set(world_sizes)):
+        if n > cpus:
+            print(f"[ddp] skipping np{n}: only {cpus} cpus")
+            metrics[f"ddp_skipped_np{n}"] = 1.0
+            continue
+        _, history = run_ddp(probe, n, epochs=1, lr=lr, perf=perf, validate=False)
+        throughput = history[-1]["train_samples_per_sec"]
+        if base is None:
+            base = throughput / n
+        metrics[f"ddp_samples_per_sec_np{n}"] = throughput
+        metrics[f"ddp_scaling_efficiency_np{n}"] = throughput / (n * base) if base else float("nan")
+    return metrics
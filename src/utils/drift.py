@@ -0,0 +1,144 @@
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# per-column drift decision, mirroring Evidently's defaults for numerical columns:
+# KS p-value < 0.05 up to 1000 reference rows, normed Wasserstein >= 0.1 above
+KS_ALPHA = 0.05
+WASSERSTEIN_THRESHOLD = 0.1
+PSI_THRESHOLD = 0.1
+AUTO_KS_MAX_ROWS = 1000
+
+
+@dataclass
+class DriftResult:
+    drift_share: float
+    n_drifted: int
+    n_columns: int
+    stattest: str
+    rows_reference: int
+    rows_current: int
+    columns: List[str] = field(default_factory=list)
+    ks_stat: List[float] = field(default_factory=list)
+    ks_pvalue: List[float] = field(default_factory=list)
+    psi: List[float] = field(default_factory=list)
+    wasserstein: List[float] = field(default_factory=list)
+    drifted: List[bool] = field(default_factory=list)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "drift_share": self.drift_share,
+            "drift_n_drifted": self.n_drifted,
+            "drift_max_psi": max(self.psi, default=0.0),
+            "drift_max_ks": max(self.ks_stat, default=0.0),
+        }
+
+
+def ks_pvalue(d: np.ndarray, n: int, m: int) -> np.ndarray:
+    # asymptotic Kolmogorov distribution with the Stephens small-sample correction
+    en = np.sqrt(n * m / (n + m))
+    lam = (en + 0.12 + 0.11 / en) * d
+    j = np.arange(1, 101)[:, None]
+    terms = 2.0 * (-1.0) ** (j - 1) * np.exp(-2.0 * (j * lam[None, :]) ** 2)
+    # the alternating series does not converge near 0, where the p-value is 1
+    return np.where(lam < 0.2, 1.0, np.clip(terms.sum(axis=0), 0.0, 1.0))
+
+
+def ks_wasserstein(reference: np.ndarray, current: np.ndarray):
+    # One sort of the stacked (n + m, k) sample gives both empirical CDFs for all k
+    # columns at once; KS is their max gap, Wasserstein-1 the area between them.
+    n, m = len(reference), len(current)
+    stacked = np.concatenate([reference, current]).astype(np.float64)
+    order = np.argsort(stacked, axis=0, kind="stable")
+    values = np.take_along_axis(stacked, order, axis=0)
+    from_ref = order < n
+    gap = np.cumsum(from_ref, axis=0) / n - np.cumsum(~from_ref, axis=0) / m
+
+    # CDFs are only comparable at the end of each run of tied values
+    run_end = np.ones_like(from_ref)
+    run_end[:-1] = values[1:] != values[:-1]
+    ks = np.where(run_end, np.abs(gap), 0.0).max(axis=0)
+    wasserstein = (np.abs(gap[:-1]) * np.diff(values, axis=0)).sum(axis=0)
+    return ks, ks_pvalue(ks, n, m), wasserstein
+
+
+def psi(reference: np.ndarray, current: np.ndarray, bins: int = 20, eps: float = 1e-4) -> np.ndarray:
+    # equal-width bins on the reference range of each column; all columns are
+    # counted in a single bincount by offsetting column j into [j * bins, (j + 1) * bins)
+    k = reference.shape[1]
+    lo = reference.min(axis=0)
+    width = np.maximum(reference.max(axis=0) - lo, 1e-12) / bins
+    offsets = np.arange(k) * bins
+
+    def _counts(x: np.ndarray) -> np.ndarray:
+        b = np.clip(((x - lo) / width).astype(np.int64), 0, bins - 1) + offsets
+        return np.bincount(b.ravel(), minlength=k * bins).reshape(k, bins)
+
+    return psi_from_counts(_counts(reference), _counts(current), eps)
+
+
+def psi_from_counts(ref_counts: np.ndarray, cur_counts: np.ndarray, eps: float = 1e-4) -> np.ndarray:
+    # (..., bins) histograms -> PSI over the last axis
+    p_ref = np.maximum(ref_counts / np.maximum(ref_counts.sum(axis=-1, keepdims=True), 1), eps)
+    p_cur = np.maximum(cur_counts / np.maximum(cur_counts.sum(axis=-1, keepdims=True), 1), eps)
+    return ((p_cur - p_ref) * np.log(p_cur / p_ref)).sum(axis=-1)
+
+
+def compute_drift(
+    reference: np.ndarray,
+    current: np.ndarray,
+    columns: Sequence[str],
+    stattest: str = "auto",
+    psi_bins: int = 20,
+) -> DriftResult:
+    # reference (n, k) and current (m, k), one column per monitored feature
+    if len(reference) < 2 or len(current) < 2:
+        raise ValueError(f"Not enough rows for drift (reference={len(reference)}, current={len(current)}).")
+
+    ks, pvalue, wd = ks_wasserstein(reference, current)
+    psi_values = psi(reference, current, bins=psi_bins)
+    # Evidently norms the distance by the reference std
+    wd_normed = wd / np.maximum(reference.std(axis=0), 1e-3)
+    return drift_result(columns, stattest, len(reference), len(current), ks, pvalue, psi_values, wd_normed)
+
+
+def drift_result(
+    columns: Sequence[str],
+    stattest: str,
+    n_reference: int,
+    n_current: int,
+    ks: np.ndarray,
+    pvalue: np.ndarray,
+    psi_values: np.ndarray,
+    wd_normed: np.ndarray,
+) -> DriftResult:
+    if stattest == "auto":
+        stattest = "ks" if n_reference <= AUTO_KS_MAX_ROWS else "wasserstein"
+    if stattest == "ks":
+        drifted = pvalue < KS_ALPHA
+    elif stattest == "wasserstein":
+        drifted = wd_normed >= WASSERSTEIN_THRESHOLD
+    elif stattest == "psi":
+        drifted = psi_values >= PSI_THRESHOLD
+    else:
+        raise ValueError(f"Unknown stattest: {stattest}")
+
+    k = len(columns)
+    return DriftResult(
+        drift_share=float(drifted.sum() / max(k, 1)),
+        n_drifted=int(drifted.sum()),
+        n_columns=k,
+        stattest=stattest,
+        rows_reference=int(n_reference),
+        rows_current=int(n_current),
+        columns=list(columns),
+        ks_stat=ks.tolist(),
+        ks_pvalue=pvalue.tolist(),
+        psi=psi_values.tolist(),
+        wasserstein=wd_normed.tolist(),
+        drifted=drifted.tolist(),
+    )
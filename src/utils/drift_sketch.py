@@ -0,0 +1,151 @@
+import fcntl
+import glob
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.drift import DriftResult, drift_result, ks_pvalue, psi_from_counts
+from src.utils.settings import DRIFT_SKETCH_DIR
+
+# proba_* live in [0, 1], so a fixed grid is enough: merging two sketches is adding
+# their counts, exactly, whatever the window or the order of the updates
+PROBA_BINS = 100
+SKETCH_HOUR_S = 3600
+
+
+class DriftSketch:
+    # k probability histograms + pred/true class counts; the last class slot
+    # counts unknown labels (true_class = -1, e.g. served traffic)
+    def __init__(self, num_classes: int = 10, bins: int = PROBA_BINS):
+        self.bins = bins
+        self.proba = np.zeros((num_classes, bins), dtype=np.int64)
+        self.pred = np.zeros(num_classes + 1, dtype=np.int64)
+        self.true = np.zeros(num_classes + 1, dtype=np.int64)
+
+    @property
+    def n(self) -> int:
+        return int(self.pred.sum())
+
+    def _class_counts(self, labels: np.ndarray) -> np.ndarray:
+        k = len(self.pred) - 1
+        labels = np.asarray(labels, dtype=np.int64)
+        return np.bincount(np.where((labels < 0) | (labels >= k), k, labels), minlength=k + 1)
+
+    def update(self, probs: np.ndarray, pred: np.ndarray, true: np.ndarray) -> "DriftSketch":
+        k = self.proba.shape[0]
+        b = np.clip((np.asarray(probs, dtype=np.float64) * self.bins).astype(np.int64), 0, self.bins - 1)
+        b += np.arange(k) * self.bins
+        self.proba += np.bincount(b.ravel(), minlength=k * self.bins).reshape(k, self.bins)
+        self.pred += self._class_counts(pred)
+        self.true += self._class_counts(true)
+        return self
+
+    def merge(self, other: "DriftSketch") -> "DriftSketch":
+        self.proba += other.proba
+        self.pred += other.pred
+        self.true += other.true
+        return self
+
+    def save(self, path: str) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, proba=self.proba, pred=self.pred, true=self.true)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "DriftSketch":
+        with np.load(path) as data:
+            sk = cls(num_classes=data["proba"].shape[0], bins=data["proba"].shape[1])
+            sk.proba += data["proba"]
+            sk.pred += data["pred"]
+            sk.true += data["true"]
+        return sk
+
+
+class SketchStore:
+    # one sketch per UTC hour (aligned with the inference store partitions),
+    # persisted as monitoring/drift_sketches/hour-<ts // 3600>.npz
+    def __init__(self, sketch_dir: str = DRIFT_SKETCH_DIR):
+        self.sketch_dir = sketch_dir
+        os.makedirs(sketch_dir, exist_ok=True)
+
+    def _path(self, hour: int) -> str:
+        return os.path.join(self.sketch_dir, f"hour-{hour}.npz")
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # collect_inference_data and the server may update the same hour
+        with open(os.path.join(self.sketch_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def hours(self) -> List[int]:
+        names = glob.glob(os.path.join(self.sketch_dir, "hour-*.npz"))
+        return sorted(int(os.path.basename(p)[5:-4]) for p in names)
+
+    def update(self, probs: np.ndarray, pred: np.ndarray, true: np.ndarray, ts: np.ndarray) -> int:
+        hours = np.asarray(ts, dtype=np.int64) // SKETCH_HOUR_S
+        with self._locked():
+            for hour in np.unique(hours):
+                rows = hours == hour
+                path = self._path(int(hour))
+                sk = DriftSketch.load(path) if os.path.exists(path) else DriftSketch(num_classes=probs.shape[1])
+                sk.update(probs[rows], pred[rows], true[rows]).save(path)
+        return len(hours)
+
+    def window(self, start_ts: int, end_ts: int) -> Optional[DriftSketch]:
+        # merged sketch over the hours overlapping [start_ts, end_ts)
+        first, last = start_ts // SKETCH_HOUR_S, (end_ts - 1) // SKETCH_HOUR_S
+        merged = None
+        for hour in self.hours():
+            if first <= hour <= last:
+                sk = DriftSketch.load(self._path(hour))
+                merged = sk if merged is None else merged.merge(sk)
+        return merged
+
+
+def sketch_drift(
+    reference: DriftSketch,
+    current: DriftSketch,
+    columns: Sequence[str],
+    stattest: str = "auto",
+    psi_bins: int = 20,
+) -> DriftResult:
+    # Same statistics as drift.compute_drift, evaluated on the binned CDFs: cost is
+    # O(k * bins) whatever the number of rows behind the sketches.
+    n, m = reference.n, current.n
+    if n < 2 or m < 2:
+        raise ValueError(f"Not enough rows for drift (reference={n}, current={m}).")
+    cdf_ref = np.cumsum(reference.proba, axis=1) / n
+    cdf_cur = np.cumsum(current.proba, axis=1) / m
+    gap = np.abs(cdf_ref - cdf_cur)
+    ks = gap.max(axis=1)
+    width = 1.0 / reference.bins
+    wd = gap.sum(axis=1) * width
+
+    centers = (np.arange(reference.bins) + 0.5) * width
+    p_ref = reference.proba / n
+    std = np.sqrt(np.maximum(p_ref @ centers ** 2 - (p_ref @ centers) ** 2, 0.0))
+    wd_normed = wd / np.maximum(std, 1e-3)
+
+    # psi_bins must divide the sketch grid (100 -> 20 by default)
+    k = reference.proba.shape[0]
+    shape = (k, psi_bins, reference.bins // psi_bins)
+    psi_values = psi_from_counts(reference.proba.reshape(shape).sum(axis=2), current.proba.reshape(shape).sum(axis=2))
+    return drift_result(columns, stattest, n, m, ks, ks_pvalue(ks, n, m), psi_values, wd_normed)
+
+
+def class_drift(reference: DriftSketch, current: DriftSketch) -> Dict[str, float]:
+    # PSI of the predicted and (known) true class mixes
+    labeled = reference.true[:-1].sum() > 0 and current.true[:-1].sum() > 0
+    return {
+        "pred_class_psi": float(psi_from_counts(reference.pred[:-1], current.pred[:-1])),
+        "true_class_psi": float(psi_from_counts(reference.true[:-1], current.true[:-1])) if labeled else 0.0,
+        "current_labeled_frac": float(current.true[:-1].sum() / max(current.n, 1)),
+    }
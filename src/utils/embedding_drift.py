@@ -0,0 +1,219 @@
+import fcntl
+import glob
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from src.utils.drift import KS_ALPHA, ks_wasserstein
+from src.utils.settings import EMBEDDING_RESERVOIR_DIR, MONITORING_DIR
+
+# feature row = [256-d penultimate activations | per-channel mean (3) | per-channel std (3)]
+EMBED_DIM = 256
+STATS_DIM = 6
+RESERVOIR_SIZE = 2000
+RESERVOIR_HOUR_S = 3600
+# first/second half of the latest collect_inference_data run (same split as load_windows)
+LATEST_RESERVOIRS = (
+    os.path.join(MONITORING_DIR, "embeddings_latest_reference.npz"),
+    os.path.join(MONITORING_DIR, "embeddings_latest_current.npz"),
+)
+
+
+def image_stats(x_u8) -> np.ndarray:
+    # (B, 3072) or (B, 3, 32, 32) uint8 -> (B, 6) per-channel mean/std in [0, 1]
+    x = np.asarray(x_u8, dtype=np.float32).reshape(len(x_u8), 3, -1) / 255.0
+    return np.concatenate([x.mean(axis=2), x.std(axis=2)], axis=1)
+
+
+class Reservoir:
+    # Uniform fixed-size sample (Algorithm R, vectorized per batch) of everything
+    # passed to `add`, so memory is O(capacity) whatever the traffic.
+    def __init__(self, dim: int, capacity: int = RESERVOIR_SIZE, seed: Optional[int] = None):
+        self.capacity = capacity
+        self.data = np.empty((capacity, dim), dtype=np.float32)
+        self.size = 0
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self) -> np.ndarray:
+        return self.data[: self.size]
+
+    def add(self, rows: np.ndarray) -> None:
+        rows = np.asarray(rows, dtype=np.float32)
+        fill = min(self.capacity - self.size, len(rows))
+        if fill:
+            self.data[self.size:self.size + fill] = rows[:fill]
+            self.size += fill
+        rest = rows[fill:]
+        if len(rest):
+            # item t (1-based overall) replaces a random slot with probability capacity / t
+            t = self.seen + fill + 1 + np.arange(len(rest))
+            slots = (self.rng.random(len(rest)) * t).astype(np.int64)
+            keep = slots < self.capacity
+            self.data[slots[keep]] = rest[keep]
+        self.seen += len(rows)
+
+    def merge(self, other: "Reservoir") -> "Reservoir":
+        # each slot of the merged sample comes from self or other with probability
+        # proportional to the number of items they have seen
+        if other.seen == 0:
+            return self
+        if self.seen == 0:
+            self.data[: other.size] = other.data[: other.size]
+            self.size, self.seen = other.size, other.seen
+            return self
+        n = min(self.capacity, self.size + other.size)
+        from_self = self.rng.binomial(n, self.seen / (self.seen + other.seen))
+        from_self = int(np.clip(from_self, n - other.size, self.size))
+        a = self.rng.choice(self.size, from_self, replace=False)
+        b = self.rng.choice(other.size, n - from_self, replace=False)
+        merged = np.concatenate([self.data[a], other.data[b]])
+        self.data[:n] = merged
+        self.size, self.seen = n, self.seen + other.seen
+        return self
+
+    def save(self, path: str) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-", suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, data=self.sample(), seen=self.seen, capacity=self.capacity)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Reservoir":
+        with np.load(path) as f:
+            res = cls(f["data"].shape[1], int(f["capacity"]))
+            res.size = len(f["data"])
+            res.data[: res.size] = f["data"]
+            res.seen = int(f["seen"])
+        return res
+
+
+class ReservoirStore:
+    # one feature reservoir per UTC hour, mergeable into any window of hours
+    def __init__(self, reservoir_dir: str = EMBEDDING_RESERVOIR_DIR, capacity: int = RESERVOIR_SIZE):
+        self.reservoir_dir = reservoir_dir
+        self.capacity = capacity
+        os.makedirs(reservoir_dir, exist_ok=True)
+
+    def _path(self, hour: int) -> str:
+        return os.path.join(self.reservoir_dir, f"hour-{hour}.npz")
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with open(os.path.join(self.reservoir_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def hours(self) -> List[int]:
+        names = glob.glob(os.path.join(self.reservoir_dir, "hour-*.npz"))
+        return sorted(int(os.path.basename(p)[5:-4]) for p in names)
+
+    def update(self, features: np.ndarray, ts: int) -> None:
+        path = self._path(int(ts) // RESERVOIR_HOUR_S)
+        with self._locked():
+            res = Reservoir.load(path) if os.path.exists(path) else Reservoir(features.shape[1], self.capacity)
+            res.add(features)
+            res.save(path)
+
+    def merge(self, reservoir: Reservoir, ts: int) -> None:
+        # folds a reservoir built in memory (e.g. over one collect run) into its hour
+        path = self._path(int(ts) // RESERVOIR_HOUR_S)
+        with self._locked():
+            if os.path.exists(path):
+                reservoir = Reservoir.load(path).merge(reservoir)
+            reservoir.save(path)
+
+    def window(self, start_ts: int, end_ts: int) -> Optional[Reservoir]:
+        first, last = start_ts // RESERVOIR_HOUR_S, (end_ts - 1) // RESERVOIR_HOUR_S
+        merged = None
+        for hour in self.hours():
+            if first <= hour <= last:
+                res = Reservoir.load(self._path(hour))
+                merged = res if merged is None else merged.merge(res)
+        return merged
+
+
+@dataclass
+class EmbeddingDriftResult:
+    mmd2: float
+    mmd_pvalue: float
+    pca_drift_share: float
+    stats_drift_share: float
+    drifted: bool
+    rows_reference: int
+    rows_current: int
+    available: bool = True
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def rff_mmd(reference: np.ndarray, current: np.ndarray, n_features: int = 256, permutations: int = 200, seed: int = 0):
+    # MMD^2 with a Gaussian kernel approximated by random Fourier features: the
+    # statistic is the squared distance between mean feature maps, and all
+    # permutations are evaluated in one (P, n + m) @ (n + m, D) product.
+    rng = np.random.default_rng(seed)
+    mu, sd = reference.mean(axis=0), reference.std(axis=0) + 1e-6
+    pooled = (np.concatenate([reference, current]) - mu) / sd
+    n, total = len(reference), len(reference) + len(current)
+
+    # median heuristic for the bandwidth, on a subsample
+    sub = pooled[rng.choice(total, min(total, 500), replace=False)]
+    sq = (sub ** 2).sum(axis=1)
+    d2 = np.maximum(sq[:, None] + sq[None, :] - 2.0 * sub @ sub.T, 0.0)
+    sigma = np.sqrt(np.median(d2[d2 > 0]) / 2.0) if np.any(d2 > 0) else 1.0
+
+    w = rng.normal(scale=1.0 / sigma, size=(pooled.shape[1], n_features))
+    b = rng.uniform(0, 2 * np.pi, n_features)
+    z = np.sqrt(2.0 / n_features) * np.cos(pooled @ w + b)
+
+    def _stat(weights: np.ndarray) -> np.ndarray:
+        # weights: (P, total), +1/n for the "reference" side and -1/m for the other
+        return ((weights @ z) ** 2).sum(axis=1)
+
+    signs = np.concatenate([np.full(n, 1.0 / n), np.full(total - n, -1.0 / (total - n))])
+    observed = float(_stat(signs[None, :])[0])
+    perms = np.argsort(rng.random((permutations, total)), axis=1)
+    null = _stat(signs[perms])
+    pvalue = float((1 + (null >= observed).sum()) / (permutations + 1))
+    return observed, pvalue
+
+
+def pca_drift_share(reference: np.ndarray, current: np.ndarray, components: int = 10) -> float:
+    # KS per principal direction of the reference embeddings
+    mu = reference.mean(axis=0)
+    _, _, vt = np.linalg.svd(reference - mu, full_matrices=False)
+    proj = vt[:components].T
+    _, pvalue, _ = ks_wasserstein((reference - mu) @ proj, (current - mu) @ proj)
+    return float((pvalue < KS_ALPHA).mean())
+
+
+def embedding_drift(
+    reference: np.ndarray,
+    current: np.ndarray,
+    mmd_alpha: float = 0.01,
+    pca_components: int = 10,
+    permutations: int = 200,
+) -> EmbeddingDriftResult:
+    # reference/current: (n, EMBED_DIM + STATS_DIM) reservoir samples
+    if len(reference) < 10 or len(current) < 10:
+        raise ValueError(f"Not enough embedding samples (reference={len(reference)}, current={len(current)}).")
+    emb_ref, emb_cur = reference[:, :EMBED_DIM], current[:, :EMBED_DIM]
+    mmd2, pvalue = rff_mmd(emb_ref, emb_cur, permutations=permutations)
+    _, stats_p, _ = ks_wasserstein(reference[:, EMBED_DIM:], current[:, EMBED_DIM:])
+    return EmbeddingDriftResult(
+        mmd2=mmd2,
+        mmd_pvalue=pvalue,
+        pca_drift_share=pca_drift_share(emb_ref, emb_cur, pca_components),
+        stats_drift_share=float((stats_p < KS_ALPHA).mean()),
+        drifted=pvalue < mmd_alpha,
+        rows_reference=int(len(reference)),
+        rows_current=int(len(current)),
+    )
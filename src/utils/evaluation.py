@@ -0,0 +1,155 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+
+CIFAR_CLASSES = ("airplane", "automobile", "bird", "cat", "deer", "dog", "frog", "horse", "ship", "truck")
+
+
+class StreamingEvaluator:
+    # Accumulates everything on the logits' device, one bincount per statistic
+    # per batch: a k*k confusion matrix, top-k hits and per-bin confidence /
+    # accuracy sums for ECE. Nothing leaves the device until compute(), so the
+    # bookkeeping never syncs the forward pass.
+    def __init__(self, num_classes: int = 10, topk: Sequence[int] = (1, 5), ece_bins: int = 15):
+        self.k = num_classes
+        self.topk = tuple(sorted({t for t in topk if t <= num_classes}))
+        self.ece_bins = ece_bins
+        self._state: Optional[Dict[str, torch.Tensor]] = None
+
+    def _init(self, device: torch.device) -> Dict[str, torch.Tensor]:
+        return {
+            "cm": torch.zeros(self.k * self.k, dtype=torch.long, device=device),
+            "topk": torch.zeros(len(self.topk), dtype=torch.long, device=device),
+            "bin_count": torch.zeros(self.ece_bins, dtype=torch.float64, device=device),
+            "bin_conf": torch.zeros(self.ece_bins, dtype=torch.float64, device=device),
+            "bin_correct": torch.zeros(self.ece_bins, dtype=torch.float64, device=device),
+            "nll": torch.zeros((), dtype=torch.float64, device=device),
+        }
+
+    @torch.no_grad()
+    def update(self, logits: torch.Tensor, target: torch.Tensor) -> None:
+        if self._state is None:
+            self._state = self._init(logits.device)
+        s = self._state
+        logits = logits.float()
+        target = target.to(logits.device, non_blocking=True).long()
+        log_probs = torch.log_softmax(logits, dim=1)
+        conf, pred = log_probs.max(dim=1)
+        conf = conf.exp()
+        correct = (pred == target).double()
+
+        s["cm"] += torch.bincount(target * self.k + pred, minlength=self.k * self.k)
+        if self.topk:
+            top = logits.topk(max(self.topk), dim=1).indices == target[:, None]
+            hits = top.cumsum(dim=1).clamp_(max=1).sum(dim=0)
+            s["topk"] += hits[[t - 1 for t in self.topk]]
+        b = (conf * self.ece_bins).long().clamp_(max=self.ece_bins - 1)
+        s["bin_count"] += torch.bincount(b, minlength=self.ece_bins).double()
+        s["bin_conf"] += torch.bincount(b, weights=conf.double(), minlength=self.ece_bins)
+        s["bin_correct"] += torch.bincount(b, weights=correct, minlength=self.ece_bins)
+        s["nll"] -= log_probs.gather(1, target[:, None]).double().sum()
+
+    def compute(self) -> Dict:
+        # single host transfer, then every metric from the confusion matrix in NumPy
+        if self._state is None:
+            raise ValueError("StreamingEvaluator.compute() called before any update().")
+        s = {k: v.cpu().numpy() for k, v in self._state.items()}
+        cm = s["cm"].reshape(self.k, self.k)
+        n = cm.sum()
+        tp = np.diag(cm).astype(np.float64)
+        support = cm.sum(axis=1)
+        predicted = cm.sum(axis=0)
+        precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+        recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+        denom = precision + recall
+        f1 = np.divide(2 * precision * recall, denom, out=np.zeros_like(tp), where=denom > 0)
+        weights = support / max(n, 1)
+        bin_count = s["bin_count"]
+        gap = np.abs(s["bin_conf"] - s["bin_correct"])  # per bin: count * |conf - acc|
+        return {
+            "samples": int(n),
+            "accuracy": float(tp.sum() / max(n, 1)),
+            "precision_macro": float(precision.mean()),
+            "recall_macro": float(recall.mean()),
+            "f1_macro": float(f1.mean()),
+            "f1_weighted": float((f1 * weights).sum()),
+            **{f"top{t}_accuracy": float(h / max(n, 1)) for t, h in zip(self.topk, s["topk"])},
+            "ece": float(gap.sum() / max(n, 1)),
+            "nll": float(s["nll"] / max(n, 1)),
+            "precision": precision.tolist(),
+            "recall": recall.tolist(),
+            "f1": f1.tolist(),
+            "support": support.tolist(),
+            "confusion_matrix": cm.tolist(),
+            "reliability": {
+                "count": bin_count.tolist(),
+                "confidence": np.divide(s["bin_conf"], bin_count, out=np.zeros_like(bin_count), where=bin_count > 0).tolist(),
+                "accuracy": np.divide(s["bin_correct"], bin_count, out=np.zeros_like(bin_count), where=bin_count > 0).tolist(),
+            },
+        }
+
+
+def classification_report_text(metrics: Dict, class_names: Sequence[str] = CIFAR_CLASSES) -> str:
+    # same layout as sklearn.metrics.classification_report
+    width = max(len(c) for c in tuple(class_names) + ("weighted avg",))
+    lines = [f"{'':>{width}} {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}", ""]
+    for name, p, r, f, s in zip(class_names, metrics["precision"], metrics["recall"], metrics["f1"], metrics["support"]):
+        lines.append(f"{name:>{width}} {p:>9.2f} {r:>9.2f} {f:>9.2f} {s:>9}")
+    n = metrics["samples"]
+    w = np.asarray(metrics["support"]) / max(n, 1)
+    lines += [
+        "",
+        f"{'accuracy':>{width}} {'':>9} {'':>9} {metrics['accuracy']:>9.2f} {n:>9}",
+        f"{'macro avg':>{width}} {metrics['precision_macro']:>9.2f} {metrics['recall_macro']:>9.2f} {metrics['f1_macro']:>9.2f} {n:>9}",
+        f"{'weighted avg':>{width}} {float(np.dot(w, metrics['precision'])):>9.2f} "
+        f"{float(np.dot(w, metrics['recall'])):>9.2f} {metrics['f1_weighted']:>9.2f} {n:>9}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _render(metrics: Dict, out_dir: str) -> List[str]:
+    # object-oriented Agg API only: pyplot's global state is not thread-safe
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    cm_path = os.path.join(out_dir, "confusion_matrix.png")
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.imshow(np.asarray(metrics["confusion_matrix"]))
+    ax.set_title("Confusion Matrix")
+    ax.set_xlabel("Pred")
+    ax.set_ylabel("True")
+    fig.savefig(cm_path, bbox_inches="tight")
+
+    rel_path = os.path.join(out_dir, "reliability_diagram.png")
+    rel = metrics["reliability"]
+    edges = np.linspace(0.0, 1.0, len(rel["count"]) + 1)
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.bar(edges[:-1], rel["accuracy"], width=np.diff(edges), align="edge", edgecolor="black", label="accuracy")
+    ax.plot([0, 1], [0, 1], linestyle="--", color="gray", label="perfect calibration")
+    ax.set_title(f"Reliability (ECE={metrics['ece']:.4f})")
+    ax.set_xlabel("Confidence")
+    ax.set_ylabel("Accuracy")
+    ax.legend()
+    fig.savefig(rel_path, bbox_inches="tight")
+
+    rep_path = os.path.join(out_dir, "classification_report.txt")
+    with open(rep_path, "w") as f:
+        f.write(classification_report_text(metrics))
+    return [cm_path, rel_path, rep_path]
+
+
+_RENDER_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="eval-render")
+
+
+def render_async(metrics: Dict, out_dir: str) -> "Future[List[str]]":
+    # plots and report are written off the caller's thread; result() gives the paths.
+    # The pool is not daemonic: pending renders finish before the interpreter exits
+    os.makedirs(out_dir, exist_ok=True)
+    return _RENDER_POOL.submit(_render, metrics, out_dir)
@@ -0,0 +1,217 @@
+import glob
+import math
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import numpy as np
+import pyarrow.parquet as pq
+
+from src.utils.drift_sketch import SketchStore
+from src.utils.settings import DRIFT_SKETCH_DIR, INFERENCE_STORE_DIR
+
+# monitoring/inference_store/date=YYYY-MM-DD/hour=HH/part-*.parquet (UTC)
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string()), ("hour", pa.int8())]), flavor="hive")
+
+
+def _utc(ts: int) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+
+def update_sketches(table: pa.Table, sketch_dir: str = DRIFT_SKETCH_DIR) -> int:
+    probs = np.column_stack([table.column(c).to_numpy() for c in table.column_names if c.startswith("proba_")])
+    return SketchStore(sketch_dir).update(
+        probs,
+        table.column("pred_class").to_numpy(),
+        table.column("true_class").to_numpy(),
+        table.column("ts").to_numpy(),
+    )
+
+
+def append_table(
+    table: pa.Table,
+    store_dir: str = INFERENCE_STORE_DIR,
+    sketch_dir: Optional[str] = DRIFT_SKETCH_DIR,
+) -> int:
+    # append-only: every call adds new part files, existing files are never rewritten;
+    # the hourly drift sketches are updated from the same rows
+    if table.num_rows == 0:
+        return 0
+    if sketch_dir:
+        update_sketches(table, sketch_dir)
+    ts = table.column("ts").cast(pa.timestamp("s", tz="UTC"))
+    table = table.append_column("date", pc.strftime(ts, format="%Y-%m-%d")).append_column(
+        "hour", pc.hour(ts).cast(pa.int8())
+    )
+    ds.write_dataset(
+        table,
+        store_dir,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return table.num_rows
+
+
+def append_file(
+    path: str,
+    store_dir: str = INFERENCE_STORE_DIR,
+    sketch_dir: Optional[str] = DRIFT_SKETCH_DIR,
+    batch_rows: int = 65536,
+) -> int:
+    # streams an existing parquet file into the store one record batch at a time
+    written = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+        written += append_table(pa.Table.from_batches([batch]), store_dir, sketch_dir)
+    return written
+
+
+def rebuild_sketches(store_dir: str = INFERENCE_STORE_DIR, sketch_dir: str = DRIFT_SKETCH_DIR) -> int:
+    # backfill for history written before the sketches existed (or after deleting them)
+    dataset = _dataset(store_dir)
+    if dataset is None:
+        return 0
+    for hour in SketchStore(sketch_dir).hours():
+        os.remove(os.path.join(sketch_dir, f"hour-{hour}.npz"))
+    rows = 0
+    for batch in dataset.to_batches(columns=[c for c in dataset.schema.names if c not in ("date", "hour")]):
+        rows += update_sketches(pa.Table.from_batches([batch]), sketch_dir)
+    return rows
+
+
+def _dataset(store_dir: str) -> Optional[ds.Dataset]:
+    if not glob.glob(os.path.join(store_dir, "date=*", "hour=*", "*.parquet")):
+        return None
+    return ds.dataset(store_dir, format="parquet", partitioning=PARTITIONING)
+
+
+def read_window(
+    start_ts: int,
+    end_ts: int,
+    columns: Optional[Sequence[str]] = None,
+    store_dir: str = INFERENCE_STORE_DIR,
+) -> pa.Table:
+    # [start_ts, end_ts): the date filter prunes partition directories, the ts
+    # filter is pushed down to parquet row-group statistics
+    dataset = _dataset(store_dir)
+    if dataset is None:
+        return pa.table({})
+    first_day = _utc(start_ts).strftime("%Y-%m-%d")
+    last_day = _utc(max(end_ts - 1, start_ts)).strftime("%Y-%m-%d")
+    flt = (
+        (ds.field("date") >= first_day)
+        & (ds.field("date") <= last_day)
+        & (ds.field("ts") >= start_ts)
+        & (ds.field("ts") < end_ts)
+    )
+    return dataset.to_table(columns=list(columns) if columns else None, filter=flt)
+
+
+def window_bounds(
+    current_hours: float,
+    reference_start_ts: int = 0,
+    reference_end_ts: int = 0,
+    now: Optional[int] = None,
+) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    # ((ref_start, ref_end), (cur_start, cur_end)), all half-open; without a fixed
+    # reference, the window of the same length just before the current one
+    now = int(now if now is not None else time.time())
+    span = int(current_hours * 3600)
+    if reference_end_ts <= 0:
+        reference_start_ts, reference_end_ts = now - 2 * span, now - span
+    return (reference_start_ts, reference_end_ts), (now - span, now + 1)
+
+
+def hour_window_bounds(
+    current_hours: float,
+    reference_start_ts: int = 0,
+    reference_end_ts: int = 0,
+    now: Optional[int] = None,
+    hour_s: int = 3600,
+) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    # window_bounds for stores kept per whole hour (drift sketches, embedding
+    # reservoirs): both windows are snapped to hour boundaries and never share an
+    # hour, otherwise the hour holding the boundary is merged into both sides
+    now = int(now if now is not None else time.time())
+    hours = max(1, math.ceil(current_hours))
+    cur_end = (now // hour_s + 1) * hour_s
+    cur_start = cur_end - hours * hour_s
+    if reference_end_ts <= 0:
+        return (cur_start - hours * hour_s, cur_start), (cur_start, cur_end)
+    ref_start = reference_start_ts // hour_s * hour_s
+    ref_end = min(-(-reference_end_ts // hour_s) * hour_s, cur_start)
+    return (ref_start, max(ref_end, ref_start)), (cur_start, cur_end)
+
+
+def last_hours_vs_reference(
+    hours: float,
+    reference_start_ts: int,
+    reference_end_ts: int,
+    columns: Optional[Sequence[str]] = None,
+    now: Optional[int] = None,
+    store_dir: str = INFERENCE_STORE_DIR,
+) -> Tuple[pa.Table, pa.Table]:
+    (ref_start, ref_end), (cur_start, cur_end) = window_bounds(hours, reference_start_ts, reference_end_ts, now)
+    reference = read_window(ref_start, ref_end, columns, store_dir)
+    current = read_window(cur_start, cur_end, columns, store_dir)
+    return reference, current
+
+
+def load_windows(
+    inference_path: str,
+    columns: Sequence[str],
+    current_hours: float = 0.0,
+    reference_start_ts: int = 0,
+    reference_end_ts: int = 0,
+    store_dir: str = INFERENCE_STORE_DIR,
+) -> Tuple[pa.Table, pa.Table]:
+    # reference/current tables for drift: halves of the latest inference.parquet,
+    # or with current_hours > 0 a rolling window of the store
+    if current_hours <= 0:
+        table = pq.read_table(inference_path, columns=list(columns))
+        if table.num_rows < 2:
+            raise ValueError("Not enough rows in inference data to compute drift report.")
+        mid = table.num_rows // 2
+        return table.slice(0, mid), table.slice(mid)
+
+    reference, current = last_hours_vs_reference(
+        current_hours, reference_start_ts, reference_end_ts, columns, store_dir=store_dir
+    )
+    if reference.num_rows == 0 or current.num_rows == 0:
+        raise ValueError(f"Empty drift window (reference={reference.num_rows} rows, current={current.num_rows} rows).")
+    return reference, current
+
+
+def compact(
+    store_dir: str = INFERENCE_STORE_DIR,
+    small_file_bytes: int = 8 * 1024 * 1024,
+    skip_current_hour: bool = True,
+) -> Dict[str, int]:
+    # merges the small part files of each closed hour partition into one file
+    current = _utc(int(time.time()))
+    current_dir = os.path.join(store_dir, f"date={current:%Y-%m-%d}", f"hour={current.hour}")
+    stats = {"partitions_compacted": 0, "files_removed": 0}
+    for part_dir in sorted(glob.glob(os.path.join(store_dir, "date=*", "hour=*"))):
+        if skip_current_hour and os.path.normpath(part_dir) == os.path.normpath(current_dir):
+            continue
+        small: List[str] = [
+            p for p in glob.glob(os.path.join(part_dir, "*.parquet")) if os.path.getsize(p) < small_file_bytes
+        ]
+        if len(small) < 2:
+            continue
+        merged = pa.concat_tables([pq.read_table(p) for p in small])
+        # dot-prefixed while being written: dataset discovery ignores hidden files
+        tmp = os.path.join(part_dir, f".compact-{uuid.uuid4().hex[:8]}.parquet")
+        pq.write_table(merged.sort_by("ts"), tmp)
+        os.replace(tmp, os.path.join(part_dir, f"part-{time.time_ns()}-compacted.parquet"))
+        for p in small:
+            os.remove(p)
+        stats["partitions_compacted"] += 1
+        stats["files_removed"] += len(small)
+    return stats
@@ -0,0 +1,211 @@
+import atexit
+import functools
+import queue
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.settings import STEP_INSTRUMENTATION
+
+_MB = 1024 * 1024
+# every measured stage of this process, in completion order (read by the benchmark harness)
+RECORDS: List["StageStats"] = []
+# peaks (kB) of stages still open; nested stages reset VmHWM, so they push their peak up
+_OPEN_PEAKS: List[int] = []
+
+
+@dataclass
+class StageStats:
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    # CPU of child processes reaped during the stage (DDP ranks, sweep/validation pools)
+    cpu_children_s: float = 0.0
+    peak_rss_mb: float = 0.0
+    rss_delta_mb: float = 0.0
+    # rchar/wchar: every read()/write(), page cache included; disk_*: block-device I/O
+    read_bytes: int = 0
+    write_bytes: int = 0
+    disk_read_bytes: int = 0
+    disk_write_bytes: int = 0
+    ok: bool = True
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+    def metrics(self, prefix: str = "stage") -> Dict[str, float]:
+        return {f"{prefix}_{self.name}_{k}": float(v) for k, v in self.as_dict().items() if k != "name"}
+
+
+def _proc_kv(path: str) -> Dict[str, int]:
+    out = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                parts = value.split()
+                if parts and parts[0].isdigit():
+                    out[key.strip()] = int(parts[0])
+    except OSError:
+        pass
+    return out
+
+
+def _rss_kb() -> Dict[str, int]:
+    status = _proc_kv("/proc/self/status")
+    return {"rss": status.get("VmRSS", 0), "hwm": status.get("VmHWM", 0)}
+
+
+def _reset_peak_rss() -> bool:
+    # "5" resets VmHWM to the current RSS (Linux >= 4.0), giving a per-stage peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class _RssSampler:
+    # fallback when VmHWM cannot be reset: poll VmRSS from a daemon thread
+    def __init__(self, interval_s: float = 0.02):
+        self.interval_s = interval_s
+        self.peak = 0
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self.stop.is_set():
+            self.peak = max(self.peak, _rss_kb()["rss"])
+            self.stop.wait(self.interval_s)
+
+    def __enter__(self) -> "_RssSampler":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop.set()
+        self.thread.join()
+
+
+def _cpu() -> Dict[str, float]:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {"self": own.ru_utime + own.ru_stime, "children": children.ru_utime + children.ru_stime}
+
+
+@contextmanager
+def measure(name: str) -> Iterator[StageStats]:
+    # wall / CPU / peak RSS / I/O of the enclosed block, appended to RECORDS
+    stats = StageStats(name)
+    hwm_reset = _reset_peak_rss()
+    rss0 = _rss_kb()["rss"]
+    io0 = _proc_kv("/proc/self/io")
+    cpu0 = _cpu()
+    t0 = time.perf_counter()
+    sampler = None if hwm_reset else _RssSampler().__enter__()
+    _OPEN_PEAKS.append(rss0)
+    try:
+        yield stats
+    except BaseException:
+        stats.ok = False
+        raise
+    finally:
+        stats.wall_s = time.perf_counter() - t0
+        if sampler is not None:
+            sampler.__exit__()
+        cpu1 = _cpu()
+        io1 = _proc_kv("/proc/self/io")
+        mem = _rss_kb()
+        stats.cpu_s = cpu1["self"] - cpu0["self"]
+        stats.cpu_children_s = cpu1["children"] - cpu0["children"]
+        peak_kb = max(_OPEN_PEAKS.pop(), mem["hwm"] if hwm_reset else max(sampler.peak, mem["rss"]))
+        if _OPEN_PEAKS:
+            _OPEN_PEAKS[-1] = max(_OPEN_PEAKS[-1], peak_kb)
+        stats.peak_rss_mb = peak_kb * 1024 / _MB
+        stats.rss_delta_mb = (mem["rss"] - rss0) * 1024 / _MB
+        stats.read_bytes = io1.get("rchar", 0) - io0.get("rchar", 0)
+        stats.write_bytes = io1.get("wchar", 0) - io0.get("wchar", 0)
+        stats.disk_read_bytes = io1.get("read_bytes", 0) - io0.get("read_bytes", 0)
+        stats.disk_write_bytes = io1.get("write_bytes", 0) - io0.get("write_bytes", 0)
+        RECORDS.append(stats)
+
+
+# MLflow writes go through one daemon thread: with the tracking server down, the
+# REST client's retries must not hold up the steps being measured
+_MLFLOW_QUEUE: "queue.Queue[Tuple[tuple, StageStats]]" = queue.Queue()
+_mlflow_thread: Optional[threading.Thread] = None
+
+
+def _mlflow_worker() -> None:
+    from mlflow.entities import Metric
+
+    from src.utils.tracking import pipeline_parent_run, setup_tracking
+
+    client = None
+    while True:
+        ctx, stats = _MLFLOW_QUEUE.get()
+        try:
+            client = client or setup_tracking()
+            parent_id = pipeline_parent_run(client, ctx)
+            if parent_id:
+                ts = int(time.time() * 1000)
+                client.log_batch(parent_id, metrics=[Metric(k, v, ts, 0) for k, v in stats.metrics("step").items()])
+        except Exception as e:
+            print(f"[instrumentation] could not log {stats.name} to MLflow: {e!r}")
+        finally:
+            _MLFLOW_QUEUE.task_done()
+
+
+def wait_emitted(timeout_s: float = 10.0) -> None:
+    # bounded wait for queued MLflow writes (at exit, or before removing a file store)
+    deadline = time.monotonic() + timeout_s
+    while _MLFLOW_QUEUE.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def _emit(stats: StageStats) -> None:
+    # ZenML metadata on the running step, MLflow metrics on the pipeline's parent
+    # run (queued, never waited on); both best effort, never fail the step
+    global _mlflow_thread
+    try:
+        from zenml import log_metadata
+
+        log_metadata(metadata={"instrumentation": stats.as_dict()})
+    except Exception:
+        pass
+    try:
+        from src.utils.tracking import pipeline_context
+
+        ctx = pipeline_context()  # step context only exists on the step's thread
+    except Exception:
+        ctx = None
+    if ctx is None:
+        return
+    if _mlflow_thread is None:
+        _mlflow_thread = threading.Thread(target=_mlflow_worker, name="instrumentation-mlflow", daemon=True)
+        _mlflow_thread.start()
+        atexit.register(wait_emitted)
+    _MLFLOW_QUEUE.put((ctx, stats))
+
+
+def instrumented(func: Callable) -> Callable:
+    # goes under @step: functools.wraps keeps the signature and annotations ZenML reads
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not STEP_INSTRUMENTATION:
+            return func(*args, **kwargs)
+        try:
+            with measure(func.__name__) as stats:
+                return func(*args, **kwargs)
+        finally:
+            print(
+                f"[instrumentation] {stats.name} wall={stats.wall_s:.3f}s cpu={stats.cpu_s:.3f}s "
+                f"peak_rss={stats.peak_rss_mb:.0f}MB read={stats.read_bytes / 1e6:.1f}MB write={stats.write_bytes / 1e6:.1f}MB"
+            )
+            _emit(stats)
+
+    return wrapper
@@ -1,7 +1,80 @@
+import hashlib
+import json
 import os
-from typing import Dict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+from src.utils.settings import MINIO_MANIFEST_DIR
+
+MB = 1024 * 1024
+
+
+def make_s3_client(endpoint_url: str, access_key: str, secret_key: str, max_pool_connections: int = 32):
+    # one pooled client shared by every upload thread (boto3 clients are thread-safe)
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name="us-east-1",
+        config=Config(max_pool_connections=max_pool_connections, retries={"max_attempts": 5, "mode": "adaptive"}),
+    )
+
+
+def make_transfer_config(chunk_mb: int = 16, part_concurrency: int = 4) -> TransferConfig:
+    return TransferConfig(
+        multipart_threshold=chunk_mb * MB,
+        multipart_chunksize=chunk_mb * MB,
+        max_concurrency=part_concurrency,
+        use_threads=True,
+    )
+
+
+def local_etag(path: str, transfer_config: TransferConfig) -> str:
+    # S3/MinIO ETag as produced by upload_file with this config: plain md5 for single
+    # part uploads, md5-of-part-md5s + "-N" for multipart ones
+    size = os.path.getsize(path)
+    chunk = transfer_config.multipart_chunksize
+    with open(path, "rb") as f:
+        if size < transfer_config.multipart_threshold:
+            return hashlib.md5(f.read()).hexdigest()
+        digests = [hashlib.md5(block).digest() for block in iter(lambda: f.read(chunk), b"")]
+    return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+def _manifest_path(endpoint_url: str, bucket_name: str, prefix: str) -> str:
+    target = hashlib.md5(f"{endpoint_url}|{bucket_name}|{prefix}".encode()).hexdigest()[:16]
+    return os.path.join(MINIO_MANIFEST_DIR, f"{target}.json")
+
+
+def _load_manifest(path: str) -> Dict[str, Dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_manifest(path: str, manifest: Dict[str, Dict]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def _remote_objects(client, bucket_name: str, prefix: str) -> Dict[str, Dict]:
+    objects = {}
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            objects[obj["Key"]] = {"etag": obj["ETag"].strip('"'), "size": obj["Size"]}
+    return objects
 
 
 def upload_directory_to_minio(
@@ -11,36 +84,75 @@ def upload_directory_to_minio(
     secret_key: str,
     bucket_name: str,
     prefix: str = "",
-) -> Dict[str, str | int]:
+    max_workers: int = 8,
+    chunk_mb: int = 16,
+    client=None,
+    manifest_path: Optional[str] = None,
+) -> Dict[str, str | int | float]:
     if not os.path.isdir(local_dir):
         raise FileNotFoundError(f"Directory not found: {local_dir}")
 
-    client = boto3.client(
-        "s3",
-        endpoint_url=endpoint_url,
-        aws_access_key_id=access_key,
-        aws_secret_access_key=secret_key,
-        region_name="us-east-1",
-    )
+    start = time.perf_counter()
+    client = client or make_s3_client(endpoint_url, access_key, secret_key, max_pool_connections=max_workers * 4)
+    transfer_config = make_transfer_config(chunk_mb)
 
     try:
         client.head_bucket(Bucket=bucket_name)
     except Exception:
         client.create_bucket(Bucket=bucket_name)
 
-    uploaded_count = 0
     normalized_prefix = prefix.strip("/")
+    manifest_path = manifest_path or _manifest_path(endpoint_url, bucket_name, normalized_prefix)
+    manifest = _load_manifest(manifest_path)
+    remote = _remote_objects(client, bucket_name, normalized_prefix)
 
-    for root, _, files in os.walk(local_dir):
-        for file_name in files:
+    files = []
+    for root, _, names in os.walk(local_dir):
+        for file_name in names:
             full_path = os.path.join(root, file_name)
             rel_path = os.path.relpath(full_path, local_dir).replace("\\", "/")
             key = f"{normalized_prefix}/{rel_path}" if normalized_prefix else rel_path
-            client.upload_file(full_path, bucket_name, key)
-            uploaded_count += 1
+            files.append((full_path, key))
+
+    lock = threading.Lock()
+    stats = {"uploaded_files": 0, "skipped_files": 0, "bytes_transferred": 0}
+
+    def _sync(full_path: str, key: str) -> None:
+        st = os.stat(full_path)
+        entry = manifest.get(key)
+        obj = remote.get(key)
+        # fast path: unchanged since our last upload and still present remotely
+        unchanged = entry is not None and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+        if unchanged and obj is not None and obj["etag"] == entry["etag"]:
+            with lock:
+                stats["skipped_files"] += 1
+            return
+
+        etag = local_etag(full_path, transfer_config)
+        if obj is None or obj["etag"] != etag:
+            client.upload_file(full_path, bucket_name, key, Config=transfer_config)
+            with lock:
+                stats["uploaded_files"] += 1
+                stats["bytes_transferred"] += st.st_size
+        else:
+            with lock:
+                stats["skipped_files"] += 1
+        with lock:
+            manifest[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "etag": etag}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="minio-upload") as pool:
+        # list() re-raises the first upload error
+        list(pool.map(lambda item: _sync(*item), files))
+
+    _save_manifest(manifest_path, manifest)
+    elapsed = time.perf_counter() - start
 
     return {
         "bucket": bucket_name,
         "prefix": normalized_prefix,
-        "uploaded_files": uploaded_count,
+        "uploaded_files": stats["uploaded_files"],
+        "skipped_files": stats["skipped_files"],
+        "bytes_transferred": stats["bytes_transferred"],
+        "elapsed_s": elapsed,
+        "throughput_mb_s": stats["bytes_transferred"] / MB / max(elapsed, 1e-9),
     }
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import mlflow
+import mlflow.pytorch
+import torch
+
+from src.utils.model_registry import latest_model_version, model_version
+from src.utils.settings import MODEL_CACHE_DIR, MODEL_CACHE_MB, MODEL_NAME
+
+TORCHSCRIPT_ARTIFACT = "model_torchscript.pt"
+
+# process-wide: repeated loads in one process (worker, server, notebook) skip even the
+# disk. Every caller gets the same module object, already on CPU in eval mode: treat it
+# as read-only (no .train(), .to()/.cpu()/.half(), weight updates); deepcopy to modify
+_MEMORY: "OrderedDict[Tuple[str, str, str, str], torch.nn.Module]" = OrderedDict()
+_MEMORY_ENTRIES = 4  # champion + challengers of a version comparison
+
+
+def _digest(mv) -> str:
+    # registry artifacts are immutable per (source, run, creation time): hashing
+    # them identifies the content without downloading anything
+    raw = f"{mv.source}|{mv.run_id}|{mv.creation_timestamp}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+class ModelCache:
+    # Registry-versioned model cache: in-process LRU in front of an on-disk LRU
+    # (recency = directory mtime, total size capped), keyed by
+    # (model name, version, artifact digest). Freshness costs one version lookup.
+    def __init__(self, cache_dir: str = MODEL_CACHE_DIR, max_mb: int = MODEL_CACHE_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_dir(self, name: str, version: str, digest: str) -> str:
+        return os.path.join(self.cache_dir, name, f"v{version}-{digest}")
+
+    def _bump(self, counter: str) -> Dict[str, int]:
+        path = os.path.join(self.cache_dir, "stats.json")
+        try:
+            with open(path) as f:
+                stats = json.load(f)
+        except (FileNotFoundError, ValueError):
+            stats = {}
+        stats[counter] = stats.get(counter, 0) + 1
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(stats, f)
+        os.replace(tmp, path)
+        return stats
+
+    def _fill(self, entry: str, name: str, mv) -> None:
+        # download once: the eager model, plus the TorchScript export when the
+        # registering run has one
+        tmp = f"{entry}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        model = mlflow.pytorch.load_model(f"models:/{name}/{mv.version}")
+        torch.save(model, os.path.join(tmp, "model.pt"))
+        try:
+            mlflow.artifacts.download_artifacts(run_id=mv.run_id, artifact_path=TORCHSCRIPT_ARTIFACT, dst_path=tmp)
+        except Exception:
+            pass
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({"name": name, "version": str(mv.version), "run_id": mv.run_id, "source": mv.source}, f)
+        if os.path.isdir(entry):
+            shutil.rmtree(tmp)  # filled concurrently by another process
+        else:
+            os.replace(tmp, entry)
+        self._evict(keep=entry)
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            model_dir = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(model_dir):
+                continue
+            for sub in os.listdir(model_dir):
+                path = os.path.join(model_dir, sub)
+                if ".tmp-" in sub or not os.path.isdir(path):
+                    continue
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                entries.append((os.stat(path).st_mtime, size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            self._bump("evictions")
+
+    def _latest_cached(self, name: str, version: str = "") -> Optional[Tuple[str, str]]:
+        model_dir = os.path.join(self.cache_dir, name)
+        if not os.path.isdir(model_dir):
+            return None
+        subs = [s for s in os.listdir(model_dir) if ".tmp-" not in s and (not version or s.startswith(f"v{version}-"))]
+        if not subs:
+            return None
+        best = max(subs, key=lambda s: int(s[1:].split("-")[0]))
+        return best[1:].split("-")[0], best.split("-", 1)[1]
+
+    def load(
+        self, name: str = MODEL_NAME, prefer_torchscript: bool = False, version: str = ""
+    ) -> Tuple[torch.nn.Module, Dict]:
+        # version="" loads the newest registered version
+        start = time.perf_counter()
+        try:
+            mv = model_version(name, version) if version else latest_model_version(name)
+            if mv is None:
+                raise ValueError(f"No registered versions found for model '{name}'.")
+            version, digest = str(mv.version), _digest(mv)
+        except ValueError:
+            raise
+        except Exception as e:
+            # registry unreachable: serve the newest (or the requested) version already on disk
+            cached = self._latest_cached(name, version)
+            if cached is None:
+                raise
+            print(f"[model_cache] registry lookup failed ({e!r}); using cached v{cached[0]}")
+            mv, (version, digest) = None, cached
+
+        entry = self._entry_dir(name, version, digest)
+        ts_path = os.path.join(entry, TORCHSCRIPT_ARTIFACT)
+        kind = "torchscript" if prefer_torchscript and os.path.exists(ts_path) else "eager"
+        key = (name, version, digest, kind)
+
+        if key in _MEMORY:
+            _MEMORY.move_to_end(key)
+            model, source = _MEMORY[key], "memory_hit"
+        else:
+            if os.path.isdir(entry):
+                source = "disk_hit"
+            else:
+                source = "miss"
+                self._fill(entry, name, mv)
+                if prefer_torchscript and os.path.exists(ts_path):
+                    kind, key = "torchscript", (name, version, digest, "torchscript")
+            if kind == "torchscript":
+                model = torch.jit.load(ts_path, map_location="cpu")
+            else:
+                model = torch.load(os.path.join(entry, "model.pt"), map_location="cpu", weights_only=False)
+            # set once here, so a hit never touches the shared module
+            _MEMORY[key] = model = model.eval()
+            while len(_MEMORY) > _MEMORY_ENTRIES:
+                _MEMORY.popitem(last=False)
+        if os.path.isdir(entry):
+            os.utime(entry)  # LRU recency
+
+        stats = self._bump(source)
+        info = {
+            "model_name": name,
+            "model_version": version,
+            "artifact_digest": digest,
+            "format": kind,
+            "cache": source,
+            "load_s": time.perf_counter() - start,
+            **{f"cache_{k}": v for k, v in stats.items()},
+        }
+        return model, info
@@ -0,0 +1,227 @@
+import copy
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from src.utils.cifar_dataset import normalize_batch
+
+# file name per variant, all under one export directory
+VARIANT_FILES = {
+    "torchscript": "model_torchscript_traced.pt",
+    "torchscript_frozen": "model_torchscript_frozen.pt",
+    "int8": "model_int8_torchscript.pt",
+    "onnx": "model.onnx",
+}
+# variants loadable with torch.jit.load, i.e. shippable as model_torchscript.pt
+TORCHSCRIPT_VARIANTS = ("torchscript", "torchscript_frozen", "int8")
+
+
+@dataclass
+class VariantReport:
+    variant: str
+    path: str
+    size_mb: float
+    available: bool = True
+    error: str = ""
+    max_abs_diff: float = 0.0
+    top1_agreement: float = 1.0
+    accuracy: float = 0.0
+    accuracy_delta: float = 0.0
+    within_tolerance: bool = False
+    # batch size -> p50 latency (ms) / images per second
+    latency_ms: Dict[int, float] = field(default_factory=dict)
+    throughput: Dict[int, float] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+    def metrics(self) -> Dict[str, float]:
+        out = {
+            f"{self.variant}_size_mb": self.size_mb,
+            f"{self.variant}_max_abs_diff": self.max_abs_diff,
+            f"{self.variant}_top1_agreement": self.top1_agreement,
+            f"{self.variant}_accuracy": self.accuracy,
+            f"{self.variant}_accuracy_delta": self.accuracy_delta,
+            f"{self.variant}_within_tolerance": float(self.within_tolerance),
+        }
+        for bs, ms in self.latency_ms.items():
+            out[f"{self.variant}_p50_ms_bs{bs}"] = ms
+            out[f"{self.variant}_throughput_bs{bs}"] = self.throughput[bs]
+        return out
+
+
+def export_torchscript(model: nn.Module, path: str, example: torch.Tensor) -> torch.jit.ScriptModule:
+    traced = torch.jit.trace(model, example)
+    traced.save(path)
+    return traced
+
+
+def export_frozen(model: nn.Module, path: str, example: torch.Tensor) -> torch.jit.ScriptModule:
+    # freeze inlines weights/attributes as constants; optimize_for_inference then
+    # folds conv+bn, fuses conv+relu and pre-packs weights for the CPU backend
+    frozen = torch.jit.optimize_for_inference(torch.jit.freeze(torch.jit.trace(model, example).eval()))
+    frozen.save(path)
+    return frozen
+
+
+def _quant_engine() -> str:
+    engines = torch.backends.quantized.supported_engines
+    for name in ("x86", "fbgemm", "qnnpack"):
+        if name in engines:
+            return name
+    raise RuntimeError(f"No int8 quantization engine available (supported: {engines})")
+
+
+def export_int8(model: nn.Module, path: str, calibration: Sequence[torch.Tensor]) -> torch.jit.ScriptModule:
+    # post-training static quantization (FX graph mode: conv+relu / linear+relu
+    # are fused and observed without touching SimpleCNN), calibrated on
+    # validation batches, then traced so it ships like the other TorchScript files
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    engine = _quant_engine()
+    torch.backends.quantized.engine = engine
+    prepared = prepare_fx(copy.deepcopy(model).cpu().eval(), get_default_qconfig_mapping(engine), example_inputs=(calibration[0],))
+    with torch.inference_mode():
+        for xb in calibration:
+            prepared(xb)
+    quantized = convert_fx(prepared)
+    scripted = torch.jit.trace(quantized, calibration[0][:1])
+    scripted.save(path)
+    return scripted
+
+
+def export_onnx(model: nn.Module, path: str, example: torch.Tensor, opset: int = 17) -> None:
+    torch.onnx.export(
+        model,
+        example,
+        path,
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset,
+    )
+
+
+def onnx_runner(path: str) -> Optional[Callable[[torch.Tensor], torch.Tensor]]:
+    # onnxruntime is optional: without it the file is still exported, only unchecked
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        return None
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = torch.get_num_threads()
+    session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+
+    def run(xb: torch.Tensor) -> torch.Tensor:
+        return torch.from_numpy(session.run(["logits"], {"input": xb.numpy()})[0])
+
+    return run
+
+
+def logits_over(fn: Callable[[torch.Tensor], torch.Tensor], X_u8: np.ndarray, batch_size: int = 512) -> torch.Tensor:
+    out = []
+    with torch.inference_mode():
+        for s in range(0, len(X_u8), batch_size):
+            xb = normalize_batch(torch.from_numpy(np.ascontiguousarray(X_u8[s:s + batch_size])))
+            out.append(fn(xb).float())
+    return torch.cat(out)
+
+
+def benchmark(fn: Callable[[torch.Tensor], torch.Tensor], batch_sizes: Sequence[int], iters: int = 30, warmup: int = 5):
+    # p50 latency per call and images/s at each batch size, on fixed random inputs
+    latency, throughput = {}, {}
+    with torch.inference_mode():
+        for bs in batch_sizes:
+            xb = torch.randn(bs, 3, 32, 32)
+            for _ in range(warmup):
+                fn(xb)
+            times = []
+            for _ in range(iters):
+                t0 = time.perf_counter()
+                fn(xb)
+                times.append(time.perf_counter() - t0)
+            p50 = float(np.median(times))
+            latency[int(bs)] = p50 * 1000.0
+            throughput[int(bs)] = bs / p50
+    return latency, throughput
+
+
+def export_variants(
+    model: nn.Module,
+    out_dir: str,
+    X_test: np.ndarray,
+    y_test: np.ndarray,
+    calibration: Sequence[torch.Tensor],
+    variants: Sequence[str] = tuple(VARIANT_FILES),
+    batch_sizes: Sequence[int] = (1, 8, 64, 256),
+    atol: float = 1e-3,
+    max_accuracy_drop: float = 0.01,
+    bench_iters: int = 30,
+) -> List[VariantReport]:
+    # Every variant is checked against the eager model on the same test rows:
+    # fp32 variants must match logits within atol, every variant (int8 included)
+    # must stay within max_accuracy_drop of eager accuracy.
+    os.makedirs(out_dir, exist_ok=True)
+    model = model.cpu().eval()
+    example = torch.randn(1, 3, 32, 32)
+    y = torch.from_numpy(np.asarray(y_test, dtype=np.int64))
+    ref_logits = logits_over(model, X_test)
+    ref_pred = ref_logits.argmax(dim=1)
+    ref_acc = float((ref_pred == y).float().mean())
+
+    lat, thr = benchmark(model, batch_sizes, iters=bench_iters)
+    reports = [VariantReport("eager", "", 0.0, accuracy=ref_acc, within_tolerance=True, latency_ms=lat, throughput=thr)]
+    for name in variants:
+        path = os.path.join(out_dir, VARIANT_FILES[name])
+        try:
+            if name == "torchscript":
+                fn = export_torchscript(model, path, example)
+            elif name == "torchscript_frozen":
+                fn = export_frozen(model, path, example)
+            elif name == "int8":
+                fn = export_int8(model, path, calibration)
+            else:
+                export_onnx(model, path, example)
+                fn = onnx_runner(path)
+        except Exception as e:  # one failing backend must not lose the other artifacts
+            reports.append(VariantReport(name, path, 0.0, available=False, error=repr(e)))
+            continue
+        size_mb = os.path.getsize(path) / 1e6
+        if fn is None:
+            reports.append(VariantReport(name, path, size_mb, available=False, error="onnxruntime not installed"))
+            continue
+
+        logits = logits_over(fn, X_test)
+        pred = logits.argmax(dim=1)
+        acc = float((pred == y).float().mean())
+        diff = float((logits - ref_logits).abs().max())
+        delta = acc - ref_acc
+        ok = -delta <= max_accuracy_drop and (name == "int8" or diff <= atol)
+        lat, thr = benchmark(fn, batch_sizes, iters=bench_iters)
+        reports.append(
+            VariantReport(
+                name,
+                path,
+                size_mb,
+                max_abs_diff=diff,
+                top1_agreement=float((pred == ref_pred).float().mean()),
+                accuracy=acc,
+                accuracy_delta=delta,
+                within_tolerance=ok,
+                latency_ms=lat,
+                throughput=thr,
+            )
+        )
+    return reports
+
+
+def fastest(reports: Sequence[VariantReport], batch_size: int, among: Optional[Sequence[str]] = None) -> Optional[VariantReport]:
+    # highest throughput at batch_size among variants that passed their checks
+    ok = [r for r in reports if r.available and r.within_tolerance and r.path and (among is None or r.variant in among)]
+    return max(ok, key=lambda r: r.throughput.get(batch_size, 0.0), default=None)
@@ -0,0 +1,55 @@
+import mlflow
+import mlflow.pytorch
+import torch
+from mlflow.exceptions import MlflowException
+from src.utils.settings import MLFLOW_TRACKING_URI, MODEL_NAME
+
+
+def latest_model_version(model_name: str = MODEL_NAME):
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    client = mlflow.tracking.MlflowClient()
+
+    versions = client.search_model_versions(
+        filter_string=f"name='{model_name}'",
+        max_results=1,
+        order_by=["creation_timestamp DESC"],
+    )
+    return versions[0] if versions else None
+
+
+def load_latest_registered_model(model_name: str = MODEL_NAME) -> torch.nn.Module:
+    latest = latest_model_version(model_name)
+    if latest is None:
+        raise ValueError(f"No registered versions found for model '{model_name}'.")
+
+    model_uri = f"models:/{model_name}/{latest.version}"
+    return mlflow.pytorch.load_model(model_uri)
+
+
+def model_version(model_name: str, version: str):
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    return mlflow.tracking.MlflowClient().get_model_version(model_name, str(version))
+
+
+def recent_model_versions(model_name: str = MODEL_NAME, n: int = 2) -> list:
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    client = mlflow.tracking.MlflowClient()
+    return client.search_model_versions(
+        filter_string=f"name='{model_name}'",
+        max_results=n,
+        order_by=["creation_timestamp DESC"],
+    )
+
+
+def aliased_version(model_name: str = MODEL_NAME, alias: str = "champion"):
+    # None when the alias has never been set
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    try:
+        return mlflow.tracking.MlflowClient().get_model_version_by_alias(model_name, alias)
+    except MlflowException:
+        return None
+
+
+def set_alias(model_name: str, version: str, alias: str = "champion") -> None:
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    mlflow.tracking.MlflowClient().set_registered_model_alias(model_name, alias, str(version))
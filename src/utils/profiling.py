@@ -0,0 +1,80 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import torch
+
+
+class EpochTimer:
+    # Per-epoch throughput, plus an optional data-wait vs compute split. The split
+    # needs a device sync per batch on CUDA, so it is only measured when enabled.
+    def __init__(self, device: str, split_timing: bool = False):
+        self.device = device
+        self.split_timing = split_timing
+        self.start = self.mark = 0.0
+        self.data_wait = self.compute = 0.0
+        self.samples = 0
+
+    def start_epoch(self) -> None:
+        self.start = self.mark = time.perf_counter()
+        self.data_wait = self.compute = 0.0
+        self.samples = 0
+
+    def batch_ready(self) -> None:
+        if self.split_timing:
+            now = time.perf_counter()
+            self.data_wait += now - self.mark
+            self.mark = now
+
+    def step_done(self, batch_size: int) -> None:
+        self.samples += batch_size
+        if self.split_timing:
+            if self.device == "cuda":
+                torch.cuda.synchronize()
+            now = time.perf_counter()
+            self.compute += now - self.mark
+            self.mark = now
+
+    def metrics(self, prefix: str = "train") -> Dict[str, float]:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        out = {
+            f"{prefix}_epoch_time_s": elapsed,
+            f"{prefix}_samples_per_sec": self.samples / elapsed,
+        }
+        if self.split_timing:
+            out[f"{prefix}_data_wait_s"] = self.data_wait
+            out[f"{prefix}_compute_s"] = self.compute
+            out[f"{prefix}_data_wait_frac"] = self.data_wait / elapsed
+        return out
+
+
+class _NoProfiler:
+    trace_path: Optional[str] = None
+
+    def step(self) -> None:
+        pass
+
+
+@contextmanager
+def profiler_window(active_steps: int, out_dir: str, wait: int = 5, warmup: int = 2) -> Iterator:
+    # records `active_steps` batches once (after `wait` + `warmup`) into a chrome trace
+    if active_steps <= 0:
+        yield _NoProfiler()
+        return
+
+    os.makedirs(out_dir, exist_ok=True)
+    trace_path = os.path.join(out_dir, "train_trace.json")
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+    prof = torch.profiler.profile(
+        activities=activities,
+        schedule=torch.profiler.schedule(wait=wait, warmup=warmup, active=active_steps, repeat=1),
+        on_trace_ready=lambda p: p.export_chrome_trace(trace_path),
+        record_shapes=True,
+    )
+    with prof:
+        prof.trace_path = trace_path
+        yield prof
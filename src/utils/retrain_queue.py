@@ -0,0 +1,168 @@
+import fcntl
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from contextlib import closing
+from typing import Callable, Dict, Optional
+
+from src.utils.settings import MONITORING_DIR, RETRAIN_QUEUE_DB
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS retrain_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    status TEXT NOT NULL,
+    reason TEXT,
+    args TEXT,
+    error TEXT
+)
+"""
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    # autocommit mode; writers take BEGIN IMMEDIATE so the check-then-insert is atomic
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def enqueue_retrain(
+    reason: str,
+    args: Dict,
+    cooldown_s: float,
+    db_path: str = RETRAIN_QUEUE_DB,
+    stale_after_s: float = 6 * 3600,
+    queued_stale_after_s: float = 3600,
+) -> Dict:
+    now = time.time()
+    with closing(_connect(db_path)) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # a worker that died mid-job must not block the queue forever
+            conn.execute(
+                "UPDATE retrain_jobs SET status='failed', error='stale', finished_at=? "
+                "WHERE status='running' AND started_at < ?",
+                (now, now - stale_after_s),
+            )
+            # nor one that never claimed its job (crashed on import, exited early)
+            conn.execute(
+                "UPDATE retrain_jobs SET status='failed', error='stale: never claimed', finished_at=? "
+                "WHERE status='queued' AND created_at < ?",
+                (now, now - queued_stale_after_s),
+            )
+            row = conn.execute(
+                "SELECT id, status FROM retrain_jobs WHERE status IN ('queued', 'running') ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row:
+                conn.execute("COMMIT")
+                return {"job_id": row[0], "status": "deduplicated", "pending_status": row[1]}
+
+            row = conn.execute(
+                "SELECT finished_at FROM retrain_jobs WHERE status='succeeded' ORDER BY finished_at DESC LIMIT 1"
+            ).fetchone()
+            if row and now - row[0] < cooldown_s:
+                conn.execute("COMMIT")
+                return {"job_id": None, "status": "cooldown", "cooldown_remaining_s": cooldown_s - (now - row[0])}
+
+            cur = conn.execute(
+                "INSERT INTO retrain_jobs (created_at, status, reason, args) VALUES (?, 'queued', ?, ?)",
+                (now, reason, json.dumps(args)),
+            )
+            conn.execute("COMMIT")
+            return {"job_id": cur.lastrowid, "status": "queued"}
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _claim_next(conn: sqlite3.Connection) -> Optional[Dict]:
+    conn.execute("BEGIN IMMEDIATE")
+    row = conn.execute(
+        "SELECT id, created_at, reason, args FROM retrain_jobs WHERE status='queued' ORDER BY id LIMIT 1"
+    ).fetchone()
+    if row is None:
+        conn.execute("COMMIT")
+        return None
+    started = time.time()
+    conn.execute("UPDATE retrain_jobs SET status='running', started_at=? WHERE id=?", (started, row[0]))
+    conn.execute("COMMIT")
+    return {"id": row[0], "created_at": row[1], "started_at": started, "reason": row[2], "args": json.loads(row[3] or "{}")}
+
+
+def _finish(conn: sqlite3.Connection, job_id: int, status: str, error: Optional[str] = None) -> float:
+    finished = time.time()
+    conn.execute(
+        "UPDATE retrain_jobs SET status=?, finished_at=?, error=? WHERE id=?",
+        (status, finished, error, job_id),
+    )
+    return finished
+
+
+def run_worker(
+    run_job: Callable[[Dict], None],
+    on_done: Optional[Callable[[Dict], None]] = None,
+    db_path: str = RETRAIN_QUEUE_DB,
+    lock_wait_s: float = 5.0,
+) -> int:
+    # single drainer per queue: if another worker holds the lock it will pick up our
+    # job; the short wait covers a worker that is just exiting on an empty queue
+    lock_path = f"{db_path}.lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "w") as lock_file:
+        deadline = time.monotonic() + lock_wait_s
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return 0
+                time.sleep(0.5)
+
+        done = 0
+        with closing(_connect(db_path)) as conn:
+            while (job := _claim_next(conn)) is not None:
+                status, error = "succeeded", None
+                try:
+                    run_job(job["args"])
+                except Exception as e:
+                    status, error = "failed", repr(e)
+                finished = _finish(conn, job["id"], status, error)
+                done += 1
+                if on_done is not None:
+                    # reporting (MLflow) must not stop the drainer with jobs still queued
+                    try:
+                        on_done(
+                            {
+                                "job_id": job["id"],
+                                "reason": job["reason"],
+                                "status": status,
+                                "error": error,
+                                "queue_latency_s": job["started_at"] - job["created_at"],
+                                "duration_s": finished - job["started_at"],
+                            }
+                        )
+                    except Exception as e:
+                        print(f"[retrain_queue] on_done failed for job {job['id']}: {e!r}")
+        return done
+
+
+def spawn_worker() -> int:
+    # detached so the monitoring step returns immediately
+    os.makedirs(MONITORING_DIR, exist_ok=True)
+    log = open(os.path.join(MONITORING_DIR, "retrain_worker.log"), "a")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "src.pipelines.retrain_worker"],
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+    log.close()
+    return proc.pid
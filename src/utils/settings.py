@@ -9,8 +9,27 @@ MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
 MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minioadmin")
 MINIO_BUCKET = os.getenv("MINIO_BUCKET", "dvc")
 MINIO_DATA_PREFIX = os.getenv("MINIO_DATA_PREFIX", "datasets/cifar10/raw")
+MINIO_MANIFEST_DIR = os.getenv("MINIO_MANIFEST_DIR", "data/minio_manifests")
+MINIO_SHARD_PREFIX = os.getenv("MINIO_SHARD_PREFIX", "datasets/cifar10/shards")
+SHARD_CACHE_DIR = os.getenv("SHARD_CACHE_DIR", "data/shard_cache")
+SHARD_CACHE_MB = int(os.getenv("SHARD_CACHE_MB", "1024"))
 
 DATA_RAW_DIR = "data/raw"
+CIFAR_STORE_DIR = os.getenv("CIFAR_STORE_DIR", "data/store")
+STEP_CACHE_DIR = os.getenv("STEP_CACHE_DIR", "data/step_cache")
+STEP_CACHE_MB = int(os.getenv("STEP_CACHE_MB", "256"))
+DATA_BASELINE_PATH = os.getenv("DATA_BASELINE_PATH", "data/validation_baseline.json")
 MONITORING_DIR = "monitoring"
+INFERENCE_STORE_DIR = os.getenv("INFERENCE_STORE_DIR", "monitoring/inference_store")
+# one row per (input, model version) from champion/challenger runs, same partitioning
+COMPARISON_STORE_DIR = os.getenv("COMPARISON_STORE_DIR", "monitoring/comparison_store")
+DRIFT_SKETCH_DIR = os.getenv("DRIFT_SKETCH_DIR", "monitoring/drift_sketches")
+EMBEDDING_RESERVOIR_DIR = os.getenv("EMBEDDING_RESERVOIR_DIR", "monitoring/embedding_reservoirs")
+RETRAIN_QUEUE_DB = os.getenv("RETRAIN_QUEUE_DB", "monitoring/retrain_queue.sqlite")
+# per-step wall/CPU/RSS/IO records (src/utils/instrumentation.py)
+STEP_INSTRUMENTATION = os.getenv("STEP_INSTRUMENTATION", "1") == "1"
 ARTIFACTS_DIR = "artifacts"
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "artifacts/checkpoints")
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "artifacts/model_cache")
+MODEL_CACHE_MB = int(os.getenv("MODEL_CACHE_MB", "512"))
 MODEL_NAME = "cifar10_cnn"
\ No newline at end of file
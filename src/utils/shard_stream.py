@@ -0,0 +1,268 @@
+import json
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.distributed as dist
+from torch.utils.data import IterableDataset, get_worker_info
+
+from src.utils.cifar_dataset import normalize_batch
+from src.utils.cifar_store import ROW_SIZE, content_key, load_test, load_train
+from src.utils.minio_utils import make_s3_client
+from src.utils.settings import (
+    MINIO_ACCESS_KEY,
+    MINIO_ENDPOINT_URL,
+    MINIO_SECRET_KEY,
+    SHARD_CACHE_DIR,
+    SHARD_CACHE_MB,
+)
+
+# packed record: 1 label byte followed by the 3072 CHW image bytes
+RECORD_SIZE = 1 + ROW_SIZE
+INDEX_KEY = "index.json"
+
+
+def _pack(X: np.ndarray, y: np.ndarray) -> bytes:
+    rec = np.empty((len(y), RECORD_SIZE), dtype=np.uint8)
+    rec[:, 0] = y
+    rec[:, 1:] = X
+    return rec.tobytes()
+
+
+def publish_shards(
+    cifar_dir: str,
+    client,
+    bucket_name: str,
+    prefix: str,
+    records_per_shard: int = 5000,
+    test_size: float = 0.1,
+    random_state: int = 42,
+) -> Dict:
+    # writes train/val/test record shards once per dataset content key
+    from sklearn.model_selection import train_test_split
+
+    prefix = prefix.strip("/")
+    key = content_key(cifar_dir)
+    try:
+        body = client.get_object(Bucket=bucket_name, Key=f"{prefix}/{INDEX_KEY}")["Body"].read()
+        index = json.loads(body)
+        if index.get("key") == key:
+            return {"published": False, **_index_counts(index)}
+    except Exception:
+        pass
+
+    X, y = load_train(cifar_dir)
+    X_test, y_test = load_test(cifar_dir)
+    # same partition as split_data, so both data paths train/validate on the same rows
+    train_idx, val_idx = train_test_split(
+        np.arange(len(y)), test_size=test_size, random_state=random_state, stratify=np.asarray(y)
+    )
+    splits = {
+        "train": (X, y, train_idx),
+        "val": (X, y, np.sort(val_idx)),
+        "test": (X_test, y_test, np.arange(len(y_test))),
+    }
+
+    index = {"key": key, "record_size": RECORD_SIZE, "splits": {}}
+    for split, (Xs, ys, idx) in splits.items():
+        shards = []
+        for i, start in enumerate(range(0, len(idx), records_per_shard)):
+            rows = idx[start:start + records_per_shard]
+            name = f"{split}/shard-{i:05d}.bin"
+            data = _pack(Xs[rows], ys[rows])
+            client.put_object(Bucket=bucket_name, Key=f"{prefix}/{name}", Body=data)
+            shards.append({"name": name, "records": int(len(rows)), "size": len(data)})
+        index["splits"][split] = shards
+
+    client.put_object(Bucket=bucket_name, Key=f"{prefix}/{INDEX_KEY}", Body=json.dumps(index).encode())
+    return {"published": True, **_index_counts(index)}
+
+
+def _index_counts(index: Dict) -> Dict[str, int]:
+    return {f"{split}_shards": len(shards) for split, shards in index["splits"].items()}
+
+
+class ShardCache:
+    # bounded on-disk LRU; recency is the file mtime, refreshed on every hit
+    def __init__(self, cache_dir: str = SHARD_CACHE_DIR, max_bytes: int = SHARD_CACHE_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key.replace("/", "__"))
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return np.fromfile(path, dtype=np.uint8)
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+        self._evict(keep=self._path(key))
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(".tmp-"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue  # evicted concurrently by another worker
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class ShardStreamDataset(IterableDataset):
+    # Streams packed uint8 shards from MinIO/S3 and yields normalized batches.
+    # Shards are split across DDP ranks and DataLoader workers, fetched ahead with
+    # concurrent ranged GETs, cached in a bounded LRU and mixed in a shuffle buffer.
+    def __init__(
+        self,
+        bucket_name: str,
+        prefix: str,
+        split: str,
+        batch_size: int,
+        shuffle_buffer: int = 0,
+        prefetch_shards: int = 2,
+        range_mb: int = 8,
+        cache_dir: str = SHARD_CACHE_DIR,
+        cache_mb: int = SHARD_CACHE_MB,
+        seed: int = 0,
+    ):
+        self.bucket_name = bucket_name
+        self.prefix = prefix.strip("/")
+        self.split = split
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.prefetch_shards = max(1, prefetch_shards)
+        self.range_bytes = range_mb * 1024 * 1024
+        self.cache_dir = cache_dir
+        self.cache_mb = cache_mb
+        self.seed = seed
+        self._epoch = 0
+        self._client = None
+        index = json.loads(self._s3().get_object(Bucket=bucket_name, Key=f"{self.prefix}/{INDEX_KEY}")["Body"].read())
+        self.dataset_key = index["key"]
+        self.shards: List[Dict] = index["splits"][split]
+
+    def _s3(self):
+        if self._client is None:
+            self._client = make_s3_client(MINIO_ENDPOINT_URL, MINIO_ACCESS_KEY, MINIO_SECRET_KEY)
+        return self._client
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_client"] = None  # boto3 clients are per process
+        return state
+
+    def __len__(self) -> int:
+        return sum(s["records"] for s in self.shards)
+
+    def set_epoch(self, epoch: int) -> None:
+        self._epoch = epoch
+
+    def _my_shards(self) -> Tuple[List[Dict], int]:
+        rank, world = 0, 1
+        if dist.is_available() and dist.is_initialized():
+            rank, world = dist.get_rank(), dist.get_world_size()
+        info = get_worker_info()
+        wid, nworkers = (info.id, info.num_workers) if info is not None else (0, 1)
+        order = np.arange(len(self.shards))
+        if self.shuffle_buffer > 0:
+            # same permutation everywhere, then a disjoint stride per (rank, worker)
+            order = np.random.default_rng(self.seed + self._epoch).permutation(order)
+        stream_id = rank * nworkers + wid
+        return [self.shards[i] for i in order[stream_id::world * nworkers]], stream_id
+
+    def _fetch(self, shard: Dict, range_pool: ThreadPoolExecutor, cache: ShardCache) -> np.ndarray:
+        cache_key = f"{self.dataset_key}/{shard['name']}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached.reshape(-1, RECORD_SIZE)
+
+        key = f"{self.prefix}/{shard['name']}"
+        size = shard["size"]
+        s3 = self._s3()
+        if size <= self.range_bytes:
+            data = s3.get_object(Bucket=self.bucket_name, Key=key)["Body"].read()
+        else:
+            buf = bytearray(size)
+
+            def _get_range(start: int) -> None:
+                end = min(start + self.range_bytes, size) - 1
+                body = s3.get_object(Bucket=self.bucket_name, Key=key, Range=f"bytes={start}-{end}")["Body"]
+                buf[start:end + 1] = body.read()
+
+            list(range_pool.map(_get_range, range(0, size, self.range_bytes)))
+            data = bytes(buf)
+        cache.put(cache_key, data)
+        return np.frombuffer(data, dtype=np.uint8).reshape(-1, RECORD_SIZE)
+
+    def _emit(self, records: np.ndarray) -> Iterator[Tuple[torch.Tensor, torch.Tensor]]:
+        for start in range(0, len(records), self.batch_size):
+            rec = records[start:start + self.batch_size]
+            yb = torch.from_numpy(rec[:, 0].astype(np.int64))
+            xb = normalize_batch(torch.from_numpy(np.ascontiguousarray(rec[:, 1:])))
+            yield xb, yb
+
+    def __iter__(self) -> Iterator[Tuple[torch.Tensor, torch.Tensor]]:
+        shards, stream_id = self._my_shards()
+        rng = np.random.default_rng((self.seed, self._epoch, stream_id))
+        self._epoch += 1
+        cache = ShardCache(self.cache_dir, self.cache_mb * 1024 * 1024)
+
+        with ThreadPoolExecutor(self.prefetch_shards, thread_name_prefix="shard-prefetch") as shard_pool, \
+                ThreadPoolExecutor(4, thread_name_prefix="shard-range") as range_pool:
+            pending = deque()
+            it = iter(shards)
+            for shard in it:
+                pending.append(shard_pool.submit(self._fetch, shard, range_pool, cache))
+                if len(pending) >= self.prefetch_shards:
+                    break
+
+            buf = np.empty((0, RECORD_SIZE), dtype=np.uint8)
+            while pending:
+                records = pending.popleft().result()
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.append(shard_pool.submit(self._fetch, nxt, range_pool, cache))
+
+                if self.shuffle_buffer <= 0:
+                    yield from self._emit(records)
+                    continue
+                # permute leftovers + new shard; emit whole batches, keep ~half a buffer to mix on
+                buf = np.concatenate([buf, records])
+                if len(buf) < self.shuffle_buffer:
+                    continue
+                buf = buf[rng.permutation(len(buf))]
+                n_emit = (len(buf) - self.shuffle_buffer // 2) // self.batch_size * self.batch_size
+                yield from self._emit(buf[:n_emit])
+                buf = buf[n_emit:]
+
+            if len(buf):
+                yield from self._emit(buf[rng.permutation(len(buf))])
@@ -0,0 +1,154 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.utils.cifar_store import dvc_md5, files_digest, content_key
+from src.utils.settings import (
+    DATA_RAW_DIR,
+    MINIO_BUCKET,
+    MINIO_DATA_PREFIX,
+    MINIO_ENDPOINT_URL,
+    MINIO_SHARD_PREFIX,
+    STEP_CACHE_DIR,
+    STEP_CACHE_MB,
+)
+
+# bump when the stored layout of any cached step changes
+CACHE_VERSION = 1
+CIFAR_DIR = os.path.join(DATA_RAW_DIR, "cifar-10-batches-py")
+
+
+class StepCache:
+    # Content-addressed outputs of the data steps, one .npz per entry:
+    # <cache_dir>/<step>/<data_key[:12]>-<sha256(step, data_key, params)[:24]>.npz
+    # Recency is the file mtime (refreshed on hit); total size is capped.
+    def __init__(self, cache_dir: str = STEP_CACHE_DIR, max_mb: int = STEP_CACHE_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+
+    def _path(self, step: str, data_key: str, params: Dict) -> str:
+        raw = json.dumps({"v": CACHE_VERSION, "step": step, "data": data_key, "params": params}, sort_keys=True)
+        digest = hashlib.sha256(raw.encode()).hexdigest()[:24]
+        return os.path.join(self.cache_dir, step, f"{data_key[:12]}-{digest}.npz")
+
+    def get(self, step: str, data_key: str, **params) -> Optional[Dict[str, np.ndarray]]:
+        path = self._path(step, data_key, params)
+        try:
+            with np.load(path, allow_pickle=False) as f:
+                arrays = {k: f[k] for k in f.files}
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        os.utime(path)
+        return arrays
+
+    def put(self, step: str, data_key: str, arrays: Dict[str, np.ndarray], **params) -> str:
+        path = self._path(step, data_key, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, path)
+        self._evict(keep=path)
+        return path
+
+    def invalidate(self, step: Optional[str] = None, data_key: Optional[str] = None) -> int:
+        # drop entries of one step and/or one dataset version (everything by default)
+        pattern = os.path.join(self.cache_dir, step or "*", f"{data_key[:12] if data_key else ''}*.npz")
+        paths = glob.glob(pattern)
+        removed = 0
+        for p in paths:
+            try:
+                os.remove(p)
+                removed += 1
+            except FileNotFoundError:  # evicted or invalidated by a concurrent run
+                pass
+        return removed
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        for p in glob.glob(os.path.join(self.cache_dir, "*", "*.npz")):
+            if os.path.basename(p).startswith(".tmp-"):
+                continue
+            try:
+                st = os.stat(p)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            try:
+                os.remove(p)
+            except FileNotFoundError:  # already evicted by a concurrent run
+                pass
+            total -= size
+
+
+def raw_data_current(cifar_dir: str = CIFAR_DIR, cache: Optional[StepCache] = None) -> bool:
+    # True when the workspace still holds the files seen by the last successful
+    # ingest of the current DVC version, so `dvc pull` can be skipped
+    md5 = dvc_md5()
+    if md5 is None or not os.path.isdir(cifar_dir):
+        return False
+    stamp = (cache or StepCache()).get("ingest", md5)
+    try:
+        return stamp is not None and str(stamp["files_digest"]) == files_digest(cifar_dir)
+    except FileNotFoundError:
+        return False
+
+
+def record_ingest(cifar_dir: str = CIFAR_DIR, cache: Optional[StepCache] = None) -> None:
+    md5 = dvc_md5()
+    if md5 is not None:
+        (cache or StepCache()).put("ingest", md5, {"files_digest": np.array(files_digest(cifar_dir))})
+
+
+def _upload_target() -> Dict[str, str]:
+    return {
+        "endpoint": MINIO_ENDPOINT_URL,
+        "bucket": MINIO_BUCKET,
+        "data_prefix": MINIO_DATA_PREFIX,
+    }
+
+
+def _shards_target(records_per_shard: int) -> Dict:
+    return {**_upload_target(), "shard_prefix": MINIO_SHARD_PREFIX, "records_per_shard": records_per_shard}
+
+
+def record_upload(cifar_dir: str = CIFAR_DIR, cache: Optional[StepCache] = None) -> None:
+    # written by upload_data_to_minio once the raw files are in the bucket
+    (cache or StepCache()).put("upload", content_key(cifar_dir), {"done": np.array(True)}, **_upload_target())
+
+
+def record_shards(cifar_dir: str, records_per_shard: int, cache: Optional[StepCache] = None) -> None:
+    # separate entry: an upload with publish_record_shards=False leaves no shards behind
+    (cache or StepCache()).put("shards", content_key(cifar_dir), {"done": np.array(True)}, **_shards_target(records_per_shard))
+
+
+def upload_current(cifar_dir: str = CIFAR_DIR, records_per_shard: Optional[int] = 5000) -> bool:
+    # this data version was published to the configured bucket by a previous run, with
+    # its record shards unless records_per_shard is None (5000 = upload_data_to_minio's default);
+    # fine-tune and sweep runs fill the split cache without uploading anything
+    cache, key = StepCache(), content_key(cifar_dir)
+    if cache.get("upload", key, **_upload_target()) is None:
+        return False
+    return records_per_shard is None or cache.get("shards", key, **_shards_target(records_per_shard)) is not None
+
+
+def cached_split(test_size: float, random_state: int, cifar_dir: str = CIFAR_DIR) -> Optional[Dict[str, np.ndarray]]:
+    # client-side check used by training_pipeline to skip ingest/validate/split
+    if not raw_data_current(cifar_dir):
+        return None
+    cache = StepCache()
+    key = content_key(cifar_dir)
+    if cache.get("validate", key) is None:
+        return None
+    return cache.get("split", key, test_size=test_size, random_state=random_state)
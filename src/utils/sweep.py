@@ -0,0 +1,319 @@
+import itertools
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+import torch.nn as nn
+import torch.optim as optim
+
+from src.utils.cifar_dataset import CifarLoaderSpec, normalize_batch
+from src.utils.cifar_store import load_train
+from src.utils.cpu_perf import CpuPerfConfig
+from src.utils.profiling import EpochTimer
+
+# search space: {"lr": [1e-3, 3e-3]} is a choice (grid axis), {"lr": {"log_uniform": [1e-4, 1e-2]}}
+# and {"x": {"uniform": [a, b]}} are continuous (random mode only)
+DEFAULT_SPACE = {"lr": {"log_uniform": [1e-4, 3e-3]}, "batch_size": [64, 128, 256]}
+
+
+@dataclass
+class Trial:
+    trial_id: int
+    params: Dict
+    epochs: int = 0
+    val_acc: float = 0.0
+    best_val_acc: float = 0.0
+    status: str = "pending"  # running / paused (waiting at a rung) / completed
+    history: List[Dict] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def grid(space: Dict) -> List[Dict]:
+    axes = {k: v for k, v in space.items() if isinstance(v, list)}
+    if len(axes) != len(space):
+        raise ValueError("Grid search needs a list of values for every hyperparameter.")
+    return [dict(zip(axes, combo)) for combo in itertools.product(*axes.values())]
+
+
+def sample(space: Dict, n: int, seed: int = 0) -> List[Dict]:
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        params = {}
+        for k, v in space.items():
+            if isinstance(v, list):
+                params[k] = v[rng.integers(len(v))]
+            elif "log_uniform" in v:
+                lo, hi = v["log_uniform"]
+                params[k] = float(math.exp(rng.uniform(math.log(lo), math.log(hi))))
+            else:
+                lo, hi = v["uniform"]
+                params[k] = float(rng.uniform(lo, hi))
+        out.append({k: (p.item() if isinstance(p, np.generic) else p) for k, p in params.items()})
+    return out
+
+
+class ASHA:
+    # Asynchronous successive halving: rungs at min_epochs * eta^k epochs. A free
+    # worker first promotes the best not-yet-promoted trial of the highest rung
+    # where it ranks in the top 1/eta, otherwise starts a new trial. No rung ever
+    # waits for its cohort, so workers stay busy.
+    def __init__(self, n_trials: int, min_epochs: int, max_epochs: int, eta: int = 3):
+        self.eta = eta
+        self.rungs: List[int] = []
+        r = max(1, min_epochs)
+        while r < max_epochs:
+            self.rungs.append(r)
+            r *= eta
+        self.rungs.append(max_epochs)
+        self.n_trials = n_trials
+        self.started = 0
+        self.results: List[Dict[int, float]] = [{} for _ in self.rungs]
+        self.promoted: List[set] = [set() for _ in self.rungs]
+
+    def next_job(self) -> Optional[Tuple[int, int, int]]:
+        # (trial_id, from_epoch, to_epoch), or None when nothing can start now
+        for k in reversed(range(len(self.rungs) - 1)):
+            ranked = sorted(self.results[k], key=self.results[k].get, reverse=True)
+            for t in ranked[: len(ranked) // self.eta]:
+                if t not in self.promoted[k]:
+                    self.promoted[k].add(t)
+                    return t, self.rungs[k], self.rungs[k + 1]
+        if self.started < self.n_trials:
+            self.started += 1
+            return self.started - 1, 0, self.rungs[0]
+        return None
+
+    def report(self, trial_id: int, epochs: int, score: float) -> None:
+        self.results[self.rungs.index(epochs)][trial_id] = score
+
+
+class FIFO:
+    # every trial trains straight to max_epochs
+    def __init__(self, n_trials: int, max_epochs: int):
+        self.rungs = [max_epochs]
+        self.n_trials = n_trials
+        self.started = 0
+
+    def next_job(self) -> Optional[Tuple[int, int, int]]:
+        if self.started < self.n_trials:
+            self.started += 1
+            return self.started - 1, 0, self.rungs[0]
+        return None
+
+    def report(self, trial_id: int, epochs: int, score: float) -> None:
+        pass
+
+
+def shared_dataset(spec: CifarLoaderSpec) -> Tuple[torch.Tensor, torch.Tensor, int]:
+    # train + val rows normalized once into shared memory; pool workers receive
+    # handles to the same pages instead of re-reading and re-normalizing the store
+    if spec.source != "memmap":
+        raise ValueError("Sweeps need the local memmap store (source='memmap').")
+    X_u8, y = load_train(spec.cifar_dir)
+    rows = np.concatenate([spec.train_idx, spec.val_idx]).astype(np.int64)
+    X = torch.empty((len(rows), 3, 32, 32), dtype=torch.float32).share_memory_()
+    for s in range(0, len(rows), 4096):
+        part = torch.from_numpy(np.ascontiguousarray(X_u8[np.sort(rows[s:s + 4096])]))
+        # np.sort keeps memmap reads sequential; put rows back in split order
+        order = np.argsort(np.argsort(rows[s:s + 4096]))
+        normalize_batch(part[torch.from_numpy(order)], out=X[s:s + 4096])
+    Y = torch.from_numpy(np.asarray(y)[rows].astype(np.int64)).share_memory_()
+    return X, Y, len(spec.train_idx)
+
+
+# per-worker state, set once by _init_worker
+_DATA: Dict = {}
+
+
+def _init_worker(X: torch.Tensor, Y: torch.Tensor, n_train: int, threads: int, slot, cpus: List[int]) -> None:
+    with slot.get_lock():
+        index = slot.value
+        slot.value += 1
+    # pin the trial to its own core slice: no oversubscription between trials
+    cores = [cpus[(index * threads + i) % len(cpus)] for i in range(threads)]
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    _DATA.update(X=X, Y=Y, n_train=n_train, cores=cores)
+
+
+def _batches(idx: torch.Tensor, batch_size: int, gen: Optional[torch.Generator]) -> Iterator:
+    if gen is not None:
+        idx = idx[torch.randperm(len(idx), generator=gen)]
+    X, Y = _DATA["X"], _DATA["Y"]
+    for s in range(0, len(idx), batch_size):
+        b = idx[s:s + batch_size]
+        yield X.index_select(0, b), Y.index_select(0, b)
+
+
+def run_trial_job(job: Dict) -> Dict:
+    # trains one trial from job["from_epoch"] to job["to_epoch"], resuming from
+    # (and saving back to) job["state_path"]
+    from src.steps.training.train import SimpleCNN, train_one_epoch, validate
+
+    start = time.perf_counter()
+    params = job["params"]
+    perf = CpuPerfConfig(**job["perf"])
+    torch.manual_seed(job["seed"] + job["trial_id"])
+    gen = torch.Generator().manual_seed(job["seed"] * 100003 + job["trial_id"] * 1009 + job["from_epoch"])
+    model = SimpleCNN()
+    optimizer = optim.Adam(model.parameters(), lr=params["lr"])
+    if job["from_epoch"] > 0:
+        state = torch.load(job["state_path"])
+        model.load_state_dict(state["model"])
+        optimizer.load_state_dict(state["optimizer"])
+    fwd = perf.prepare_model(model)
+    criterion = nn.CrossEntropyLoss()
+    timer = EpochTimer("cpu")
+
+    n_train = _DATA["n_train"]
+    train_idx = torch.arange(n_train)
+    val_idx = torch.arange(n_train, len(_DATA["Y"]))
+    batch_size = int(params.get("batch_size", 128))
+    history = []
+    for epoch in range(job["from_epoch"] + 1, job["to_epoch"] + 1):
+        train_loss, train_acc = train_one_epoch(model, fwd, _batches(train_idx, batch_size, gen), criterion, optimizer, "cpu", perf, timer)
+        epoch_metrics = timer.metrics("train")
+        model.eval()
+        val_loss, val_acc = validate(fwd, _batches(val_idx, 512, None), criterion, "cpu", perf)
+        history.append({"epoch": epoch, "train_loss": train_loss, "train_acc": train_acc, "val_loss": val_loss, "val_acc": val_acc, **epoch_metrics})
+
+    perf.restore_model(model)
+    torch.save({"model": model.state_dict(), "optimizer": optimizer.state_dict()}, job["state_path"])
+    return {
+        "trial_id": job["trial_id"],
+        "to_epoch": job["to_epoch"],
+        "history": history,
+        "elapsed_s": time.perf_counter() - start,
+        "cores": _DATA["cores"],
+    }
+
+
+@dataclass
+class SweepResult:
+    trials: List[Trial]
+    best: Trial
+    best_state_path: str
+    rungs: List[int]
+    jobs: int
+    epochs_run: int
+    elapsed_s: float
+    workers: int
+    threads_per_trial: int
+
+    def summary(self) -> Dict:
+        hours = max(self.elapsed_s, 1e-9) / 3600.0
+        return {
+            "n_trials": len(self.trials),
+            "jobs": self.jobs,
+            "epochs_run": self.epochs_run,
+            "rungs": self.rungs,
+            "workers": self.workers,
+            "threads_per_trial": self.threads_per_trial,
+            "elapsed_s": self.elapsed_s,
+            "trials_per_hour": len(self.trials) / hours,
+            "epochs_per_hour": self.epochs_run / hours,
+            "best_trial": self.best.trial_id,
+            "best_val_acc": self.best.val_acc,
+            "best_epochs": self.best.epochs,
+            "best_params": self.best.params,
+        }
+
+
+def run_sweep(
+    spec: CifarLoaderSpec,
+    configs: List[Dict],
+    out_dir: str,
+    scheduler: str = "asha",
+    min_epochs: int = 1,
+    max_epochs: int = 9,
+    eta: int = 3,
+    workers: int = 0,
+    threads_per_trial: int = 2,
+    perf: Optional[CpuPerfConfig] = None,
+    seed: int = 0,
+    on_result: Optional[Callable[[Trial, Dict], None]] = None,
+) -> SweepResult:
+    # Trials run concurrently in a spawn-based process pool (threads_per_trial
+    # cores each, pinned). Trial weights live in out_dir so ASHA can resume a
+    # promoted trial on whichever worker is free.
+    start = time.perf_counter()
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    threads_per_trial = max(1, min(threads_per_trial, len(cpus)))
+    workers = workers if workers > 0 else max(1, len(cpus) // threads_per_trial)
+    perf = perf or CpuPerfConfig()
+    perf_args = {"channels_last": perf.channels_last, "bf16_autocast": perf.bf16_requested, "compile_model": perf.compile_model}
+    sched = ASHA(len(configs), min_epochs, max_epochs, eta) if scheduler == "asha" else FIFO(len(configs), max_epochs)
+    trials = [Trial(i, p) for i, p in enumerate(configs)]
+    os.makedirs(out_dir, exist_ok=True)
+
+    X, Y, n_train = shared_dataset(spec)
+    ctx = mp.get_context("spawn")
+    slot = ctx.Value("i", 0)
+    jobs = epochs_run = 0
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(X, Y, n_train, threads_per_trial, slot, cpus)) as pool:
+        pending = {}
+        while True:
+            while len(pending) < workers:
+                nxt = sched.next_job()
+                if nxt is None:
+                    break
+                trial_id, from_epoch, to_epoch = nxt
+                trials[trial_id].status = "running"
+                job = {
+                    "trial_id": trial_id,
+                    "params": trials[trial_id].params,
+                    "from_epoch": from_epoch,
+                    "to_epoch": to_epoch,
+                    "state_path": os.path.join(out_dir, f"trial-{trial_id}.pt"),
+                    "perf": perf_args,
+                    "seed": seed,
+                }
+                pending[pool.submit(run_trial_job, job)] = job
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                pending.pop(fut)
+                result = fut.result()
+                trial = trials[result["trial_id"]]
+                trial.history.extend(result["history"])
+                trial.epochs = result["to_epoch"]
+                trial.val_acc = result["history"][-1]["val_acc"]
+                trial.best_val_acc = max([trial.best_val_acc] + [h["val_acc"] for h in result["history"]])
+                trial.elapsed_s += result["elapsed_s"]
+                trial.status = "completed" if trial.epochs >= max_epochs else "paused"
+                jobs += 1
+                epochs_run += len(result["history"])
+                sched.report(trial.trial_id, trial.epochs, trial.val_acc)
+                if on_result is not None:
+                    on_result(trial, result)
+
+    # best = highest final val_acc among trials trained the furthest
+    deepest = max(t.epochs for t in trials)
+    best = max((t for t in trials if t.epochs == deepest), key=lambda t: t.val_acc)
+    return SweepResult(
+        trials=trials,
+        best=best,
+        best_state_path=os.path.join(out_dir, f"trial-{best.trial_id}.pt"),
+        rungs=sched.rungs,
+        jobs=jobs,
+        epochs_run=epochs_run,
+        elapsed_s=time.perf_counter() - start,
+        workers=workers,
+        threads_per_trial=threads_per_trial,
+    )
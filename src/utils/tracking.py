@@ -0,0 +1,204 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import mlflow
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID
+
+from src.utils.settings import MLFLOW_EXPERIMENT_NAME, MLFLOW_TRACKING_URI
+
+# MLflow log_batch limits per call, on top of 1000 entities in total
+_MAX_METRICS, _MAX_PARAMS, _MAX_TAGS, _MAX_ENTITIES = 1000, 100, 100, 1000
+PIPELINE_RUN_TAG = "zenml_pipeline_run_id"
+
+_parent_runs: Dict[str, str] = {}
+# steps and the instrumentation thread may look up the parent concurrently
+_parent_lock = threading.Lock()
+
+
+class RunLogger:
+    # Buffers metrics/params/tags/artifacts for one run and ships them from a
+    # background thread with client.log_batch, so the caller never waits on
+    # the tracking server. flush() blocks until everything queued is written.
+    def __init__(self, run_id: str, client: Optional[MlflowClient] = None, flush_interval_s: float = 1.0):
+        self.run_id = run_id
+        self.client = client or MlflowClient()
+        self.flush_interval_s = flush_interval_s
+        self.queue: "queue.Queue" = queue.Queue()
+        self.errors: List[BaseException] = []
+        self.thread = threading.Thread(target=self._drain, name=f"mlflow-log-{run_id[:8]}", daemon=True)
+        self.thread.start()
+
+    def log_metrics(self, metrics: Dict[str, float], step: Optional[int] = None) -> None:
+        ts = int(time.time() * 1000)
+        for k, v in metrics.items():
+            self.queue.put(("metric", Metric(k, float(v), ts, step or 0)))
+
+    def log_params(self, params: Dict) -> None:
+        for k, v in params.items():
+            self.queue.put(("param", Param(k, str(v))))
+
+    def set_tags(self, tags: Dict) -> None:
+        for k, v in tags.items():
+            self.queue.put(("tag", RunTag(k, str(v))))
+
+    def log_artifact(self, path: str, artifact_path: Optional[str] = None) -> None:
+        self.queue.put(("artifact", (path, artifact_path)))
+
+    def flush(self) -> None:
+        done = threading.Event()
+        self.queue.put(("flush", done))
+        done.wait()
+        if self.errors:
+            raise RuntimeError(f"MLflow logging failed for run {self.run_id}") from self.errors[0]
+
+    def close(self, raise_errors: bool = True) -> None:
+        self.queue.put(("stop", None))
+        self.thread.join()
+        if self.errors:
+            if raise_errors:
+                raise RuntimeError(f"MLflow logging failed for run {self.run_id}") from self.errors[0]
+            print(f"[tracking] MLflow logging failed for run {self.run_id}: {self.errors[0]!r}")
+
+    def _write(self, metrics: List[Metric], params: List[Param], tags: List[RunTag]) -> None:
+        # params and tags first, metrics fill what is left of the per-call budget
+        while metrics or params or tags:
+            n_params = min(len(params), _MAX_PARAMS)
+            n_tags = min(len(tags), _MAX_TAGS)
+            n_metrics = min(len(metrics), _MAX_METRICS, _MAX_ENTITIES - n_params - n_tags)
+            self.client.log_batch(
+                self.run_id, metrics=metrics[:n_metrics], params=params[:n_params], tags=tags[:n_tags]
+            )
+            metrics, params, tags = metrics[n_metrics:], params[n_params:], tags[n_tags:]
+
+    def _drain(self) -> None:
+        metrics: List[Metric] = []
+        # keyed: MLflow rejects a batch holding the same param/tag key twice
+        params: Dict[str, Param] = {}
+        tags: Dict[str, RunTag] = {}
+        stop = False
+        while not stop:
+            try:
+                items = [self.queue.get(timeout=self.flush_interval_s)]
+            except queue.Empty:
+                items = []
+            while True:  # take everything already queued
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            waiters = []
+            artifacts = []
+            for kind, payload in items:
+                if kind == "metric":
+                    metrics.append(payload)
+                elif kind == "param":
+                    params[payload.key] = payload
+                elif kind == "tag":
+                    tags[payload.key] = payload
+                elif kind == "artifact":
+                    artifacts.append(payload)
+                elif kind == "flush":
+                    waiters.append(payload)
+                elif kind == "stop":
+                    stop = True
+            try:
+                self._write(metrics, list(params.values()), list(tags.values()))
+                for path, artifact_path in artifacts:
+                    self.client.log_artifact(self.run_id, path, artifact_path)
+            except Exception as e:  # surfaced on flush()/close()
+                self.errors.append(e)
+            metrics, params, tags = [], {}, {}
+            for w in waiters:
+                w.set()
+
+
+def setup_tracking() -> MlflowClient:
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+    return MlflowClient()
+
+
+def pipeline_context() -> Optional[tuple]:
+    # (pipeline run id, pipeline name) inside a ZenML step, else None
+    try:
+        from zenml import get_step_context
+
+        ctx = get_step_context()
+        return str(ctx.pipeline_run.id), ctx.pipeline.name
+    except Exception:
+        return None
+
+
+def pipeline_parent_run(client: MlflowClient, ctx: Optional[tuple] = None) -> Optional[str]:
+    # one parent MLflow run per ZenML pipeline run, found by tag so that steps
+    # executed in separate processes share it; ctx is pipeline_context() when
+    # called off the step's thread
+    ctx = ctx or pipeline_context()
+    if ctx is None:
+        return None
+    run_key, pipeline_name = ctx
+    with _parent_lock:
+        if run_key in _parent_runs:
+            return _parent_runs[run_key]
+        experiment_id = mlflow.get_experiment_by_name(MLFLOW_EXPERIMENT_NAME).experiment_id
+        found = client.search_runs([experiment_id], filter_string=f"tags.{PIPELINE_RUN_TAG} = '{run_key}'", max_results=1)
+        if found:
+            run_id = found[0].info.run_id
+        else:
+            run_id = client.create_run(
+                experiment_id, run_name=pipeline_name, tags={PIPELINE_RUN_TAG: run_key, "pipeline": pipeline_name}
+            ).info.run_id
+        _parent_runs[run_key] = run_id
+        return run_id
+
+
+def nested_run(parent: RunLogger, run_name: str, tags: Optional[Dict] = None) -> RunLogger:
+    # extra child of an open run (e.g. one per sweep trial), logged without the
+    # fluent API; close() it, then set_terminated(run_id) on its client
+    experiment_id = parent.client.get_run(parent.run_id).info.experiment_id
+    run = parent.client.create_run(experiment_id, run_name=run_name, tags={MLFLOW_PARENT_RUN_ID: parent.run_id, **(tags or {})})
+    return RunLogger(run.info.run_id, parent.client, parent.flush_interval_s)
+
+
+def log_artifacts_when_done(client: MlflowClient, run_id: str, paths: "Future[List[str]]") -> None:
+    # artifacts produced off the step's critical path (e.g. evaluation plots) are
+    # attached to the run once ready, even if it has closed; errors are printed
+    def _log(done: "Future[List[str]]") -> None:
+        try:
+            for path in done.result():
+                client.log_artifact(run_id, path)
+        except Exception as e:
+            print(f"[tracking] deferred artifacts for run {run_id} not logged: {e!r}")
+
+    paths.add_done_callback(_log)
+
+
+@contextmanager
+def step_run(run_name: str, params: Optional[Dict] = None) -> Iterator[RunLogger]:
+    # Child run of the pipeline's parent run (a plain run outside ZenML). The
+    # fluent run is active inside the block, so mlflow.pytorch.log_model & co
+    # still work; buffered writes are flushed before the run is closed.
+    client = setup_tracking()
+    while mlflow.active_run() is not None:
+        mlflow.end_run()
+    parent_id = pipeline_parent_run(client)
+    tags = {MLFLOW_PARENT_RUN_ID: parent_id} if parent_id else None
+    with mlflow.start_run(run_name=run_name, tags=tags) as run:
+        logger = RunLogger(run.info.run_id, client)
+        try:
+            if params:
+                logger.log_params(params)
+            yield logger
+        except BaseException:
+            # the step's own exception wins over a logging failure
+            logger.close(raise_errors=False)
+            raise
+        logger.close()
+    if parent_id:
+        client.set_terminated(parent_id)  # end time follows the last finished step
@@ -0,0 +1,170 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from src.utils.batch_inference import INFERENCE_SCHEMA, NUM_CLASSES, BatchInferenceEngine
+from src.utils.model_registry import aliased_version, recent_model_versions
+from src.utils.settings import MODEL_NAME
+
+# inference rows plus which version produced them; the first version of a run is the champion
+COMPARISON_SCHEMA = pa.schema(
+    list(INFERENCE_SCHEMA)
+    + [("model_version", pa.string()), ("role", pa.string()), ("agrees_with_champion", pa.bool_())]
+)
+
+
+def select_versions(
+    name: str = MODEL_NAME,
+    versions: Optional[Sequence[str]] = None,
+    n_challengers: int = 1,
+    champion_alias: str = "champion",
+) -> List[str]:
+    # [champion, *challengers]. Explicit versions are taken as given. Otherwise the
+    # champion is the aliased version (or the previous one before any alias exists)
+    # and the challengers are the newest other versions.
+    if versions:
+        return list(dict.fromkeys(str(v) for v in versions))
+    recent = [str(mv.version) for mv in recent_model_versions(name, n_challengers + 2)]
+    if not recent:
+        raise ValueError(f"No registered versions found for model '{name}'.")
+    aliased = aliased_version(name, champion_alias)
+    champion = str(aliased.version) if aliased is not None else recent[min(1, len(recent) - 1)]
+    return [champion] + [v for v in recent if v != champion][:n_challengers]
+
+
+def mcnemar_p(fixes: int, regressions: int) -> float:
+    # two-sided McNemar test (normal approximation, continuity corrected) on the
+    # discordant pairs: is the challenger's accuracy difference more than noise?
+    n = fixes + regressions
+    if n == 0:
+        return 1.0
+    z = max(abs(fixes - regressions) - 1, 0) / math.sqrt(n)
+    return math.erfc(z / math.sqrt(2))
+
+
+@dataclass
+class VersionStats:
+    version: str
+    role: str
+    rows: int = 0
+    accuracy: float = 0.0
+    mean_confidence: float = 0.0
+    # share of inputs whose predicted class differs from the champion's
+    disagreement: float = 0.0
+    # champion wrong and this version right / champion right and this version wrong
+    fixes: int = 0
+    regressions: int = 0
+    mcnemar_p: float = 1.0
+    # forward pass per batch, measured while the other versions run concurrently
+    latency_ms_p50: float = 0.0
+    latency_ms_p95: float = 0.0
+    rows_per_sec: float = 0.0
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+    def metrics(self) -> Dict[str, float]:
+        return {f"v{self.version}_{k}": float(v) for k, v in self.as_dict().items() if k not in ("version", "role")}
+
+
+def compare_versions(
+    models: Dict[str, nn.Module],
+    X_u8: np.ndarray,
+    y: np.ndarray,
+    rows: np.ndarray,
+    transform: Optional[Callable] = None,
+    batch_size: int = 512,
+    workers: int = 0,
+) -> Tuple[pa.Table, List[VersionStats], float]:
+    # Each batch is gathered and normalized once, then the forward passes of all
+    # versions run on a thread pool (torch releases the GIL). Returns the rows for
+    # COMPARISON_STORE_DIR, the per-version stats (champion first) and the wall time.
+    versions = list(models)
+    champion = versions[0]
+    engine = BatchInferenceEngine(models[champion], batch_size=batch_size)
+    preds = {v: np.empty(len(rows), dtype=np.int64) for v in versions}
+    confidence = {v: np.empty(len(rows), dtype=np.float32) for v in versions}
+    latencies: Dict[str, List[float]] = {v: [] for v in versions}
+    y_all = np.asarray(y[rows], dtype=np.int64)
+    ts = int(time.time())
+
+    def forward(version: str, xb: torch.Tensor) -> Tuple[np.ndarray, float]:
+        start = time.perf_counter()
+        with torch.inference_mode():  # thread-local, so set in the worker
+            probs = F.softmax(models[version](xb), dim=1).numpy()
+        return probs, time.perf_counter() - start
+
+    tables = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers or len(versions), thread_name_prefix="version-forward") as pool:
+        for sl, xb, _ in engine.iter_batches(X_u8, rows, transform):
+            futures = {v: pool.submit(forward, v, xb) for v in versions}
+            for v in versions:
+                probs, seconds = futures[v].result()
+                latencies[v].append(seconds)
+                preds[v][sl] = probs.argmax(axis=1)
+                confidence[v][sl] = probs.max(axis=1)
+                n = probs.shape[0]
+                columns = [pa.array(probs[:, i]) for i in range(NUM_CLASSES)]
+                columns += [
+                    pa.array(preds[v][sl]),
+                    pa.array(y_all[sl]),
+                    pa.array(np.full(n, ts, dtype=np.int64)),
+                    pa.array([v] * n, type=pa.string()),
+                    pa.array(["champion" if v == champion else "challenger"] * n, type=pa.string()),
+                    pa.array(preds[v][sl] == preds[champion][sl]),
+                ]
+                tables.append(pa.Table.from_arrays(columns, schema=COMPARISON_SCHEMA))
+    wall_s = time.perf_counter() - start
+
+    champion_ok = preds[champion] == y_all
+    stats = []
+    for v in versions:
+        ok = preds[v] == y_all
+        lat_ms = np.asarray(latencies[v]) * 1000.0
+        fixes, regressions = int((ok & ~champion_ok).sum()), int((~ok & champion_ok).sum())
+        stats.append(
+            VersionStats(
+                version=v,
+                role="champion" if v == champion else "challenger",
+                rows=len(rows),
+                accuracy=float(ok.mean()) if len(rows) else 0.0,
+                mean_confidence=float(confidence[v].mean()) if len(rows) else 0.0,
+                disagreement=float((preds[v] != preds[champion]).mean()) if len(rows) else 0.0,
+                fixes=fixes,
+                regressions=regressions,
+                mcnemar_p=mcnemar_p(fixes, regressions),
+                latency_ms_p50=float(np.percentile(lat_ms, 50)) if len(lat_ms) else 0.0,
+                latency_ms_p95=float(np.percentile(lat_ms, 95)) if len(lat_ms) else 0.0,
+                rows_per_sec=len(rows) / max(lat_ms.sum() / 1000.0, 1e-9),
+            )
+        )
+    table = pa.concat_tables(tables) if tables else COMPARISON_SCHEMA.empty_table()
+    return table, stats, wall_s
+
+
+def promotion_candidate(
+    stats: List[VersionStats],
+    min_accuracy_gain: float = 0.005,
+    alpha: float = 0.05,
+    max_latency_ratio: float = 1.5,
+) -> Optional[VersionStats]:
+    # best challenger that beats the champion by min_accuracy_gain, significantly
+    # (McNemar p < alpha), without slowing p95 latency by more than max_latency_ratio
+    champion = stats[0]
+    eligible = [
+        s
+        for s in stats[1:]
+        if s.accuracy - champion.accuracy >= min_accuracy_gain
+        and s.mcnemar_p < alpha
+        and s.latency_ms_p95 <= champion.latency_ms_p95 * max_latency_ratio
+    ]
+    return max(eligible, key=lambda s: s.accuracy, default=None)
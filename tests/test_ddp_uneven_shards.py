@@ -0,0 +1,68 @@
+import multiprocessing
+from dataclasses import dataclass
+
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+dist = pytest.importorskip("torch.distributed")
+
+from torch.utils.data import IterableDataset
+
+from src.utils.cifar_dataset import CifarLoaderSpec
+from src.utils.ddp import run_ddp
+
+RECORDS_PER_SHARD = 48
+# 9 shards with a short last one, like 45k rows at 5000 per shard
+SHARDS = [RECORDS_PER_SHARD] * 8 + [20]
+
+
+class UnevenShards(IterableDataset):
+    # same stride split as ShardStreamDataset._my_shards, without MinIO
+    def __init__(self, shards, batch_size):
+        self.shards = shards
+        self.batch_size = batch_size
+        self.epoch = 0
+
+    def __len__(self):
+        return sum(self.shards)
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __iter__(self):
+        rank, world = dist.get_rank(), dist.get_world_size()
+        g = torch.Generator().manual_seed(rank)
+        for records in self.shards[rank::world]:
+            for start in range(0, records, self.batch_size):
+                n = min(self.batch_size, records - start)
+                yield torch.randn(n, 3, 32, 32, generator=g), torch.randint(0, 10, (n,), generator=g)
+
+
+@dataclass
+class UnevenSpec(CifarLoaderSpec):
+    def datasets(self):
+        return UnevenShards(SHARDS, self.batch_size), UnevenShards([30], self.batch_size), UnevenShards([], self.batch_size)
+
+
+def _run(queue):
+    spec = UnevenSpec(cifar_dir="", train_idx=np.arange(0), val_idx=np.arange(0), batch_size=16)
+    _, history = run_ddp(spec, world_size=2, epochs=2, lr=1e-3)
+    queue.put(history)
+
+
+def test_two_ranks_over_uneven_shards_do_not_hang():
+    # rank 0 gets 5 shards, rank 1 gets 4 (one short) and all the validation rows go to rank 0
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run, args=(queue,))
+    proc.start()
+    proc.join(timeout=300)
+    if proc.is_alive():
+        proc.kill()
+        pytest.fail("DDP training hung on uneven shard counts")
+    assert proc.exitcode == 0
+    history = queue.get(timeout=10)
+    assert [h["epoch"] for h in history] == [1, 2]
+    assert history[-1]["train_samples_per_sec"] > 0
+    assert 0.0 <= history[-1]["val_acc"] <= 1.0
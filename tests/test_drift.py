@@ -0,0 +1,72 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+stats = pytest.importorskip("scipy.stats")
+
+from src.utils.drift import KS_ALPHA, WASSERSTEIN_THRESHOLD, compute_drift, ks_wasserstein
+
+COLUMNS = ["a", "b", "c"]
+
+
+def _sample(n, shift=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack(
+        [
+            rng.normal(shift, 1.0, n),
+            rng.exponential(1.0, n) + shift,
+            rng.uniform(0.0, 1.0, n) + shift,
+        ]
+    )
+
+
+@pytest.mark.parametrize("shift", [0.0, 0.1, 0.5])
+def test_ks_and_wasserstein_match_scipy(shift):
+    reference, current = _sample(600, seed=1), _sample(450, shift=shift, seed=2)
+    ks, pvalue, wd = ks_wasserstein(reference, current)
+    for j in range(len(COLUMNS)):
+        expected = stats.ks_2samp(reference[:, j], current[:, j], method="asymp")
+        assert ks[j] == pytest.approx(expected.statistic, abs=1e-12)
+        # Stephens' approximation vs scipy's kstwo: close, and same side of the threshold
+        assert pvalue[j] == pytest.approx(expected.pvalue, abs=0.02)
+        if abs(expected.pvalue - KS_ALPHA) > 0.02:
+            assert (pvalue[j] < KS_ALPHA) == (expected.pvalue < KS_ALPHA)
+        assert wd[j] == pytest.approx(stats.wasserstein_distance(reference[:, j], current[:, j]), rel=1e-9)
+
+
+def test_ties_match_scipy():
+    # uint8-like features: many repeated values on both sides
+    rng = np.random.default_rng(3)
+    reference = rng.integers(0, 8, size=(500, 2)).astype(np.float64)
+    current = rng.integers(1, 9, size=(300, 2)).astype(np.float64)
+    ks, _, wd = ks_wasserstein(reference, current)
+    for j in range(2):
+        assert ks[j] == pytest.approx(stats.ks_2samp(reference[:, j], current[:, j]).statistic, abs=1e-12)
+        assert wd[j] == pytest.approx(stats.wasserstein_distance(reference[:, j], current[:, j]), rel=1e-9)
+
+
+@pytest.mark.parametrize("stattest", ["ks", "wasserstein", "psi"])
+def test_identical_distribution_does_not_drift(stattest):
+    reference = _sample(800)
+    current = np.random.default_rng(4).permutation(reference)  # same empirical distribution
+    result = compute_drift(reference, current, COLUMNS, stattest=stattest)
+    assert result.drift_share == 0.0
+    assert result.drifted == [False] * len(COLUMNS)
+
+
+@pytest.mark.parametrize("stattest", ["ks", "wasserstein", "psi"])
+def test_shifted_distribution_drifts(stattest):
+    reference, current = _sample(800, seed=5), _sample(800, shift=1.0, seed=6)
+    result = compute_drift(reference, current, COLUMNS, stattest=stattest)
+    assert result.drift_share == 1.0
+    assert result.n_drifted == len(COLUMNS)
+
+
+def test_auto_switches_to_wasserstein_on_large_reference():
+    # resampled from the same distribution: the normed distance stays well under the threshold
+    reference, current = _sample(5000, seed=7), _sample(5000, seed=8)
+    result = compute_drift(reference, current, COLUMNS)
+    assert result.stattest == "wasserstein"
+    assert max(result.wasserstein) < WASSERSTEIN_THRESHOLD
+    assert result.drift_share == 0.0
+
+    assert compute_drift(reference[:1000], current[:1000], COLUMNS).stattest == "ks"
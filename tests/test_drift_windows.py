@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.utils.inference_store import hour_window_bounds
+
+H = 3600
+
+
+def _hours(start, end):
+    # hours SketchStore.window / ReservoirStore.window merge for [start, end)
+    return set(range(start // H, (end - 1) // H + 1)) if end > start else set()
+
+
+@pytest.mark.parametrize("current_hours", [0.25, 1, 1.5, 6])
+@pytest.mark.parametrize("offset", [0, 1, 1800, H - 1])
+def test_default_windows_share_no_hour(current_hours, offset):
+    now = 1_700_000_000 // H * H + offset
+    (ref_start, ref_end), (cur_start, cur_end) = hour_window_bounds(current_hours, now=now)
+    for ts in (ref_start, ref_end, cur_start, cur_end):
+        assert ts % H == 0
+    assert ref_end == cur_start
+    assert cur_start <= now < cur_end
+    ref, cur = _hours(ref_start, ref_end), _hours(cur_start, cur_end)
+    assert ref and cur
+    assert not ref & cur
+    assert len(ref) == len(cur)
+
+
+def test_fixed_reference_is_cut_before_current_window():
+    now = 1_700_000_000 // H * H + 600
+    (ref_start, ref_end), (cur_start, _) = hour_window_bounds(2, reference_start_ts=now - 5 * H - 10, reference_end_ts=now, now=now)
+    assert ref_start % H == 0 and ref_end == cur_start
+    assert not _hours(ref_start, ref_end) & _hours(cur_start, cur_start + 2 * H)
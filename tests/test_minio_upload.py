@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from src.utils.minio_utils import MB, local_etag, make_transfer_config, upload_directory_to_minio
+
+# moto >= 5 has a single mock_aws; older releases mock_s3
+mock_s3 = getattr(moto, "mock_aws", None) or moto.mock_s3
+BUCKET = "cifar"
+CHUNK_MB = 5  # S3's minimum part size
+
+
+@pytest.fixture
+def s3():
+    with mock_s3():
+        yield boto3.client(
+            "s3",
+            region_name="us-east-1",
+            aws_access_key_id="test",
+            aws_secret_access_key="test",
+        )
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    d = tmp_path / "cifar-10-batches-py"
+    d.mkdir()
+    (d / "batches.meta").write_bytes(os.urandom(1024))
+    (d / "data_batch_1").write_bytes(os.urandom(2 * CHUNK_MB * MB + 123))  # 3 parts
+    return d
+
+
+def _upload(data_dir, s3, manifest):
+    return upload_directory_to_minio(
+        str(data_dir),
+        endpoint_url="http://moto",
+        access_key="test",
+        secret_key="test",
+        bucket_name=BUCKET,
+        prefix="raw",
+        max_workers=2,
+        chunk_mb=CHUNK_MB,
+        client=s3,
+        manifest_path=str(manifest),
+    )
+
+
+def test_first_upload_then_rerun_skips_everything(data_dir, s3, tmp_path):
+    manifest = tmp_path / "manifest.json"
+    first = _upload(data_dir, s3, manifest)
+    assert (first["uploaded_files"], first["skipped_files"]) == (2, 0)
+    keys = {o["Key"] for o in s3.list_objects_v2(Bucket=BUCKET, Prefix="raw")["Contents"]}
+    assert keys == {"raw/batches.meta", "raw/data_batch_1"}
+
+    again = _upload(data_dir, s3, manifest)
+    assert (again["uploaded_files"], again["skipped_files"], again["bytes_transferred"]) == (0, 2, 0)
+
+    # without the manifest, the ETag comparison alone still skips every file
+    fresh = _upload(data_dir, s3, tmp_path / "other_manifest.json")
+    assert (fresh["uploaded_files"], fresh["skipped_files"]) == (0, 2)
+
+
+def test_local_etag_matches_multipart_etag(data_dir, s3, tmp_path):
+    _upload(data_dir, s3, tmp_path / "manifest.json")
+    remote = s3.head_object(Bucket=BUCKET, Key="raw/data_batch_1")["ETag"].strip('"')
+    expected = local_etag(str(data_dir / "data_batch_1"), make_transfer_config(CHUNK_MB))
+    assert remote.endswith("-3")
+    assert expected == remote
+    small = s3.head_object(Bucket=BUCKET, Key="raw/batches.meta")["ETag"].strip('"')
+    assert local_etag(str(data_dir / "batches.meta"), make_transfer_config(CHUNK_MB)) == small
+
+
+def test_changed_file_is_reuploaded(data_dir, s3, tmp_path):
+    manifest = tmp_path / "manifest.json"
+    _upload(data_dir, s3, manifest)
+    new_meta = os.urandom(2048)  # size differs too: no reliance on mtime resolution
+    (data_dir / "batches.meta").write_bytes(new_meta)
+
+    result = _upload(data_dir, s3, manifest)
+    assert (result["uploaded_files"], result["skipped_files"]) == (1, 1)
+    assert result["bytes_transferred"] == len(new_meta)
+    assert s3.get_object(Bucket=BUCKET, Key="raw/batches.meta")["Body"].read() == new_meta
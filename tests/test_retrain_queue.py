@@ -0,0 +1,114 @@
+import fcntl
+import sqlite3
+import time
+from contextlib import closing
+
+import pytest
+
+from src.utils.retrain_queue import enqueue_retrain, run_worker
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "retrain_queue.sqlite")
+
+
+def _rows(db):
+    with closing(sqlite3.connect(db)) as conn:
+        return conn.execute("SELECT id, status, error FROM retrain_jobs ORDER BY id").fetchall()
+
+
+def _age(db, column, seconds):
+    with closing(sqlite3.connect(db)) as conn:
+        conn.execute(f"UPDATE retrain_jobs SET {column} = {column} - ?", (seconds,))
+        conn.commit()
+
+
+def test_second_enqueue_is_deduplicated(db):
+    first = enqueue_retrain("drift", {}, cooldown_s=0, db_path=db)
+    second = enqueue_retrain("drift again", {}, cooldown_s=0, db_path=db)
+    assert first["status"] == "queued"
+    assert second == {"job_id": first["job_id"], "status": "deduplicated", "pending_status": "queued"}
+    assert len(_rows(db)) == 1
+
+
+def test_cooldown_after_succeeded_job(db):
+    enqueue_retrain("drift", {}, cooldown_s=600, db_path=db)
+    assert run_worker(lambda args: None, db_path=db, lock_wait_s=0) == 1
+    result = enqueue_retrain("drift", {}, cooldown_s=600, db_path=db)
+    assert result["status"] == "cooldown"
+    assert 0 < result["cooldown_remaining_s"] <= 600
+    assert enqueue_retrain("drift", {}, cooldown_s=0, db_path=db)["status"] == "queued"
+
+
+def test_failed_job_does_not_start_a_cooldown(db):
+    enqueue_retrain("drift", {}, cooldown_s=600, db_path=db)
+
+    def run_job(args):
+        raise RuntimeError("training failed")
+
+    run_worker(run_job, db_path=db, lock_wait_s=0)
+    assert enqueue_retrain("drift", {}, cooldown_s=600, db_path=db)["status"] == "queued"
+
+
+def test_stale_running_job_is_failed(db):
+    enqueue_retrain("drift", {}, cooldown_s=0, db_path=db)
+    with closing(sqlite3.connect(db)) as conn:
+        conn.execute("UPDATE retrain_jobs SET status='running', started_at=?", (time.time() - 7 * 3600,))
+        conn.commit()
+    result = enqueue_retrain("drift", {}, cooldown_s=0, db_path=db, stale_after_s=6 * 3600)
+    assert result["status"] == "queued"
+    assert _rows(db)[0][1:] == ("failed", "stale")
+
+
+def test_stale_queued_job_is_failed(db):
+    enqueue_retrain("drift", {}, cooldown_s=0, db_path=db)
+    _age(db, "created_at", 2 * 3600)
+    result = enqueue_retrain("drift", {}, cooldown_s=0, db_path=db, queued_stale_after_s=3600)
+    assert result["status"] == "queued"
+    assert _rows(db)[0][1:] == ("failed", "stale: never claimed")
+
+
+def test_recent_queued_job_still_deduplicates(db):
+    enqueue_retrain("drift", {}, cooldown_s=0, db_path=db)
+    _age(db, "created_at", 60)
+    assert enqueue_retrain("drift", {}, cooldown_s=0, db_path=db)["status"] == "deduplicated"
+
+
+def _insert_queued(db, n):
+    with closing(sqlite3.connect(db)) as conn:
+        for i in range(n):
+            conn.execute(
+                "INSERT INTO retrain_jobs (created_at, status, reason, args) VALUES (?, 'queued', ?, ?)",
+                (time.time(), f"job {i}", f'{{"i": {i}}}'),
+            )
+        conn.commit()
+
+
+def test_run_worker_drains_all_jobs_and_survives_on_done_errors(db):
+    enqueue_retrain("init", {}, cooldown_s=0, db_path=db)  # creates the schema
+    _insert_queued(db, 2)
+    seen, reported = [], []
+
+    def run_job(args):
+        seen.append(args)
+        if args.get("i") == 0:
+            raise RuntimeError("training failed")
+
+    def on_done(outcome):
+        reported.append(outcome["job_id"])
+        raise RuntimeError("tracking server down")
+
+    assert run_worker(run_job, on_done=on_done, db_path=db, lock_wait_s=0) == 3
+    assert seen == [{}, {"i": 0}, {"i": 1}]
+    assert reported == [1, 2, 3]
+    assert [r[1] for r in _rows(db)] == ["succeeded", "failed", "succeeded"]
+
+
+def test_single_drainer_lock(db):
+    enqueue_retrain("drift", {}, cooldown_s=0, db_path=db)
+    with open(f"{db}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        assert run_worker(lambda args: None, db_path=db, lock_wait_s=0.2) == 0
+    assert _rows(db)[0][1] == "queued"
+    assert run_worker(lambda args: None, db_path=db, lock_wait_s=0) == 1
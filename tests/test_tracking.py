@@ -0,0 +1,78 @@
+import pytest
+
+mlflow = pytest.importorskip("mlflow")
+
+from mlflow.tracking import MlflowClient
+
+from src.utils import tracking
+from src.utils.tracking import RunLogger, step_run
+
+
+@pytest.fixture
+def tracking_uri(tmp_path):
+    return f"file://{tmp_path / 'mlruns'}"
+
+
+@pytest.fixture
+def client(tracking_uri):
+    return MlflowClient(tracking_uri=tracking_uri)
+
+
+def test_run_logger_splits_batches_over_mlflow_limits(client):
+    experiment_id = client.create_experiment("tracking-test")
+    run_id = client.create_run(experiment_id).info.run_id
+    logger = RunLogger(run_id, client, flush_interval_s=60.0)  # few, large drains
+
+    logger.log_metrics({f"m{i}": i for i in range(1200)})
+    for step in range(300):
+        logger.log_metrics({"loss": 1.0 / (step + 1)}, step=step)
+    logger.log_params({f"p{i}": i for i in range(150)})
+    logger.log_params({"p0": 0})  # same key twice in one batch
+    logger.set_tags({f"t{i}": i for i in range(20)})
+    logger.close()
+
+    data = client.get_run(run_id).data
+    assert len(data.metrics) == 1201
+    assert data.metrics["m1199"] == 1199.0
+    assert len(client.get_metric_history(run_id, "loss")) == 300
+    assert len(data.params) == 150
+    assert data.params["p0"] == "0"
+    assert all(data.tags[f"t{i}"] == str(i) for i in range(20))
+
+
+@pytest.fixture
+def file_tracking(tracking_uri, monkeypatch):
+    # step_run outside ZenML: no parent run, a plain run in the file store
+    monkeypatch.setattr(tracking, "MLFLOW_TRACKING_URI", tracking_uri)
+    yield
+    while mlflow.active_run() is not None:
+        mlflow.end_run()
+
+
+def _failing_write(self, metrics, params, tags):
+    raise OSError("tracking server unreachable")
+
+
+def test_step_run_reraises_the_step_exception(file_tracking, monkeypatch):
+    monkeypatch.setattr(RunLogger, "_write", _failing_write)
+    with pytest.raises(ValueError, match="bad batch"):
+        with step_run("failing_step") as tracker:
+            tracker.log_metrics({"loss": 1.0})
+            raise ValueError("bad batch")
+
+
+def test_step_run_raises_logging_errors_on_success(file_tracking, monkeypatch):
+    monkeypatch.setattr(RunLogger, "_write", _failing_write)
+    with pytest.raises(RuntimeError, match="MLflow logging failed") as info:
+        with step_run("step") as tracker:
+            tracker.log_metrics({"loss": 1.0})
+    assert isinstance(info.value.__cause__, OSError)
+
+
+def test_step_run_logs_params_and_metrics(file_tracking, tracking_uri):
+    with step_run("step", params={"lr": 0.01}) as tracker:
+        tracker.log_metrics({"acc": 0.5})
+        run_id = tracker.run_id
+    data = MlflowClient(tracking_uri=tracking_uri).get_run(run_id).data
+    assert data.params == {"lr": "0.01"}
+    assert data.metrics == {"acc": 0.5}